@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# Copyright (c) 2014-2019 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Compare artwork blur: full size PIL blur vs downsampled blur
+    Reports time per blur and mean absolute difference per channel (0-255)
+
+    Usage: art_blur.py [--width 1920] [--height 1080] [--runs 5] [image]
+    A random image is used if no image is given
+"""
+
+import gi
+gi.require_version("GdkPixbuf", "2.0")
+from gi.repository import GdkPixbuf, GLib
+
+from PIL import Image, ImageFilter, ImageChops, ImageStat
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from lollypop.art_base import BaseArt  # noqa: E402
+
+RADII = (25, 50, 100)
+
+
+def to_pil(pixbuf):
+    """
+        Convert pixbuf to PIL image
+        @param pixbuf as GdkPixbuf.Pixbuf
+        @return PIL.Image
+    """
+    mode = "RGBA" if pixbuf.get_has_alpha() else "RGB"
+    return Image.frombytes(mode, (pixbuf.get_width(), pixbuf.get_height()),
+                           pixbuf.get_pixels(), "raw", mode,
+                           pixbuf.get_rowstride())
+
+
+def full_blur(pixbuf, gaussian):
+    """
+        Previous implementation: blur at full size
+        @param pixbuf as GdkPixbuf.Pixbuf
+        @param gaussian as int
+        @return PIL.Image
+    """
+    return to_pil(pixbuf).filter(ImageFilter.GaussianBlur(gaussian))
+
+
+def fast_blur(pixbuf, gaussian):
+    """
+        Current implementation
+        @param pixbuf as GdkPixbuf.Pixbuf
+        @param gaussian as int
+        @return PIL.Image
+    """
+    # _get_blur() does not use any BaseArt state
+    return to_pil(BaseArt._get_blur(None, pixbuf, gaussian))
+
+
+def get_pixbuf(path, width, height):
+    """
+        Load image or build a random one
+        @param path as str/None
+        @param width as int
+        @param height as int
+        @return GdkPixbuf.Pixbuf
+    """
+    if path is not None:
+        return GdkPixbuf.Pixbuf.new_from_file_at_scale(path, width, height,
+                                                       False)
+    noise = GdkPixbuf.Pixbuf.new_from_bytes(
+        GLib.Bytes(os.urandom(32 * 32 * 3)),
+        GdkPixbuf.Colorspace.RGB, False, 8, 32, 32, 32 * 3)
+    return noise.scale_simple(width, height, GdkPixbuf.InterpType.BILINEAR)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("image", nargs="?")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    pixbuf = get_pixbuf(args.image, args.width, args.height)
+    for gaussian in RADII:
+        results = {}
+        for (name, blur) in (("full", full_blur), ("fast", fast_blur)):
+            start = time.perf_counter()
+            for i in range(args.runs):
+                image = blur(pixbuf, gaussian)
+            elapsed = (time.perf_counter() - start) * 1000 / args.runs
+            results[name] = (elapsed, image)
+        diff = ImageStat.Stat(ImageChops.difference(results["full"][1],
+                                                    results["fast"][1]))
+        print("radius %3d  full %8.1f ms  fast %6.1f ms  diff %5.2f" % (
+              gaussian, results["full"][0], results["fast"][0],
+              sum(diff.mean) / len(diff.mean)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# Copyright (c) 2014-2019 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Compare artwork decoding: full decode then scale vs decode at size
+    Each mode runs in its own process to get a meaningful peak RSS.
+
+    Usage: art_decode.py [--size 200] [--generate 20] corpus_dir
+    --generate fills corpus_dir with 3000x3000 JPEG covers first
+"""
+
+import gi
+gi.require_version("GdkPixbuf", "2.0")
+from gi.repository import GdkPixbuf, GLib
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from lollypop.utils import get_pixbuf_at_size  # noqa: E402
+
+MIMES = (".jpeg", ".jpg", ".png", ".gif")
+
+
+def crop_square(pixbuf):
+    """
+        Same crop as BaseArt._crop_pixbuf_square()
+        @param pixbuf as GdkPixbuf.Pixbuf
+        @return GdkPixbuf.Pixbuf
+    """
+    width = pixbuf.get_width()
+    height = pixbuf.get_height()
+    size = min(width, height)
+    return pixbuf.new_subpixbuf((width - size) // 2, (height - size) // 2,
+                                size, size)
+
+
+def load_full(data, size):
+    """
+        Previous behaviour: decode full image, crop, scale twice
+        @param data as bytes
+        @param size as int
+        @return GdkPixbuf.Pixbuf
+    """
+    loader = GdkPixbuf.PixbufLoader.new()
+    loader.write(data)
+    loader.close()
+    pixbuf = crop_square(loader.get_pixbuf())
+    pixbuf = pixbuf.scale_simple(size, size, GdkPixbuf.InterpType.BILINEAR)
+    return pixbuf.scale_simple(size, size, GdkPixbuf.InterpType.BILINEAR)
+
+
+def load_at_size(data, size):
+    """
+        Decode at size, crop, scale once
+        @param data as bytes
+        @param size as int
+        @return GdkPixbuf.Pixbuf
+    """
+    pixbuf = crop_square(get_pixbuf_at_size(data, size, size))
+    if pixbuf.get_width() != size or pixbuf.get_height() != size:
+        pixbuf = pixbuf.scale_simple(size, size,
+                                     GdkPixbuf.InterpType.BILINEAR)
+    return pixbuf
+
+
+def generate(corpus, count):
+    """
+        Generate large covers
+        @param corpus as str
+        @param count as int
+    """
+    os.makedirs(corpus, exist_ok=True)
+    for i in range(count):
+        pixbuf = GdkPixbuf.Pixbuf.new(GdkPixbuf.Colorspace.RGB,
+                                      False, 8, 3000, 3000)
+        # Some detail, plain colors compress too well
+        noise = GdkPixbuf.Pixbuf.new_from_bytes(
+            GLib.Bytes(os.urandom(64 * 64 * 3)),
+            GdkPixbuf.Colorspace.RGB, False, 8, 64, 64, 64 * 3)
+        noise.scale(pixbuf, 0, 0, 3000, 3000, 0, 0, 3000 / 64, 3000 / 64,
+                    GdkPixbuf.InterpType.BILINEAR)
+        pixbuf.savev(os.path.join(corpus, "cover%03d.jpg" % i),
+                     "jpeg", ["quality"], ["90"])
+
+
+def run(mode, corpus, size):
+    """
+        Decode corpus with mode, print JSON result
+        @param mode as str
+        @param corpus as str
+        @param size as int
+    """
+    load = load_full if mode == "full" else load_at_size
+    paths = sorted(os.path.join(corpus, name) for name in os.listdir(corpus)
+                   if name.lower().endswith(MIMES))
+    elapsed = 0
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        start = time.perf_counter()
+        load(data, size)
+        elapsed += time.perf_counter() - start
+    print(json.dumps({"mode": mode,
+                      "count": len(paths),
+                      "seconds": elapsed,
+                      "peak_rss_kib": resource.getrusage(
+                          resource.RUSAGE_SELF).ru_maxrss}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("corpus")
+    parser.add_argument("--size", type=int, default=200)
+    parser.add_argument("--generate", type=int, default=0)
+    parser.add_argument("--mode", choices=("full", "at-size"))
+    args = parser.parse_args()
+    if args.mode is not None:
+        run(args.mode, args.corpus, args.size)
+        return
+    if args.generate:
+        generate(args.corpus, args.generate)
+    for mode in ("full", "at-size"):
+        output = subprocess.check_output([sys.executable, __file__,
+                                          "--mode", mode,
+                                          "--size", str(args.size),
+                                          args.corpus])
+        result = json.loads(output)
+        count = max(1, result["count"])
+        print("%-8s %4d covers  %8.2f ms/cover  peak RSS %8d KiB" % (
+              mode, result["count"], result["seconds"] * 1000 / count,
+              result["peak_rss_kib"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# Copyright (c) 2014-2019 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Run PoolDownloader against a local stub web service
+    Stub answers after --latency seconds, albums with an odd id are
+    not found. Compares a serial run with the pool, then checks merging,
+    negative caching and queue persistence.
+
+    Usage: art_fetcher.py [--albums 200] [--workers 4] [--latency 0.05]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from threading import Thread, Lock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from lollypop.downloader_pool import PoolDownloader  # noqa: E402
+from lollypop.helper_task import TaskHelper  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+        Fake web service: /album/<id>
+    """
+    latency = 0
+    requests = 0
+    lock = Lock()
+
+    def do_GET(self):
+        with StubHandler.lock:
+            StubHandler.requests += 1
+        time.sleep(StubHandler.latency)
+        album_id = int(self.path.rsplit("/", 1)[1])
+        if album_id % 2:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = os.urandom(16 * 1024)
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Fetcher:
+    """
+        Handler similar to ArtDownloader.__cache_artwork()
+    """
+
+    def __init__(self, base_uri):
+        """
+            Init fetcher
+            @param base_uri as str
+        """
+        self.pool = None
+        self.jobs = 0
+        self.__base_uri = base_uri
+        self.__lock = Lock()
+
+    def __call__(self, job):
+        """
+            Run job
+            @param job as ["album", int]
+            @return bool
+        """
+        with self.__lock:
+            self.jobs += 1
+        if self.pool is not None:
+            self.pool.throttle("Stub")
+        (status, data) = TaskHelper().load_uri_content_sync(
+            "%s/album/%s" % (self.__base_uri, job[1]))
+        # Stub 404 body is empty
+        return status and bool(data)
+
+
+def run_pool(path, fetcher, album_ids, workers, rate):
+    """
+        Run all jobs in pool
+        @param path as str
+        @param fetcher as Fetcher
+        @param album_ids as [int]
+        @param workers as int
+        @param rate as float
+        @return (PoolDownloader, seconds)
+    """
+    pool = PoolDownloader(path, fetcher, workers)
+    pool.set_rate("Stub", rate)
+    fetcher.pool = pool
+    start = time.perf_counter()
+    for album_id in album_ids:
+        pool.add(["album", album_id])
+        # Views ask for the same album many times
+        pool.add(["album", album_id])
+    while pool.pending:
+        time.sleep(0.01)
+    return (pool, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--albums", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--rate", type=float, default=0.0)
+    args = parser.parse_args()
+    StubHandler.latency = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    base_uri = "http://127.0.0.1:%s" % server.server_address[1]
+    album_ids = list(range(args.albums))
+    tmp = tempfile.mkdtemp()
+
+    fetcher = Fetcher(base_uri)
+    start = time.perf_counter()
+    for album_id in album_ids:
+        fetcher(["album", album_id])
+    serial = time.perf_counter() - start
+    print("serial   %4d jobs  %7.2f s" % (fetcher.jobs, serial))
+
+    path = os.path.join(tmp, "downloads.json")
+    fetcher = Fetcher(base_uri)
+    (pool, elapsed) = run_pool(path, fetcher, album_ids,
+                               args.workers, args.rate)
+    print("pool     %4d jobs  %7.2f s  (%d requests to stub)" % (
+          fetcher.jobs, elapsed, StubHandler.requests - args.albums))
+    assert fetcher.jobs == args.albums, "jobs not merged"
+
+    # Not found albums must not be requested again
+    pool.save()
+    fetcher = Fetcher(base_uri)
+    (pool, elapsed) = run_pool(path, fetcher, album_ids,
+                               args.workers, args.rate)
+    print("rerun    %4d jobs  (not found cached)" % fetcher.jobs)
+    assert fetcher.jobs == (args.albums + 1) // 2, "not found not cached"
+
+    # Pending jobs must survive a restart
+    pool = PoolDownloader(os.path.join(tmp, "pending.json"), None, 0)
+    pool.add(["album", 0])
+    pool.save()
+    fetcher = Fetcher(base_uri)
+    pool = PoolDownloader(os.path.join(tmp, "pending.json"), fetcher)
+    pool.start()
+    while pool.pending:
+        time.sleep(0.01)
+    print("resumed  %4d jobs" % fetcher.jobs)
+    assert fetcher.jobs == 1, "queue not restored"
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# Copyright (c) 2014-2019 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Queue many track ids: one append per id vs one batched append
+    Visible rows are refreshed on each queue-changed like TracksWidget.
+    With --dbus, ids are sent to a running Lollypop with AppendToQueue.
+
+    Usage: queue_ids.py [--ids 1000] [--rows 1000] [--dbus]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from lollypop.player_queue import QueuePlayer  # noqa: E402
+
+
+class Player(QueuePlayer):
+    """
+        Queue without playback, rows are refreshed on queue-changed
+    """
+
+    def __init__(self, rows):
+        """
+            Init player
+            @param rows as [int]: visible track ids
+        """
+        QueuePlayer.__init__(self)
+        self.signals = 0
+        self.refreshed = 0
+        self.__rows = rows
+
+    def set_next(self):
+        self.next()
+
+    def set_prev(self):
+        pass
+
+    def emit(self, signal, track_ids):
+        """
+            Same work as TracksWidget.__on_queue_changed()
+        """
+        self.signals += 1
+        track_ids = set(track_ids)
+        for track_id in self.__rows:
+            if track_id in track_ids:
+                self.refreshed += 1
+                try:
+                    self.get_track_position(track_id)
+                except KeyError:
+                    pass
+
+
+def run_dbus(track_ids):
+    """
+        Send ids to running Lollypop
+        @param track_ids as [int]
+        @return seconds
+    """
+    import gi
+    gi.require_version("Gio", "2.0")
+    from gi.repository import Gio, GLib
+    bus = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+    start = time.perf_counter()
+    bus.call_sync("org.mpris.MediaPlayer2.Lollypop",
+                  "/org/mpris/MediaPlayer2",
+                  "org.mpris.MediaPlayer2.ExtensionQueue",
+                  "AppendToQueue",
+                  GLib.Variant("(ai)", (track_ids,)),
+                  None, Gio.DBusCallFlags.NONE, -1, None)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ids", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--dbus", action="store_true")
+    args = parser.parse_args()
+    track_ids = list(range(1, args.ids + 1))
+    if args.dbus:
+        print("dbus     %4d ids  %7.3f s" % (args.ids, run_dbus(track_ids)))
+        return
+    rows = list(range(1, args.rows + 1))
+
+    player = Player(rows)
+    start = time.perf_counter()
+    for track_id in track_ids:
+        player.append_to_queue(track_id)
+    elapsed = time.perf_counter() - start
+    print("single   %4d ids  %7.3f s  %5d signals  %7d rows refreshed" % (
+          args.ids, elapsed, player.signals, player.refreshed))
+
+    player = Player(rows)
+    start = time.perf_counter()
+    player.extend_queue(track_ids)
+    elapsed = time.perf_counter() - start
+    print("batch    %4d ids  %7.3f s  %5d signals  %7d rows refreshed" % (
+          args.ids, elapsed, player.signals, player.refreshed))
+    assert player.queue == track_ids, "queue order"
+    assert player.signals == 1, "one signal expected"
+
+    # Moving queued tracks back to the end
+    start = time.perf_counter()
+    player.extend_queue(track_ids[:args.ids // 2])
+    elapsed = time.perf_counter() - start
+    print("requeue  %4d ids  %7.3f s" % (args.ids // 2, elapsed))
+    assert player.queue == track_ids[args.ids // 2:] +\
+        track_ids[:args.ids // 2], "requeue order"
+
+
+if __name__ == "__main__":
+    main()
@@ -19,7 +19,6 @@ from gi.repository import Gtk, Gio, GLib, Gdk, Gst
 Gst.init(None)
 
 from threading import current_thread
-from pickle import dump
 from signal import signal, SIGINT, SIGTERM
 
 
@@ -33,7 +32,7 @@ except Exception as e:
 from lollypop.utils import set_proxy_from_gnome
 from lollypop.application_actions import ApplicationActions
 from lollypop.utils import is_audio, is_pls
-from lollypop.define import Type, LOLLYPOP_DATA_PATH, ScanType
+from lollypop.define import Type, ScanType
 from lollypop.window import Window
 from lollypop.database import Database
 from lollypop.player import Player
@@ -47,6 +46,7 @@ from lollypop.database_albums import AlbumsDatabase
 from lollypop.database_artists import ArtistsDatabase
 from lollypop.database_genres import GenresDatabase
 from lollypop.database_tracks import TracksDatabase
+from lollypop.database_stats import StatsDatabase
 from lollypop.notification import NotificationManager
 from lollypop.playlists import Playlists
 from lollypop.objects import Album, Track
@@ -114,6 +114,9 @@ class Application(Gtk.Application, ApplicationActions):
         GLib.set_prgname("lollypop")
         self.add_main_option("play-ids", b"a", GLib.OptionFlags.NONE,
                              GLib.OptionArg.STRING, "Play ids", None)
+        self.add_main_option("queue-ids", b"q", GLib.OptionFlags.NONE,
+                             GLib.OptionArg.STRING, "Append ids to queue",
+                             None)
         self.add_main_option("debug", b"d", GLib.OptionFlags.NONE,
                              GLib.OptionArg.NONE, "Debug Lollypop", None)
         self.add_main_option("set-rating", b"r", GLib.OptionFlags.NONE,
@@ -186,6 +189,7 @@ class Application(Gtk.Application, ApplicationActions):
         self.artists = ArtistsDatabase()
         self.genres = GenresDatabase()
         self.tracks = TracksDatabase()
+        self.stats = StatsDatabase()
         self.player = Player()
         self.inhibitor = Inhibitor()
         self.scanner = CollectionScanner()
@@ -225,7 +229,10 @@ class Application(Gtk.Application, ApplicationActions):
             self.__window = Window()
             self.__window.connect("delete-event", self.__hide_on_delete)
             self.__window.show()
-            self.player.restore_state()
+            # Do not delay window drawing
+            GLib.idle_add(self.player.restore_state)
+            # Resume downloads from previous run once started
+            GLib.timeout_add_seconds(10, self.art.resume_downloads)
 
     def quit(self, vacuum=False):
         """
@@ -257,6 +264,9 @@ class Application(Gtk.Application, ApplicationActions):
         self.__window.hide()
         for scrobbler in self.scrobblers:
             scrobbler.save()
+        self.stats.flush()
+        self.art.save()
+        self.task_helper.save_cache()
         Gio.Application.quit(self)
 
     def set_mini(self):
@@ -368,41 +378,7 @@ class Application(Gtk.Application, ApplicationActions):
         if not self.settings.get_value("save-state"):
             return
 
-        if self.player.current_track.id is None or\
-                self.player.current_track.mtime == 0:
-            track_id = None
-        elif self.player.current_track.id == Type.RADIOS:
-            from lollypop.radios import Radios
-            radios = Radios()
-            track_id = radios.get_id(
-                self.player.current_track.radio_name)
-        else:
-            track_id = self.player.current_track.id
-            # Save albums context
-            try:
-                with open(LOLLYPOP_DATA_PATH + "/Albums.bin", "wb") as f:
-                    dump(list(self.player.albums), f)
-            except Exception as e:
-                Logger.error("Application::__save_state(): %s" % e)
-        dump(track_id, open(LOLLYPOP_DATA_PATH + "/track_id.bin", "wb"))
-        dump([self.player.is_playing, self.player.is_party],
-             open(LOLLYPOP_DATA_PATH + "/player.bin", "wb"))
-        dump(self.player.queue,
-             open(LOLLYPOP_DATA_PATH + "/queue.bin", "wb"))
-        # Save current playlist
-        if self.player.current_track.id == Type.RADIOS:
-            playlist_ids = [Type.RADIOS]
-        elif not self.player.playlist_ids:
-            playlist_ids = []
-        else:
-            playlist_ids = self.player.playlist_ids
-        dump(playlist_ids,
-             open(LOLLYPOP_DATA_PATH + "/playlist_ids.bin", "wb"))
-        if self.player.current_track.id is not None:
-            position = self.player.position
-        else:
-            position = 0
-        dump(position, open(LOLLYPOP_DATA_PATH + "/position.bin", "wb"))
+        self.player.save_state()
         self.player.stop_all()
         self.__window.container.stop_all()
 
@@ -508,6 +484,20 @@ class Application(Gtk.Application, ApplicationActions):
                 except Exception as e:
                     Logger.error("Application::__on_command_line(): %s", e)
                     pass
+            elif options.contains("queue-ids"):
+                try:
+                    value = options.lookup_value("queue-ids").get_string()
+                    track_ids = []
+                    for id in value.split(";"):
+                        if id[0:2] == "a:":
+                            track_ids += Album(int(id[2:])).track_ids
+                        elif id[0:2] == "t:":
+                            track_ids.append(int(id[2:]))
+                        elif id:
+                            track_ids.append(int(id))
+                    self.player.extend_queue(track_ids)
+                except Exception as e:
+                    Logger.error("Application::__on_command_line(): %s", e)
             elif options.contains("next"):
                 self.player.next()
             elif options.contains("prev"):
@@ -14,9 +14,14 @@ from lollypop.art_base import BaseArt
 from lollypop.art_album import AlbumArt
 from lollypop.art_artist import ArtistArt
 from lollypop.art_radio import RadioArt
+from lollypop.art_pack import PackArt
+from lollypop.art_index import IndexArt
 from lollypop.logger import Logger
 from lollypop.downloader_art import ArtDownloader
 from lollypop.utils import create_dir
+from lollypop.helper_task import TaskHelper
+
+from gi.repository import GLib
 
 from shutil import rmtree
 
@@ -38,6 +43,22 @@ class Art(BaseArt, AlbumArt, ArtistArt, RadioArt, ArtDownloader):
         create_dir(self._CACHE_PATH)
         create_dir(self._STORE_PATH)
         create_dir(self._WEB_PATH)
+        create_dir(self._EMBEDDED_PATH)
+        pack_path = self._CACHE_PATH + "/artwork.pack"
+        if not GLib.file_test(pack_path, GLib.FileTest.EXISTS):
+            # Remove one file per size cache from previous versions
+            TaskHelper().run(self.__clean_exported_cache)
+        self._pack = PackArt(pack_path)
+        self._index = IndexArt(self._CACHE_PATH + "/artwork_index.json",
+                               self._MIMES)
+
+    def save(self):
+        """
+            Save packed cache, artwork indexes and pending downloads
+        """
+        self._pack.save()
+        self._index.save()
+        self.save_downloads()
 
     def clean_web(self):
         """
@@ -45,6 +66,7 @@ class Art(BaseArt, AlbumArt, ArtistArt, RadioArt, ArtDownloader):
         """
         try:
             rmtree(self._WEB_PATH)
+            self._index.invalidate(GLib.filename_to_uri(self._WEB_PATH))
         except Exception as e:
             Logger.error("Art::clean_web(): %s", e)
 
@@ -52,9 +74,20 @@ class Art(BaseArt, AlbumArt, ArtistArt, RadioArt, ArtDownloader):
         """
             Remove all covers from cache
         """
+        self._memory.clear()
+        self._pack.clear()
+        self.__clean_exported_cache()
+
+#######################
+# PRIVATE             #
+#######################
+    def __clean_exported_cache(self):
+        """
+            Remove exported covers
+        """
         try:
             from pathlib import Path
             for p in Path(self._CACHE_PATH).glob("*.jpg"):
                 p.unlink()
         except Exception as e:
-            Logger.error("Art::clean_all_cache(): %s", e)
+            Logger.error("Art::__clean_exported_cache(): %s", e)
@@ -10,15 +10,15 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from gi.repository import GLib, GdkPixbuf, Gio, Gst
+from gi.repository import GLib, GdkPixbuf, Gio
 
-from random import choice
+from hashlib import sha256
 
 from lollypop.tagreader import TagReader
 from lollypop.define import App, ArtSize, ArtBehaviour
 from lollypop.objects import Album
 from lollypop.logger import Logger
-from lollypop.utils import escape, is_readonly
+from lollypop.utils import escape, is_readonly, get_pixbuf_at_size
 from lollypop.helper_task import TaskHelper
 
 
@@ -51,17 +51,14 @@ class AlbumArt:
         filename = ""
         try:
             filename = self.get_album_cache_name(album)
-            cache_path_jpg = "%s/%s_%s_%s.jpg" % (self._CACHE_PATH,
-                                                  filename,
-                                                  width,
-                                                  height)
-            f = Gio.File.new_for_path(cache_path_jpg)
-            if f.query_exists():
+            cache_key = "%s_%s_%s" % (filename, width, height)
+            cache_path_jpg = "%s/%s.jpg" % (self._CACHE_PATH, cache_key)
+            # Export a real file from pack, needed by MPRIS/search provider
+            if self._export_from_pack(cache_key, cache_path_jpg):
+                return cache_path_jpg
+            self.get_album_artwork(album, width, height, 1)
+            if self._export_from_pack(cache_key, cache_path_jpg):
                 return cache_path_jpg
-            else:
-                self.get_album_artwork(album, width, height, 1)
-                if f.query_exists():
-                    return cache_path_jpg
         except Exception as e:
             Logger.error("Art::get_album_cache_path(): %s" % e)
             return None
@@ -93,8 +90,7 @@ class AlbumArt:
                 album.uri + "/" + filename
             ]
             for uri in uris:
-                f = Gio.File.new_for_uri(uri)
-                if f.query_exists():
+                if self._index.exists(uri):
                     return uri
         except Exception as e:
             Logger.error("AlbumArt::get_album_artwork_uri(): %s", e)
@@ -109,16 +105,9 @@ class AlbumArt:
         # Folders with many albums, get_album_artwork_uri()
         if App().albums.get_uri_count(album.uri) > 1:
             return None
-        f = Gio.File.new_for_uri(album.uri)
-        infos = f.enumerate_children("standard::name",
-                                     Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS,
-                                     None)
-        all_uris = []
-        for info in infos:
-            f = infos.get_child(info)
-            all_uris.append(f.get_uri())
-        for uri in filter(lambda p: p.lower().endswith(self._MIMES), all_uris):
-            return uri
+        names = self._index.get(album.uri)
+        if names:
+            return album.uri + "/" + names[0]
         return None
 
     def get_album_artworks(self, album):
@@ -141,10 +130,33 @@ class AlbumArt:
             for uri in filter(lambda p: p.lower().endswith(self._MIMES),
                               all_uris):
                 uris.append(uri)
+            # We just listed directory, refresh index
+            self._index.set(album.uri,
+                            [uri.rsplit("/", 1)[1] for uri in uris])
         except Exception as e:
             Logger.error("AlbumArt::get_album_artworks(): %s", e)
         return uris
 
+    def update_artwork_index(self, dirs):
+        """
+            Update artwork index with scanned directories
+            @param dirs as {str: [str]}, directory uri and file names
+            @thread safe
+        """
+        for (uri, names) in dirs.items():
+            self._index.set(uri, names)
+
+    def invalidate_artwork_index(self, uri):
+        """
+            Invalidate artwork index for changed file
+            @param uri as str
+        """
+        if uri.lower().endswith(self._MIMES):
+            f = Gio.File.new_for_uri(uri)
+            parent = f.get_parent()
+            if parent is not None:
+                self._index.invalidate(parent.get_uri())
+
     def get_album_artwork(self, album, width, height, scale_factor,
                           behaviour=ArtBehaviour.CACHE |
                           ArtBehaviour.CROP_SQUARE):
@@ -174,64 +186,94 @@ class AlbumArt:
         else:
             w = width
             h = height
-        cache_path_jpg = "%s/%s_%s_%s.jpg" % (self._CACHE_PATH, filename, w, h)
+        cache_key = "%s_%s_%s" % (filename, w, h)
         pixbuf = None
+        key = (filename, width, height, behaviour)
+        blur_key = self._get_blur_cache_key(filename, width, height,
+                                            behaviour)
+        if not behaviour & (ArtBehaviour.NO_CACHE | ArtBehaviour.PREWARM):
+            pixbuf = self._memory.get(key)
+            if pixbuf is not None:
+                return pixbuf
         try:
+            # Look in blur cache
+            if blur_key is not None:
+                pixbuf = self._get_pixbuf_from_pack(blur_key)
+                if pixbuf is not None:
+                    self._memory.add(key, pixbuf)
+                    return pixbuf
             # Look in cache
-            f = Gio.File.new_for_path(cache_path_jpg)
-            if not behaviour & ArtBehaviour.NO_CACHE and f.query_exists():
-                pixbuf = GdkPixbuf.Pixbuf.new_from_file(cache_path_jpg)
+            if not behaviour & ArtBehaviour.NO_CACHE:
+                pixbuf = self._get_pixbuf_from_pack(cache_key)
+            if pixbuf is not None:
                 if optimized_blur:
                     pixbuf = self.load_behaviour(pixbuf, None,
                                                  width, height, behaviour)
+                    self._add_pixbuf_to_pack(blur_key, pixbuf)
+                self._memory.add(key, pixbuf)
                 return pixbuf
             else:
                 # Use favorite folder artwork
                 if pixbuf is None:
                     uri = self.get_album_artwork_uri(album)
-                    data = None
                     if uri is not None:
-                        f = Gio.File.new_for_uri(uri)
-                        (status, data, tag) = f.load_contents(None)
-                        bytes = GLib.Bytes(data)
-                        stream = Gio.MemoryInputStream.new_from_bytes(bytes)
-                        pixbuf = GdkPixbuf.Pixbuf.new_from_stream(
-                            stream, None)
-                        stream.close()
-                # Use tags artwork
-                if pixbuf is None and album.tracks and album.uri != "":
-                    try:
-                        if behaviour & (ArtBehaviour.BLUR |
-                                        ArtBehaviour.BLUR_HARD):
-                            track = album.tracks[0]
-                        else:
-                            track = choice(album.tracks)
-                        pixbuf = self.pixbuf_from_tags(track.uri)
-                    except Exception as e:
-                        Logger.error("AlbumArt::get_album_artwork(): %s", e)
+                        pixbuf = self.__get_pixbuf_from_uri(uri, width,
+                                                            height)
+                # Per track artwork, not cached, read tags
+                if pixbuf is None and behaviour & ArtBehaviour.NO_CACHE and\
+                        len(album.tracks) == 1:
+                    pixbuf = self.pixbuf_from_tags(album.tracks[0].uri,
+                                                   width, height)
+                # Use tags artwork, extracted by scanner
+                if pixbuf is None and album.embedded_artwork:
+                    pixbuf = self.__get_pixbuf_from_path(
+                        "%s/%s" % (self._EMBEDDED_PATH,
+                                   album.embedded_artwork),
+                        width, height)
 
                 # Use folder artwork
                 if pixbuf is None and album.uri != "":
                     uri = self.get_first_album_artwork(album)
                     # Look in album folder
                     if uri is not None:
-                        f = Gio.File.new_for_uri(uri)
-                        (status, data, tag) = f.load_contents(None)
-                        bytes = GLib.Bytes(data)
-                        stream = Gio.MemoryInputStream.new_from_bytes(bytes)
-                        pixbuf = GdkPixbuf.Pixbuf.new_from_stream(
-                            stream, None)
-                        stream.close()
+                        pixbuf = self.__get_pixbuf_from_uri(uri, width,
+                                                            height)
                 if pixbuf is None:
-                    self.cache_album_artwork(album.id)
+                    if not behaviour & ArtBehaviour.PREWARM:
+                        self.cache_album_artwork(album.id)
                     return None
-                pixbuf = self.load_behaviour(pixbuf, cache_path_jpg,
+                pixbuf = self.load_behaviour(pixbuf, None,
                                              width, height, behaviour)
+                if behaviour & ArtBehaviour.CACHE:
+                    self._add_pixbuf_to_pack(cache_key, pixbuf)
+                elif blur_key is not None:
+                    self._add_pixbuf_to_pack(blur_key, pixbuf)
+                if not behaviour & ArtBehaviour.PREWARM:
+                    self._memory.add(key, pixbuf)
                 return pixbuf
         except Exception as e:
             Logger.error("AlbumArt::get_album_artwork(): %s" % e)
             return None
 
+    def prewarm_album_artwork(self, album, sizes, scale_factor):
+        """
+            Generate missing cache entries for album
+            @param album as Album
+            @param sizes as [int]
+            @param scale_factor as int
+            @thread safe
+        """
+        name = self.get_album_cache_name(album)
+        for size in sizes:
+            cache_key = "%s_%s_%s" % (name,
+                                      size * scale_factor,
+                                      size * scale_factor)
+            if not self._pack.exists(cache_key):
+                self.get_album_artwork(album, size, size, scale_factor,
+                                       ArtBehaviour.CACHE |
+                                       ArtBehaviour.CROP_SQUARE |
+                                       ArtBehaviour.PREWARM)
+
     def copy_from_web_to_store(self, album_id):
         """
             Copy artwork from web path to store path
@@ -246,6 +288,7 @@ class AlbumArt:
             store_file = Gio.File.new_for_path(store_path)
             web_file.copy(store_file, Gio.FileCopyFlags.OVERWRITE,
                           None, None, None)
+            self._index.add(store_file.get_uri())
         except Exception as e:
             Logger.error("AlbumArt::copy_from_web_to_store(): %s", e)
 
@@ -287,6 +330,7 @@ class AlbumArt:
                     f.delete(None)
                 except Exception as e:
                     Logger.error("AlbumArt::remove_album_artwork(): %s" % e)
+        self._index.invalidate(album.uri)
         self.__write_image_to_tags("", album.id)
 
     def clean_album_cache(self, album, width=-1, height=-1):
@@ -297,26 +341,28 @@ class AlbumArt:
             @param height as int
         """
         try:
-            from pathlib import Path
             name = self.get_album_cache_name(album)
+            self._memory.remove(name)
             if width == -1 or height == -1:
-                for p in Path(self._CACHE_PATH).glob("%s*.jpg" % name):
-                    p.unlink()
+                self._index.invalidate(album.uri)
+                # Also removes exported files
+                self._remove_from_pack(name)
             else:
-                filename = "%s/%s_%s_%s.jpg" % (self._CACHE_PATH,
-                                                name,
-                                                width,
-                                                height)
+                cache_key = "%s_%s_%s" % (name, width, height)
+                self._pack.remove([cache_key])
+                filename = "%s/%s.jpg" % (self._CACHE_PATH, cache_key)
                 f = Gio.File.new_for_path(filename)
                 if f.query_exists():
                     f.delete()
         except Exception as e:
             Logger.error("AlbumArt::clean_album_cache(): %s" % e)
 
-    def pixbuf_from_tags(self, uri):
+    def pixbuf_from_tags(self, uri, width=-1, height=-1):
         """
             Return cover from tags
             @param uri as str
+            @param width as int
+            @param height as int
         """
         pixbuf = None
         if uri.startswith("web:"):
@@ -324,23 +370,51 @@ class AlbumArt:
         try:
             tag_reader = TagReader()
             info = tag_reader.get_info(uri)
-            exist = False
+            data = None
             if info is not None:
-                (exist, sample) = info.get_tags().get_sample_index("image", 0)
-                if not exist:
-                    (exist, sample) = info.get_tags().get_sample_index(
-                        "preview-image", 0)
-            if exist:
-                (exist, mapflags) = sample.get_buffer().map(Gst.MapFlags.READ)
-            if exist:
-                bytes = GLib.Bytes(mapflags.data)
-                stream = Gio.MemoryInputStream.new_from_bytes(bytes)
-                pixbuf = GdkPixbuf.Pixbuf.new_from_stream(stream, None)
-                stream.close()
+                data = tag_reader.get_image(info.get_tags())
+            if data is not None:
+                pixbuf = get_pixbuf_at_size(data, width, height)
         except Exception as e:
             Logger.error("AlbumArt::pixbuf_from_tags(): %s" % e)
         return pixbuf
 
+    def add_embedded_artwork(self, data):
+        """
+            Add artwork extracted from tags to store
+            Same artwork is only stored once
+            @param data as bytes
+            @return content hash as str
+            @thread safe
+        """
+        digest = sha256(data).hexdigest()
+        path = "%s/%s" % (self._EMBEDDED_PATH, digest)
+        if not GLib.file_test(path, GLib.FileTest.EXISTS):
+            f = Gio.File.new_for_path(path)
+            f.replace_contents(data, None, False,
+                               Gio.FileCreateFlags.REPLACE_DESTINATION, None)
+        return digest
+
+    def clean_embedded_artworks(self, digests):
+        """
+            Remove stored embedded artworks not in digests
+            @param digests as [str]
+            @thread safe
+        """
+        try:
+            digests = set(digests)
+            f = Gio.File.new_for_path(self._EMBEDDED_PATH)
+            infos = f.enumerate_children(
+                "standard::name",
+                Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS,
+                None)
+            for info in infos:
+                if info.get_name() not in digests:
+                    infos.get_child(info).delete(None)
+            infos.close(None)
+        except Exception as e:
+            Logger.error("AlbumArt::clean_embedded_artworks(): %s", e)
+
     def get_album_cache_name(self, album):
         """
             Get a uniq string for album
@@ -354,6 +428,39 @@ class AlbumArt:
 #######################
 # PRIVATE             #
 #######################
+    def __get_pixbuf_from_path(self, path, width, height):
+        """
+            Load pixbuf from path
+            @param path as str
+            @param width as int
+            @param height as int
+            @return GdkPixbuf.Pixbuf/None
+        """
+        try:
+            with open(path, "rb") as f:
+                return get_pixbuf_at_size(f.read(), width, height)
+        except Exception as e:
+            Logger.error("AlbumArt::__get_pixbuf_from_path(): %s", e)
+            return None
+
+    def __get_pixbuf_from_uri(self, uri, width, height):
+        """
+            Load pixbuf from indexed artwork uri
+            @param uri as str
+            @param width as int
+            @param height as int
+            @return GdkPixbuf.Pixbuf/None
+        """
+        try:
+            f = Gio.File.new_for_uri(uri)
+            (status, data, tag) = f.load_contents(None)
+            return get_pixbuf_at_size(data, width, height)
+        except Exception as e:
+            # Index may be outdated, list directory again on next lookup
+            self._index.invalidate(f.get_parent().get_uri())
+            Logger.error("AlbumArt::__get_pixbuf_from_uri(): %s", e)
+            return None
+
     def __update_album_uri(self, album):
         """
             Check if album uri exists, update if not
@@ -361,8 +468,8 @@ class AlbumArt:
         """
         if not album.uri:
             return
-        d = Gio.File.new_for_uri(album.uri)
-        if not d.query_exists():
+        # Not readable, album may have moved
+        if self._index.get(album.uri) is None:
             if album.tracks:
                 track_uri = album.tracks[0].uri
                 f = Gio.File.new_for_uri(track_uri)
@@ -425,6 +532,7 @@ class AlbumArt:
         dst = Gio.File.new_for_uri(art_uri)
         src = Gio.File.new_for_path(store_path)
         src.move(dst, Gio.FileCopyFlags.OVERWRITE, None, None)
+        self._index.remove(src.get_uri())
         self.clean_album_cache(album)
         GLib.idle_add(self.album_artwork_update, album.id)
 
@@ -14,7 +14,7 @@ from gi.repository import GLib, GdkPixbuf, Gio
 
 from lollypop.define import ArtBehaviour, ArtSize
 from lollypop.logger import Logger
-from lollypop.utils import escape
+from lollypop.utils import escape, get_pixbuf_at_size
 
 
 class ArtistArt:
@@ -111,28 +111,50 @@ class ArtistArt:
             w = width
             h = height
         filename = self.get_artist_cache_name(artist)
-        cache_path_jpg = "%s/%s_%s_%s.jpg" % (self._CACHE_PATH, filename, w, h)
+        cache_key = "%s_%s_%s" % (filename, w, h)
         pixbuf = None
+        key = (filename, width, height, behaviour)
+        blur_key = self._get_blur_cache_key(filename, width, height,
+                                            behaviour)
+        if not behaviour & ArtBehaviour.NO_CACHE:
+            pixbuf = self._memory.get(key)
+            if pixbuf is not None:
+                return pixbuf
         try:
+            # Look in blur cache
+            if blur_key is not None:
+                pixbuf = self._get_pixbuf_from_pack(blur_key)
+                if pixbuf is not None:
+                    self._memory.add(key, pixbuf)
+                    return pixbuf
             # Look in cache
-            f = Gio.File.new_for_path(cache_path_jpg)
-            if not behaviour & ArtBehaviour.NO_CACHE and f.query_exists():
-                pixbuf = GdkPixbuf.Pixbuf.new_from_file(cache_path_jpg)
+            if not behaviour & ArtBehaviour.NO_CACHE:
+                pixbuf = self._get_pixbuf_from_pack(cache_key)
+            if pixbuf is not None:
                 if optimized_blur:
                     pixbuf = self.load_behaviour(pixbuf, None,
                                                  width, height, behaviour)
+                    self._add_pixbuf_to_pack(blur_key, pixbuf)
+                self._memory.add(key, pixbuf)
                 return pixbuf
             else:
                 (exists, path) = self.artist_artwork_exists(artist)
                 if exists:
                     try:
-                        pixbuf = GdkPixbuf.Pixbuf.new_from_file(path)
+                        with open(path, "rb") as f:
+                            pixbuf = get_pixbuf_at_size(f.read(),
+                                                        width, height)
                     except:
                         pass  # Empty file
                 if pixbuf is None:
                     return None
-                pixbuf = self.load_behaviour(pixbuf, cache_path_jpg,
+                pixbuf = self.load_behaviour(pixbuf, None,
                                              width, height, behaviour)
+                if behaviour & ArtBehaviour.CACHE:
+                    self._add_pixbuf_to_pack(cache_key, pixbuf)
+                elif blur_key is not None:
+                    self._add_pixbuf_to_pack(blur_key, pixbuf)
+                self._memory.add(key, pixbuf)
             return pixbuf
         except Exception as e:
             Logger.error("ArtistArt::get_artist_artwork(): %s" % e)
@@ -152,10 +174,10 @@ class ArtistArt:
             @param artist as str
         """
         try:
-            from pathlib import Path
-            search = "%s*.jpg" % self.get_artist_cache_name(artist)
-            for p in Path(self._CACHE_PATH).glob(search):
-                p.unlink()
+            name = self.get_artist_cache_name(artist)
+            self._memory.remove(name)
+            # Also removes exported files
+            self._remove_from_pack(name)
         except Exception as e:
             Logger.error("ArtistArt::uncache_artist_artwork(): %s" % e)
 
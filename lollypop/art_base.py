@@ -13,9 +13,11 @@
 from gi.repository import GObject, Gio, GLib, GdkPixbuf
 
 from PIL import Image, ImageFilter
+import re
 
 from lollypop.define import ArtSize, App, TAG_EDITORS, ArtBehaviour
 from lollypop.logger import Logger
+from lollypop.art_memory import MemoryArt
 
 
 class BaseArt(GObject.GObject):
@@ -27,6 +29,8 @@ class BaseArt(GObject.GObject):
     _STORE_PATH = GLib.get_user_data_dir() + "/lollypop/store"
     # Store for Web
     _WEB_PATH = GLib.get_user_data_dir() + "/lollypop/web_store"
+    # Artwork extracted from tags, named by content hash
+    _EMBEDDED_PATH = GLib.get_user_data_dir() + "/lollypop/embedded"
     __gsignals__ = {
         "album-artwork-changed": (GObject.SignalFlags.RUN_FIRST, None, (int,)),
         "artist-artwork-changed": (GObject.SignalFlags.RUN_FIRST,
@@ -41,10 +45,15 @@ class BaseArt(GObject.GObject):
             Init base art
         """
         GObject.GObject.__init__(self)
+        self._memory = MemoryArt()
         self.__kid3_available = False
         self.__tag_editor = App().settings.get_value("tag-editor").get_string()
         self.__kid3_cli_search()
         self.__tag_editor_search()
+        self.connect("album-artwork-changed",
+                     self.__on_album_artwork_changed)
+        self.connect("artist-artwork-changed",
+                     self.__on_artist_artwork_changed)
 
     def load_behaviour(self, pixbuf, cache_path, width, height, behaviour):
         """
@@ -54,40 +63,31 @@ class BaseArt(GObject.GObject):
             @param height as int
             @param behaviour as ArtBehaviour
         """
+        # Crops are subpixbufs, pixels are copied only once when scaling
         # Crop image as square
         if behaviour & ArtBehaviour.CROP_SQUARE:
             pixbuf = self._crop_pixbuf_square(pixbuf)
-            pixbuf = pixbuf.scale_simple(width, height,
-                                         GdkPixbuf.InterpType.BILINEAR)
         # Crop image keeping ratio
         if behaviour & ArtBehaviour.CROP:
             pixbuf = self._crop_pixbuf(pixbuf, width, height)
 
         # Handle blur
+        gaussian = 0
+        interp = GdkPixbuf.InterpType.BILINEAR
         if behaviour & ArtBehaviour.BLUR:
-            pixbuf = pixbuf.scale_simple(width,
-                                         height,
-                                         GdkPixbuf.InterpType.NEAREST)
-            pixbuf = self._get_blur(pixbuf, 25)
+            gaussian = 25
         elif behaviour & ArtBehaviour.BLUR_HARD:
-            pixbuf = pixbuf.scale_simple(width,
-                                         height,
-                                         GdkPixbuf.InterpType.NEAREST)
-            pixbuf = self._get_blur(pixbuf, 50)
+            gaussian = 50
         elif behaviour & ArtBehaviour.BLUR_MAX:
-            pixbuf = pixbuf.scale_simple(width,
-                                         height,
-                                         GdkPixbuf.InterpType.NEAREST)
-            pixbuf = self._get_blur(pixbuf, 100)
+            gaussian = 100
         elif behaviour & ArtBehaviour.CROP:
-            pixbuf = pixbuf.scale_simple(width,
-                                         height,
-                                         GdkPixbuf.InterpType.HYPER)
-            pass
-        else:
-            pixbuf = pixbuf.scale_simple(width,
-                                         height,
-                                         GdkPixbuf.InterpType.BILINEAR)
+            interp = GdkPixbuf.InterpType.HYPER
+        if gaussian:
+            interp = GdkPixbuf.InterpType.NEAREST
+        if pixbuf.get_width() != width or pixbuf.get_height() != height:
+            pixbuf = pixbuf.scale_simple(width, height, interp)
+        if gaussian:
+            pixbuf = self._get_blur(pixbuf, gaussian)
         if behaviour & ArtBehaviour.CACHE and cache_path is not None:
             if cache_path.endswith(".jpg"):
                 pixbuf.savev(cache_path, "jpeg", ["quality"],
@@ -118,6 +118,7 @@ class BaseArt(GObject.GObject):
             f = Gio.File.new_for_path(filepath)
             if f.query_exists():
                 f.delete()
+            self._index.remove(f.get_uri())
         except Exception as e:
             Logger.error("Art::clean_store(): %s" % e)
 
@@ -140,6 +141,76 @@ class BaseArt(GObject.GObject):
 #######################
 # PROTECTED           #
 #######################
+    def _get_pixbuf_from_pack(self, key):
+        """
+            Get pixbuf from packed cache
+            @param key as str
+            @return GdkPixbuf.Pixbuf/None
+            @thread safe
+        """
+        data = self._pack.get(key)
+        if data is None:
+            return None
+        bytes = GLib.Bytes(data)
+        stream = Gio.MemoryInputStream.new_from_bytes(bytes)
+        pixbuf = GdkPixbuf.Pixbuf.new_from_stream(stream, None)
+        stream.close()
+        return pixbuf
+
+    def _add_pixbuf_to_pack(self, key, pixbuf):
+        """
+            Add pixbuf to packed cache as jpeg
+            @param key as str
+            @param pixbuf as GdkPixbuf.Pixbuf
+            @thread safe
+        """
+        quality = str(App().settings.get_value("cover-quality").get_int32())
+        (status, data) = pixbuf.save_to_bufferv("jpeg",
+                                                ["quality"],
+                                                [quality])
+        if status:
+            self._pack.add(key, data)
+
+    def _export_from_pack(self, key, path):
+        """
+            Export packed cache entry to path, if changed since last export
+            @param key as str
+            @param path as str
+            @return True if exported
+            @thread safe
+        """
+        return self._pack.export(key, path)
+
+    def _remove_from_pack(self, name):
+        """
+            Remove all sizes for cache name from packed cache
+            and their exported files
+            @param name as str
+            @thread safe
+        """
+        # Keys are name_width_height with an optional _blurX suffix
+        regex = re.escape(name) + r"_\d+_\d+(_blur\d+)?$"
+        keys = set(self._pack.keys) | set(self._pack.exported_keys)
+        self._pack.remove([key for key in keys if re.match(regex, key)])
+
+    def _get_blur_cache_key(self, name, width, height, behaviour):
+        """
+            Get packed cache key for blurred artwork
+            @param name as str
+            @param width as int
+            @param height as int
+            @param behaviour as ArtBehaviour
+            @return str/None if not blurred
+        """
+        blur = ArtBehaviour.BLUR | ArtBehaviour.BLUR_HARD |\
+            ArtBehaviour.BLUR_MAX
+        if not behaviour & blur or behaviour & ArtBehaviour.NO_CACHE:
+            return None
+        # Only behaviours changing pixels, effects are applied by ArtHelper
+        flags = behaviour & (blur | ArtBehaviour.CROP |
+                             ArtBehaviour.CROP_SQUARE)
+        return "%s_%s_%s_blur%s" % (name, width, height, flags)
+
     def _save_pixbuf_from_data(self, path, data):
         """
             Save a pixbuf at path from data
@@ -161,6 +232,7 @@ class BaseArt(GObject.GObject):
             pixbuf.savev(path, "jpeg", ["quality"],
                          [str(App().settings.get_value(
                              "cover-quality").get_int32())])
+        self._index.add(GLib.filename_to_uri(path))
 
     def _crop_pixbuf(self, pixbuf, wanted_width, wanted_height):
         """
@@ -215,14 +287,24 @@ class BaseArt(GObject.GObject):
     def _get_blur(self, pixbuf, gaussian):
         """
             Blur surface using PIL
+            Blur is done on a downsampled copy then upscaled: at these
+            radii, result is the same for a fraction of the cost
             @param pixbuf as GdkPixbuf.Pixbuf
             @param gaussian as int
             @return GdkPixbuf.Pixbuf
         """
         if pixbuf is None:
             return None
-        width = pixbuf.get_width()
-        height = pixbuf.get_height()
+        full_width = pixbuf.get_width()
+        full_height = pixbuf.get_height()
+        # Blur with a radius around 6 pixels on downsampled artwork
+        factor = max(1, gaussian // 6)
+        width = max(1, full_width // factor)
+        height = max(1, full_height // factor)
+        if factor > 1:
+            pixbuf = pixbuf.scale_simple(width, height,
+                                         GdkPixbuf.InterpType.BILINEAR)
+            gaussian /= (full_width / width)
         data = pixbuf.get_pixels()
         stride = pixbuf.get_rowstride()
         has_alpha = pixbuf.get_has_alpha()
@@ -243,6 +325,9 @@ class BaseArt(GObject.GObject):
                                                  width,
                                                  height,
                                                  dst_row_stride)
+        if factor > 1:
+            pixbuf = pixbuf.scale_simple(full_width, full_height,
+                                         GdkPixbuf.InterpType.BILINEAR)
         return pixbuf
 
 #######################
@@ -324,3 +409,20 @@ class BaseArt(GObject.GObject):
         if pid is not None:
             GLib.spawn_close_pid(pid)
         self.__kid3_available = status == 0
+
+    def __on_album_artwork_changed(self, art, album_id):
+        """
+            Drop album pixbufs from memory
+            @param art as Art
+            @param album_id as int
+        """
+        from lollypop.objects import Album
+        self._memory.remove(self.get_album_cache_name(Album(album_id)))
+
+    def __on_artist_artwork_changed(self, art, artist):
+        """
+            Drop artist pixbufs from memory
+            @param art as Art
+            @param artist as str
+        """
+        self._memory.remove(self.get_artist_cache_name(artist))
@@ -0,0 +1,177 @@
+# Copyright (c) 2014-2019 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import Gio
+
+import json
+import os
+from threading import Lock
+
+from lollypop.logger import Logger
+
+
+class IndexArt:
+    """
+        Index of artwork files available in directories
+        Artwork lookups are dict hits instead of file system queries
+        Directories are listed once then kept up to date by scanner,
+        inotify and artwork saving.
+        @thread safe
+    """
+
+    def __init__(self, path, mimes):
+        """
+            Init index
+            @param path as str
+            @param mimes as (str)
+        """
+        self.__path = path
+        self.__mimes = mimes
+        self.__lock = Lock()
+        self.__dirty = False
+        # Directory uri: [artwork names], None if not readable
+        self.__dirs = {}
+        try:
+            with open(self.__path, "r") as f:
+                self.__dirs = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            Logger.warning("IndexArt::__init__(): %s", e)
+
+    def get(self, uri):
+        """
+            Get artwork names in directory
+            @param uri as str
+            @return [str]/None if not readable
+        """
+        with self.__lock:
+            if uri in self.__dirs.keys():
+                return self.__dirs[uri]
+        names = self.__enumerate(uri)
+        with self.__lock:
+            self.__dirs[uri] = names
+            self.__dirty = True
+        return names
+
+    def exists(self, uri):
+        """
+            True if artwork exists
+            @param uri as str
+            @return bool
+        """
+        (parent, name) = self.__split(uri)
+        names = self.get(parent)
+        return names is not None and name in names
+
+    def set(self, uri, names):
+        """
+            Set names available in directory
+            @param uri as str
+            @param names as [str]
+        """
+        names = [name for name in names
+                 if name.lower().endswith(self.__mimes)]
+        with self.__lock:
+            if self.__dirs.get(uri, None) != names:
+                self.__dirs[uri] = names
+                self.__dirty = True
+
+    def add(self, uri):
+        """
+            Add artwork uri to index
+            @param uri as str
+        """
+        (parent, name) = self.__split(uri)
+        with self.__lock:
+            names = self.__dirs.get(parent, None)
+            if names is not None and name not in names:
+                names.append(name)
+                self.__dirty = True
+
+    def remove(self, uri):
+        """
+            Remove artwork uri from index
+            @param uri as str
+        """
+        (parent, name) = self.__split(uri)
+        with self.__lock:
+            names = self.__dirs.get(parent, None)
+            if names is not None and name in names:
+                names.remove(name)
+                self.__dirty = True
+
+    def invalidate(self, uri):
+        """
+            Forget directory content, will be listed on next lookup
+            @param uri as str
+        """
+        with self.__lock:
+            if uri in self.__dirs.keys():
+                del self.__dirs[uri]
+                self.__dirty = True
+
+    def save(self):
+        """
+            Save index to disk
+        """
+        with self.__lock:
+            if not self.__dirty:
+                return
+            # Not readable dirs may come back, do not keep them
+            dirs = {uri: names for (uri, names) in self.__dirs.items()
+                    if names is not None}
+            self.__dirty = False
+        try:
+            tmp_path = self.__path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(dirs, f)
+            os.replace(tmp_path, self.__path)
+        except Exception as e:
+            Logger.error("IndexArt::save(): %s", e)
+
+#######################
+# PRIVATE             #
+#######################
+    def __split(self, uri):
+        """
+            Split uri in directory uri and escaped name
+            @param uri as str
+            @return (str, str)
+        """
+        # Get a normalized uri, no IO
+        uri = Gio.File.new_for_uri(uri).get_uri()
+        (parent, name) = uri.rsplit("/", 1)
+        return (parent, name)
+
+    def __enumerate(self, uri):
+        """
+            List artworks in directory
+            @param uri as str
+            @return [str]/None if not readable
+        """
+        try:
+            names = []
+            f = Gio.File.new_for_uri(uri)
+            infos = f.enumerate_children(
+                "standard::name",
+                Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS,
+                None)
+            for info in infos:
+                name = self.__split(infos.get_child(info).get_uri())[1]
+                if name.lower().endswith(self.__mimes):
+                    names.append(name)
+            infos.close(None)
+            return names
+        except Exception as e:
+            Logger.debug("IndexArt::__enumerate(): %s", e)
+            return None
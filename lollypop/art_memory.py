@@ -0,0 +1,111 @@
+# Copyright (c) 2014-2019 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from collections import OrderedDict
+from threading import Lock
+
+
+class MemoryArt:
+    """
+        LRU of decoded pixbufs, bounded by a byte budget
+        Keys are (cache name, width, height, behaviour)
+        @thread safe
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        """
+            Init cache
+            @param max_bytes as int
+        """
+        self.__max_bytes = max_bytes
+        self.__bytes = 0
+        self.__items = OrderedDict()
+        self.__lock = Lock()
+        self.__hits = 0
+        self.__misses = 0
+
+    def get(self, key):
+        """
+            Get pixbuf for key, mark it as recently used
+            @param key as tuple
+            @return GdkPixbuf.Pixbuf/None
+        """
+        with self.__lock:
+            item = self.__items.get(key, None)
+            if item is None:
+                self.__misses += 1
+                return None
+            self.__hits += 1
+            self.__items.move_to_end(key)
+            return item[0]
+
+    def add(self, key, pixbuf):
+        """
+            Add pixbuf for key, evict least recently used items
+            @param key as tuple
+            @param pixbuf as GdkPixbuf.Pixbuf
+        """
+        size = pixbuf.get_rowstride() * pixbuf.get_height()
+        if size > self.__max_bytes:
+            return
+        with self.__lock:
+            item = self.__items.pop(key, None)
+            if item is not None:
+                self.__bytes -= item[1]
+            self.__items[key] = (pixbuf, size)
+            self.__bytes += size
+            while self.__bytes > self.__max_bytes:
+                (k, item) = self.__items.popitem(last=False)
+                self.__bytes -= item[1]
+
+    def remove(self, name):
+        """
+            Remove all pixbufs for cache name
+            @param name as str
+        """
+        with self.__lock:
+            for key in [key for key in self.__items.keys()
+                        if key[0] == name]:
+                (pixbuf, size) = self.__items.pop(key)
+                self.__bytes -= size
+
+    def clear(self):
+        """
+            Remove all pixbufs
+        """
+        with self.__lock:
+            self.__items.clear()
+            self.__bytes = 0
+
+    @property
+    def hits(self):
+        """
+            Get cache hits
+            @return int
+        """
+        return self.__hits
+
+    @property
+    def misses(self):
+        """
+            Get cache misses
+            @return int
+        """
+        return self.__misses
+
+    @property
+    def size(self):
+        """
+            Get memory used by pixbufs
+            @return int
+        """
+        return self.__bytes
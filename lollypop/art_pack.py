@@ -0,0 +1,444 @@
+# Copyright (c) 2014-2019 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import json
+import mmap
+from fcntl import flock, LOCK_EX, LOCK_UN
+from struct import Struct
+from threading import Lock
+from time import time
+
+from lollypop.logger import Logger
+
+
+class PackArt:
+    """
+        Artwork cache packed in one append only file, read with mmap
+        A record is: header, key, data. A record without data removes key.
+        Dead records are dropped by compaction, least recently used
+        records are evicted when pack is over budget.
+        File is shared with search provider, writes are locked with flock()
+        Entries can be exported to real files, exported files are tracked
+        so they are refreshed and removed with their entry.
+        @thread safe
+    """
+    __HEADER = Struct("<4sHI")
+    __MAGIC = b"LPA1"
+    # Do not compact for less than this amount of dead data
+    __MIN_DEAD = 8 * 1024 * 1024
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024):
+        """
+            Init pack
+            @param path as str
+            @param max_bytes as int
+        """
+        self.__path = path
+        self.__index_path = path + ".idx"
+        self.__max_bytes = max_bytes
+        self.__lock = Lock()
+        self.__fd = None
+        self.__map = None
+        self.__inode = None
+        # Scanned size
+        self.__size = 0
+        # Live records size
+        self.__live = 0
+        # key: (record offset, data offset, data length)
+        self.__entries = {}
+        self.__atimes = {}
+        # key: [path, record offset when exported]
+        self.__exports = {}
+        self.__open()
+
+    def get(self, key):
+        """
+            Get data for key
+            @param key as str
+            @return bytes/None
+        """
+        with self.__lock:
+            try:
+                self.__refresh()
+                entry = self.__entries.get(key, None)
+                if entry is None:
+                    return None
+                (offset, data_offset, length) = entry
+                self.__atimes[key] = time()
+                return self.__map[data_offset:data_offset + length]
+            except Exception as e:
+                Logger.error("PackArt::get(): %s", e)
+                return None
+
+    def exists(self, key):
+        """
+            True if key is in pack
+            @param key as str
+            @return bool
+        """
+        with self.__lock:
+            try:
+                self.__refresh()
+            except Exception as e:
+                Logger.error("PackArt::exists(): %s", e)
+            return key in self.__entries.keys()
+
+    def export(self, key, path):
+        """
+            Export data for key to path, file is written again only if
+            entry changed since last export
+            @param key as str
+            @param path as str
+            @return True if exported
+        """
+        with self.__lock:
+            try:
+                self.__refresh()
+                entry = self.__entries.get(key, None)
+                if entry is None:
+                    return False
+                (offset, data_offset, length) = entry
+                if self.__exports.get(key, None) == [path, offset] and\
+                        os.path.exists(path):
+                    return True
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(self.__map[data_offset:data_offset + length])
+                os.replace(tmp_path, path)
+                self.__exports[key] = [path, offset]
+                return True
+            except Exception as e:
+                Logger.error("PackArt::export(): %s", e)
+                return False
+
+    def add(self, key, data):
+        """
+            Add data for key, replace previous data
+            @param key as str
+            @param data as bytes
+        """
+        if not data:
+            return
+        with self.__lock:
+            try:
+                self.__append([(key, data)])
+                self.__atimes[key] = time()
+                self.__maybe_compact()
+            except Exception as e:
+                Logger.error("PackArt::add(): %s", e)
+
+    def remove(self, keys):
+        """
+            Remove keys from pack
+            @param keys as [str]
+        """
+        with self.__lock:
+            try:
+                self.__unlink_exports(keys)
+                self.__refresh()
+                self.__append([(key, b"") for key in keys
+                               if key in self.__entries.keys()])
+                self.__maybe_compact()
+            except Exception as e:
+                Logger.error("PackArt::remove(): %s", e)
+
+    def clear(self):
+        """
+            Remove all data
+        """
+        with self.__lock:
+            try:
+                self.__unlink_exports(list(self.__exports.keys()))
+                self.__lock_pack()
+                try:
+                    # Never truncate, other processes may have it mapped
+                    tmp_path = self.__path + ".tmp"
+                    open(tmp_path, "wb").close()
+                    os.replace(tmp_path, self.__path)
+                finally:
+                    flock(self.__fd, LOCK_UN)
+                self.__open()
+                self.__save_index()
+            except Exception as e:
+                Logger.error("PackArt::clear(): %s", e)
+
+    def save(self):
+        """
+            Save index, next startup will not have to scan pack
+        """
+        with self.__lock:
+            try:
+                self.__refresh()
+                self.__save_index()
+            except Exception as e:
+                Logger.error("PackArt::save(): %s", e)
+
+    @property
+    def keys(self):
+        """
+            Get available keys
+            @return [str]
+        """
+        with self.__lock:
+            try:
+                self.__refresh()
+            except Exception as e:
+                Logger.error("PackArt::keys(): %s", e)
+            return list(self.__entries.keys())
+
+    @property
+    def exported_keys(self):
+        """
+            Get keys exported to files, entry may be gone
+            @return [str]
+        """
+        with self.__lock:
+            return list(self.__exports.keys())
+
+#######################
+# PRIVATE             #
+#######################
+    def __open(self):
+        """
+            Open pack and load index
+        """
+        self.__reset()
+        if self.__fd is not None:
+            os.close(self.__fd)
+        self.__fd = os.open(self.__path, os.O_RDWR | os.O_CREAT, 0o644)
+        stat = os.fstat(self.__fd)
+        self.__inode = stat.st_ino
+        self.__load_index(stat)
+        self.__scan()
+        self.__remap()
+
+    def __reset(self):
+        """
+            Forget about records
+        """
+        if self.__map is not None:
+            self.__map.close()
+        self.__map = None
+        self.__size = 0
+        self.__live = 0
+        self.__entries = {}
+
+    def __load_index(self, stat):
+        """
+            Load index if it matches pack
+            @param stat as os.stat_result
+        """
+        try:
+            with open(self.__index_path, "r") as f:
+                index = json.load(f)
+            # Exported files exist whatever the pack state is
+            for (key, export) in index.get("exports", {}).items():
+                self.__exports.setdefault(key, export)
+            if index["inode"] != stat.st_ino or\
+                    index["size"] > stat.st_size:
+                return
+            for (key, entry) in index["entries"].items():
+                self.__entries[key] = tuple(entry)
+                self.__live += entry[1] + entry[2] - entry[0]
+            self.__size = index["size"]
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            Logger.warning("PackArt::__load_index(): %s", e)
+            self.__reset()
+
+    def __save_index(self):
+        """
+            Save index next to pack
+        """
+        index = {"inode": self.__inode,
+                 "size": self.__size,
+                 "entries": self.__entries,
+                 "exports": self.__exports}
+        tmp_path = self.__index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.__index_path)
+
+    def __scan(self):
+        """
+            Read records appended after scanned size
+        """
+        size = os.fstat(self.__fd).st_size
+        header_size = self.__HEADER.size
+        while self.__size + header_size <= size:
+            header = os.pread(self.__fd, header_size, self.__size)
+            (magic, key_length, length) = self.__HEADER.unpack(header)
+            end = self.__size + header_size + key_length + length
+            if magic != self.__MAGIC or end > size:
+                # Interrupted write, will be overwritten
+                break
+            key = os.pread(self.__fd, key_length,
+                           self.__size + header_size).decode("utf-8")
+            self.__set_entry(key, self.__size,
+                             self.__size + header_size + key_length, length)
+            self.__size = end
+
+    def __set_entry(self, key, offset, data_offset, length):
+        """
+            Update index for record
+            @param key as str
+            @param offset as int
+            @param data_offset as int
+            @param length as int
+        """
+        entry = self.__entries.pop(key, None)
+        if entry is not None:
+            self.__live -= entry[1] + entry[2] - entry[0]
+        if length:
+            self.__entries[key] = (offset, data_offset, length)
+            self.__live += data_offset + length - offset
+        elif key in self.__atimes.keys():
+            del self.__atimes[key]
+
+    def __refresh(self):
+        """
+            Follow changes done by other processes
+        """
+        try:
+            stat = os.stat(self.__path)
+        except FileNotFoundError:
+            self.__open()
+            return
+        if stat.st_ino != self.__inode:
+            self.__open()
+        elif stat.st_size > self.__size:
+            self.__scan()
+            self.__remap()
+
+    def __lock_pack(self):
+        """
+            Lock pack for writing, reopen it if replaced by another process
+        """
+        while True:
+            flock(self.__fd, LOCK_EX)
+            try:
+                if os.stat(self.__path).st_ino == self.__inode:
+                    return
+            except FileNotFoundError:
+                pass
+            flock(self.__fd, LOCK_UN)
+            self.__open()
+
+    def __remap(self):
+        """
+            Map scanned records
+        """
+        if self.__map is not None and len(self.__map) == self.__size:
+            return
+        if self.__map is not None:
+            self.__map.close()
+            self.__map = None
+        if self.__size:
+            self.__map = mmap.mmap(self.__fd, self.__size,
+                                   access=mmap.ACCESS_READ)
+
+    def __append(self, items):
+        """
+            Append records for items
+            @param items as [(str, bytes)]
+        """
+        if not items:
+            return
+        self.__lock_pack()
+        try:
+            self.__refresh()
+            # Drop an interrupted write
+            if os.fstat(self.__fd).st_size != self.__size:
+                os.ftruncate(self.__fd, self.__size)
+            records = []
+            entries = []
+            offset = self.__size
+            for (key, data) in items:
+                encoded = key.encode("utf-8")
+                header = self.__HEADER.pack(self.__MAGIC,
+                                            len(encoded),
+                                            len(data))
+                records += [header, encoded, data]
+                data_offset = offset + len(header) + len(encoded)
+                entries.append((key, offset, data_offset, len(data)))
+                offset = data_offset + len(data)
+            data = b"".join(records)
+            written = os.pwrite(self.__fd, data, self.__size)
+            if written != len(data):
+                raise IOError("short write: %s/%s" % (written, len(data)))
+            # Only index records once they are on disk
+            for entry in entries:
+                self.__set_entry(*entry)
+            self.__size = offset
+        finally:
+            flock(self.__fd, LOCK_UN)
+        self.__remap()
+
+    def __maybe_compact(self):
+        """
+            Compact pack if too much dead data or over budget
+        """
+        dead = self.__size - self.__live
+        if self.__live > self.__max_bytes or\
+                (dead > self.__MIN_DEAD and dead > self.__live):
+            self.__compact()
+
+    def __compact(self):
+        """
+            Rewrite live records, evicting least recently used ones
+        """
+        self.__lock_pack()
+        try:
+            self.__refresh()
+            # Never read records are older than read ones
+            keys = sorted(self.__entries.keys(),
+                          key=lambda k: (self.__atimes.get(k, 0),
+                                         self.__entries[k][0]))
+            live = self.__live
+            budget = self.__max_bytes * 3 // 4
+            evicted = 0
+            while evicted < len(keys) and live > budget:
+                (offset, data_offset, length) = \
+                    self.__entries[keys[evicted]]
+                live -= data_offset + length - offset
+                evicted += 1
+            self.__unlink_exports(keys[:evicted])
+            keys = keys[evicted:]
+            keys.sort(key=lambda k: self.__entries[k][0])
+            tmp_path = self.__path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                for key in keys:
+                    (offset, data_offset, length) = self.__entries[key]
+                    f.write(self.__map[offset:data_offset + length])
+            os.replace(tmp_path, self.__path)
+        finally:
+            flock(self.__fd, LOCK_UN)
+        self.__open()
+        self.__save_index()
+
+    def __unlink_exports(self, keys):
+        """
+            Remove exported files for keys
+            @param keys as [str]
+        """
+        for key in keys:
+            export = self.__exports.pop(key, None)
+            if export is None:
+                continue
+            try:
+                os.unlink(export[0])
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                Logger.warning("PackArt::__unlink_exports(): %s", e)
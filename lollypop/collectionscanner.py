@@ -24,11 +24,12 @@ from time import time
 import json
 
 from lollypop.inotify import Inotify
-from lollypop.define import App, ScanType, Type
+from lollypop.define import App, ScanType, Type, Generation
 from lollypop.sqlcursor import SqlCursor
 from lollypop.tagreader import TagReader
 from lollypop.logger import Logger
 from lollypop.database_history import History
+from lollypop.objects import Album
 from lollypop.utils import is_audio, is_pls, get_mtime, profile, create_dir
 
 
@@ -50,6 +51,8 @@ class CollectionScanner(GObject.GObject, TagReader):
     }
 
     _WEB_COLLECTION = GLib.get_user_data_dir() + "/lollypop/web_collection"
+    # Files read before restoring their stats from history in one query
+    __BATCH_SIZE = 100
 
     def __init__(self):
         """
@@ -214,6 +217,7 @@ class CollectionScanner(GObject.GObject, TagReader):
         self.update_album(album_id, album_artist_ids,
                           genre_ids, year, timestamp)
         SqlCursor.commit(App().db)
+        App().db.bump_generation(Generation.COLLECTION)
         for genre_id in genre_ids:
             # Be sure to not send Type.WEB
             if genre_id >= 0:
@@ -274,6 +278,7 @@ class CollectionScanner(GObject.GObject, TagReader):
             App().albums.clean()
             App().genres.clean()
             App().artists.clean()
+            App().db.bump_generation(Generation.COLLECTION)
             if notify:
                 if App().albums.get_name(album_id) is None:
                     GLib.idle_add(self.emit, "album-updated",
@@ -293,7 +298,7 @@ class CollectionScanner(GObject.GObject, TagReader):
         """
             Return True if db locked
         """
-        return self.__thread is not None and self.__thread.isAlive()
+        return self.__thread is not None and self.__thread.is_alive()
 
     def stop(self):
         """
@@ -332,6 +337,8 @@ class CollectionScanner(GObject.GObject, TagReader):
         self.emit("scan-finished", modifications)
         # Update max count value
         App().albums.update_max_count()
+        # Forget old stats, scan may have added some
+        self.__history.prune()
 
     def __add_monitor(self, dirs):
         """
@@ -391,6 +398,8 @@ class CollectionScanner(GObject.GObject, TagReader):
         """
         files = []
         dirs = []
+        # Directory uri: file names, for artwork index
+        names = {}
         walk_uris = []
         # Check collection exists
         for uri in uris:
@@ -410,6 +419,7 @@ class CollectionScanner(GObject.GObject, TagReader):
                                     None)
                 if info.get_file_type() == Gio.FileType.DIRECTORY:
                     dirs.append(uri)
+                    names[uri] = []
                     infos = f.enumerate_children(SCAN_QUERY_INFO,
                                                  Gio.FileQueryInfoFlags.NONE,
                                                  None)
@@ -424,6 +434,7 @@ class CollectionScanner(GObject.GObject, TagReader):
                         else:
                             mtime = get_mtime(info)
                             files.append((mtime, child_uri))
+                            names[uri].append(child_uri.rsplit("/", 1)[1])
                     infos.close(None)
                 # Only happens if files passed as args
                 else:
@@ -432,6 +443,7 @@ class CollectionScanner(GObject.GObject, TagReader):
             except Exception as e:
                 Logger.error("CollectionScanner::__get_objects_for_uris(): %s"
                              % e)
+        App().art.update_artwork_index(names)
         files.sort(reverse=True)
         return (files, dirs)
 
@@ -503,6 +515,8 @@ class CollectionScanner(GObject.GObject, TagReader):
         # Get mtime of all tracks to detect which has to be updated
         db_mtimes = App().tracks.get_mtimes()
         count = len(files) + 1
+        # Files waiting to be added: [(uri, mtime, info)]
+        pending = []
         try:
             # Scan new files
             for (mtime, uri) in files:
@@ -520,14 +534,16 @@ class CollectionScanner(GObject.GObject, TagReader):
                         elif db_mtimes:
                             mtime = int(time())
                         Logger.debug("Adding file: %s" % uri)
-                        self.__add2db(uri, mtime)
-                        SqlCursor.allow_thread_execution(App().db)
-                        new_tracks.append(uri)
+                        pending.append((uri, mtime, self.get_info(uri)))
                 except Exception as e:
                     Logger.error(
                                "CollectionScanner:: __scan_add_files: % s" % e)
+                if len(pending) >= self.__BATCH_SIZE:
+                    new_tracks += self.__add_batch2db(pending)
+                    pending = []
                 i += 1
                 self.__update_progress(i, count)
+            new_tracks += self.__add_batch2db(pending)
             if scan_type != ScanType.EPHEMERAL and self.__thread is not None:
                 # We need to check files are always in collections
                 if scan_type == ScanType.FULL:
@@ -549,23 +565,53 @@ class CollectionScanner(GObject.GObject, TagReader):
                     if not in_collection or not f.query_exists():
                         self.del_from_db(uri, True)
                         SqlCursor.allow_thread_execution(App().db)
+                # Albums from previous versions or with unreadable tags
+                self.__extract_missing_artworks()
+                if scan_type == ScanType.FULL:
+                    App().art.clean_embedded_artworks(
+                        App().albums.get_embedded_artworks())
         except Exception as e:
             Logger.warning("CollectionScanner:: __scan_files: % s" % e)
         SqlCursor.commit(App().db)
         SqlCursor.remove(App().db)
         return new_tracks
 
-    def __add2db(self, uri, track_mtime):
+    def __add_batch2db(self, items):
+        """
+            Add files to db, history is read once for all files
+            @param items as [(str, int, GstPbutils.DiscovererInfo)]
+                => (uri, mtime, info)
+            @return added uris as [str]
+            @warning, be sure SqlCursor is available for App().db
+        """
+        added = []
+        if not items:
+            return added
+        keys = [(Gio.File.new_for_uri(uri).get_basename(),
+                 int(info.get_duration() / 1000000000))
+                for (uri, mtime, info) in items]
+        history = self.__history.get_many(keys)
+        for (uri, mtime, info) in items:
+            try:
+                self.__add2db(uri, mtime, info, history)
+                SqlCursor.allow_thread_execution(App().db)
+                added.append(uri)
+            except Exception as e:
+                Logger.error("CollectionScanner::__add_batch2db: % s" % e)
+        return added
+
+    def __add2db(self, uri, track_mtime, info, history):
         """
             Add new file(or update one) to db with information
             @param uri as string
             @param track_mtime as int
+            @param info as GstPbutils.DiscovererInfo
+            @param history as {(str, int): tuple}, see History.get_many()
             @return track id as int
             @warning, be sure SqlCursor is available for App().db
         """
         f = Gio.File.new_for_uri(uri)
         Logger.debug("CollectionScanner::add2db(): Read tags")
-        info = self.get_info(uri)
         tags = info.get_tags()
         name = f.get_basename()
         title = self.get_title(tags, name)
@@ -622,8 +668,8 @@ class CollectionScanner(GObject.GObject, TagReader):
         if track_id is None:
             (track_pop, track_rate, track_ltime,
              album_mtime, track_loved, album_loved,
-             album_pop, album_rate, album_synced) = self.__history.get(
-                name, duration)
+             album_pop, album_rate, album_synced) = history.get(
+                (name, duration), (0, 0, 0, 0, 0, 0, 0, 0, 0))
         # Delete track and restore from it
         else:
             (track_pop, track_rate, track_ltime,
@@ -636,6 +682,7 @@ class CollectionScanner(GObject.GObject, TagReader):
         if album_mtime == 0:
             album_mtime = track_mtime
 
+        updated = track_id is not None
         (track_id, album_id) = self.save_track(
                    genres, artists, a_sortnames, mb_artist_id,
                    album_artists, aa_sortnames, mb_album_artist_id,
@@ -644,4 +691,45 @@ class CollectionScanner(GObject.GObject, TagReader):
                    tracknumber, discnumber, discname, year, timestamp,
                    track_mtime, track_pop, track_rate, track_loved,
                    track_ltime, mb_track_id, bpm)
+        # Once per album, unless file changed
+        if updated or not App().albums.get_embedded_artwork(album_id):
+            self.__save_embedded_artwork(album_id, tags)
         return track_id
+
+    def __save_embedded_artwork(self, album_id, tags):
+        """
+            Extract embedded artwork to store
+            @param album_id as int
+            @param tags as Gst.TagList
+            @warning, be sure SqlCursor is available for App().db
+        """
+        previous = App().albums.get_embedded_artwork(album_id)
+        data = self.get_image(tags)
+        if data is not None:
+            digest = App().art.add_embedded_artwork(data)
+            if digest == previous:
+                return
+            App().albums.set_embedded_artwork(album_id, digest)
+            if previous:
+                App().art.clean_album_cache(Album(album_id))
+                GLib.idle_add(App().art.album_artwork_update, album_id)
+        elif previous is None:
+            App().albums.set_embedded_artwork(album_id, "")
+
+    def __extract_missing_artworks(self):
+        """
+            Extract embedded artwork for albums never checked
+            @warning, be sure SqlCursor is available for App().db
+        """
+        for (album_id, uri) in App().albums.get_unchecked_artwork_uris():
+            # Handle a stop request
+            if self.__thread is None:
+                raise Exception("Scan artwork cancelled")
+            try:
+                info = self.get_info(uri)
+                self.__save_embedded_artwork(album_id, info.get_tags())
+            except Exception as e:
+                Logger.error(
+                    "CollectionScanner::__extract_missing_artworks(): %s", e)
+                App().albums.set_embedded_artwork(album_id, "")
+            SqlCursor.allow_thread_execution(App().db)
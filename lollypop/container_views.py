@@ -233,8 +233,7 @@ class ViewsContainer:
 
         def load_smart():
             tracks = []
-            request = App().playlists.get_smart_sql(playlist_ids[0])
-            ids = App().db.execute(request)
+            ids = App().playlists.get_smart_track_ids(playlist_ids[0])
             for id in ids:
                 track = Track(id)
                 # Smart playlist may report invalid tracks
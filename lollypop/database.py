@@ -68,7 +68,8 @@ class Database:
                                               rate INT NOT NULL,
                                               loved INT NOT NULL,
                                               mtime INT NOT NULL,
-                                              synced INT NOT NULL)"""
+                                              synced INT NOT NULL,
+                                              embedded_artwork TEXT)"""
     __create_artists = """CREATE TABLE artists (id INTEGER PRIMARY KEY,
                                                name TEXT NOT NULL,
                                                sortname TEXT NOT NULL,
@@ -113,12 +114,23 @@ class Database:
                                                 album_id)"""
     __create_track_genres_idx = """CREATE index idx_tg ON track_genres(
                                                 track_id)"""
+    __create_tracks_uri_idx = """CREATE index idx_tu ON tracks(uri)"""
+    __create_plays = """CREATE TABLE plays (id INTEGER PRIMARY KEY,
+                                            track_id INT NOT NULL,
+                                            album_id INT NOT NULL,
+                                            popularity INT NOT NULL,
+                                            time INT NOT NULL,
+                                            duration INT NOT NULL)"""
+    __create_plays_idx = """CREATE unique index idx_pt ON plays(
+                                                track_id, time)"""
 
     def __init__(self):
         """
             Create database tables or manage update if needed
         """
         self.thread_lock = MyLock()
+        self.__generation_lock = Lock()
+        self.__generations = {}
         f = Gio.File.new_for_path(self.DB_PATH)
         upgrade = DatabaseAlbumsUpgrade()
         if not f.query_exists():
@@ -140,21 +152,25 @@ class Database:
                     sql.execute(self.__create_track_artists_idx)
                     sql.execute(self.__create_album_genres_idx)
                     sql.execute(self.__create_track_genres_idx)
+                    sql.execute(self.__create_tracks_uri_idx)
+                    sql.execute(self.__create_plays)
+                    sql.execute(self.__create_plays_idx)
                     sql.execute("PRAGMA user_version=%s" % upgrade.version)
             except Exception as e:
                 Logger.error("Database::__init__(): %s" % e)
         else:
             upgrade.upgrade(self)
 
-    def execute(self, request):
+    def execute(self, request, params=()):
         """
             Execute SQL request (only smart one)
             @param request as str
+            @param params as tuple
             @return list
         """
         try:
             with SqlCursor(App().db) as sql:
-                result = sql.execute(request)
+                result = sql.execute(request, params)
                 # Special case for OR request
                 if request.find("ORDER BY random()") == -1 and\
                         request.find("UNION") != -1:
@@ -168,6 +184,34 @@ class Database:
             Logger.error("Database::execute(): %s -> %s", e, request)
         return []
 
+    def bump_generation(self, generation):
+        """
+            Mark data as changed, caches depending on it are now invalid
+            @param generation as Generation
+        """
+        with self.__generation_lock:
+            bit = 1
+            while bit <= generation:
+                if generation & bit:
+                    self.__generations[bit] = \
+                        self.__generations.get(bit, 0) + 1
+                bit <<= 1
+
+    def get_generation(self, generation):
+        """
+            Get current generation for data
+            @param generation as Generation
+            @return tuple
+        """
+        values = []
+        with self.__generation_lock:
+            bit = 1
+            while bit <= generation:
+                if generation & bit:
+                    values.append(self.__generations.get(bit, 0))
+                bit <<= 1
+        return tuple(values)
+
     def get_cursor(self):
         """
             Return a new sqlite cursor
@@ -13,7 +13,7 @@
 import itertools
 
 from lollypop.sqlcursor import SqlCursor
-from lollypop.define import App, Type, OrderBy
+from lollypop.define import App, Type, OrderBy, Generation
 from lollypop.logger import Logger
 from lollypop.utils import noaccents, get_network_available, remove_static
 
@@ -145,6 +145,7 @@ class AlbumsDatabase:
         with SqlCursor(App().db, True) as sql:
             sql.execute("UPDATE albums SET rate=? WHERE rowid=?",
                         (rate, album_id))
+        App().db.bump_generation(Generation.RATE)
 
     def set_year(self, album_id, year):
         """
@@ -179,6 +180,17 @@ class AlbumsDatabase:
             sql.execute("UPDATE albums SET uri=? WHERE rowid=?",
                         (uri, album_id))
 
+    def set_embedded_artwork(self, album_id, digest):
+        """
+            Set embedded artwork content hash, empty if none
+            @param album_id as int
+            @param digest as str
+            @warning: commit needed
+        """
+        with SqlCursor(App().db, True) as sql:
+            sql.execute("UPDATE albums SET embedded_artwork=? WHERE rowid=?",
+                        (digest, album_id))
+
     def set_popularity(self, album_id, popularity):
         """
             Set popularity
@@ -191,6 +203,7 @@ class AlbumsDatabase:
                             (popularity, album_id))
             except:  # Database is locked
                 pass
+        App().db.bump_generation(Generation.POPULARITY)
 
     def get_synced_ids(self, index):
         """
@@ -285,25 +298,6 @@ class AlbumsDatabase:
                 return v[0]
             return 0
 
-    def set_more_popular(self, album_id, pop_to_add):
-        """
-            Increment popularity field for album id
-            @param album_id as int
-            @param pop_to_add as int
-            @raise sqlite3.OperationalError on db update
-        """
-        with SqlCursor(App().db, True) as sql:
-            result = sql.execute("SELECT popularity from albums WHERE rowid=?",
-                                 (album_id,))
-            pop = result.fetchone()
-            if pop:
-                current = pop[0]
-            else:
-                current = 0
-            current += pop_to_add
-            sql.execute("UPDATE albums set popularity=? WHERE rowid=?",
-                        (current, album_id))
-
     def get_higher_popularity(self):
         """
             Get higher available popularity
@@ -498,6 +492,46 @@ class AlbumsDatabase:
                 return v[0]
             return None
 
+    def get_embedded_artwork(self, album_id):
+        """
+            Get embedded artwork content hash for album id
+            @param album_id as int
+            @return str/None if never checked
+        """
+        with SqlCursor(App().db) as sql:
+            result = sql.execute("SELECT embedded_artwork FROM albums\
+                                  WHERE rowid=?", (album_id,))
+            v = result.fetchone()
+            if v is not None:
+                return v[0]
+            return None
+
+    def get_embedded_artworks(self):
+        """
+            Get all embedded artwork content hashes
+            @return [str]
+        """
+        with SqlCursor(App().db) as sql:
+            result = sql.execute("SELECT DISTINCT embedded_artwork\
+                                  FROM albums\
+                                  WHERE embedded_artwork IS NOT NULL\
+                                  AND embedded_artwork != ''")
+            return list(itertools.chain(*result))
+
+    def get_unchecked_artwork_uris(self):
+        """
+            Get one track uri for albums never checked for embedded artwork
+            @return [(int, str)]
+        """
+        with SqlCursor(App().db) as sql:
+            result = sql.execute("SELECT albums.rowid, MIN(tracks.uri)\
+                                  FROM albums, tracks\
+                                  WHERE tracks.album_id=albums.rowid\
+                                  AND albums.embedded_artwork IS NULL\
+                                  AND tracks.uri NOT LIKE 'web:%'\
+                                  GROUP BY albums.rowid")
+            return list(result)
+
     def get_uri(self, album_id):
         """
             Get album uri for album id
@@ -10,12 +10,15 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from gi.repository import GLib
+from gi.repository import GLib, Gio
 
 import sqlite3
-from threading import Lock
+from threading import Lock, Thread
+from time import time, sleep
 
 from lollypop.sqlcursor import SqlCursor
+from lollypop.logger import Logger
+from lollypop.database_upgrade import DatabaseHistoryUpgrade
 
 
 class History:
@@ -24,8 +27,9 @@ class History:
     """
     __LOCAL_PATH = GLib.get_user_data_dir() + "/lollypop"
     __DB_PATH = "%s/history.db" % __LOCAL_PATH
-    __LIMIT = 1000000  # Delete when limit is reached
-    __DELETE = 100     # How many elements to delete
+    __LIMIT = 1000000  # Keep this many recently stored entries
+    __MAX_AGE = 2 * 365 * 24 * 3600  # Forget entries older than this
+    __DELETE = 1000    # How many elements to delete per batch
     __create_history = """CREATE TABLE history (
                             id INTEGER PRIMARY KEY,
                             name TEXT NOT NULL,
@@ -38,29 +42,49 @@ class History:
                             loved INT NOT NULL,
                             album_loved INT NOT NULL,
                             album_synced INT NOT NULL,
-                            album_popularity INT NOT NULL)"""
+                            album_popularity INT NOT NULL,
+                            itime INT NOT NULL DEFAULT 0)"""
+    __create_history_idx = """CREATE UNIQUE INDEX idx_history ON history(
+                                                name, duration)"""
+    __create_history_itime_idx = """CREATE INDEX idx_history_itime ON history(
+                                                itime)"""
+    # SQLite default SQLITE_MAX_VARIABLE_NUMBER is 999, two per key
+    __BULK_CHUNK = 499
 
     def __init__(self):
         """
             Init playlists manager
         """
         self.thread_lock = Lock()
+        upgrade = DatabaseHistoryUpgrade()
         # Create db schema
-        try:
-            with SqlCursor(self, True) as sql:
-                sql.execute(self.__create_history)
-        except:
-            pass
-        with SqlCursor(self, True) as sql:
-            result = sql.execute("SELECT COUNT(*)\
-                                  FROM history")
-            v = result.fetchone()
-            if v is not None and v[0] > self.__LIMIT:
-                sql.execute("DELETE FROM history\
-                             WHERE rowid IN (SELECT rowid\
-                                             FROM history\
-                                             LIMIT %s)" % self.__DELETE)
-                sql.execute("VACUUM")
+        f = Gio.File.new_for_path(self.__DB_PATH)
+        if not f.query_exists():
+            try:
+                with SqlCursor(self, True) as sql:
+                    # Must be set before creating tables
+                    sql.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                    sql.execute(self.__create_history)
+                    sql.execute(self.__create_history_idx)
+                    sql.execute(self.__create_history_itime_idx)
+                    sql.execute("PRAGMA user_version=%s" % upgrade.version)
+            except:
+                pass
+        else:
+            upgrade.upgrade(self)
+        self.__prune_thread = None
+
+    def prune(self):
+        """
+            Remove old entries in background:
+            - entries not stored since __MAX_AGE
+            - least recently stored entries above __LIMIT
+        """
+        if self.__prune_thread is not None and self.__prune_thread.is_alive():
+            return
+        self.__prune_thread = Thread(target=self.__prune)
+        self.__prune_thread.daemon = True
+        self.__prune_thread.start()
 
     def add(self, name, duration, popularity, rate, ltime, mtime, loved,
             album_loved, album_popularity, album_rate, album_synced):
@@ -80,25 +104,23 @@ class History:
             @thread safe
         """
         with SqlCursor(self, True) as sql:
-            if self.exists(name, duration):
-                sql.execute("UPDATE history\
-                             SET popularity=?,rate=?,ltime=?,mtime=?,loved=?,\
-                             album_loved=?,album_popularity=?,album_rate=?,\
-                             album_synced=?\
-                             WHERE name=? AND duration=?",
-                            (popularity, rate, ltime, mtime, loved,
-                             album_loved, album_popularity, album_rate,
-                             album_synced,
-                             name, duration))
-            else:
-                sql.execute("INSERT INTO history\
-                             (name, duration, popularity, rate, ltime, mtime,\
-                             loved, album_loved, album_popularity, album_rate,\
-                             album_synced)\
-                             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                            (name, duration, popularity, rate, ltime, mtime,
-                             loved, album_loved, album_popularity, album_rate,
-                             album_synced))
+            sql.execute("INSERT INTO history\
+                         (name, duration, popularity, rate, ltime, mtime,\
+                         loved, album_loved, album_popularity, album_rate,\
+                         album_synced, itime)\
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)\
+                         ON CONFLICT(name, duration) DO UPDATE\
+                         SET popularity=excluded.popularity,\
+                         rate=excluded.rate, ltime=excluded.ltime,\
+                         mtime=excluded.mtime, loved=excluded.loved,\
+                         album_loved=excluded.album_loved,\
+                         album_popularity=excluded.album_popularity,\
+                         album_rate=excluded.album_rate,\
+                         album_synced=excluded.album_synced,\
+                         itime=excluded.itime",
+                        (name, duration, popularity, rate, ltime, mtime,
+                         loved, album_loved, album_popularity, album_rate,
+                         album_synced, int(time())))
 
     def get(self, name, duration):
         """
@@ -122,6 +144,34 @@ class History:
                 return v
             return (0, 0, 0, 0, 0, 0, 0, 0, 0)
 
+    def get_many(self, keys):
+        """
+            Get stats for many tracks at once
+            @param keys as [(str, int)] => (name, duration)
+            @return {(str, int): (int, int, int, int, int, int, int, int, int)}
+            Same values as History.get(), missing keys are not returned
+        """
+        items = {}
+        keys = list(set(keys))
+        with SqlCursor(self) as sql:
+            for i in range(0, len(keys), self.__BULK_CHUNK):
+                chunk = keys[i:i + self.__BULK_CHUNK]
+                values = ",".join(["(?, ?)"] * len(chunk))
+                params = [value for key in chunk for value in key]
+                result = sql.execute("WITH keys(name, duration)\
+                                      AS (VALUES %s)\
+                                      SELECT history.name, history.duration,\
+                                      popularity, rate, ltime, mtime,\
+                                      loved, album_loved, album_popularity,\
+                                      album_rate, album_synced\
+                                      FROM history, keys\
+                                      WHERE history.name=keys.name\
+                                      AND history.duration=keys.duration"
+                                     % values, params)
+                for row in result:
+                    items[(row[0], row[1])] = row[2:]
+        return items
+
     def exists(self, name, duration):
         """
             Return True if entry exists
@@ -153,3 +203,36 @@ class History:
 #######################
 # PRIVATE             #
 #######################
+    def __prune(self):
+        """
+            Delete old entries by small batches, lock is released between
+            batches so scanner is never blocked for long
+            @thread safe
+        """
+        try:
+            with SqlCursor(self) as sql:
+                # Uses idx_history_itime, no full table scan
+                result = sql.execute("SELECT itime FROM history\
+                                      ORDER BY itime DESC\
+                                      LIMIT 1 OFFSET ?", (self.__LIMIT,))
+                v = result.fetchone()
+            cutoff = int(time()) - self.__MAX_AGE
+            if v is not None:
+                cutoff = max(cutoff, v[0])
+            deleted = self.__DELETE
+            while deleted == self.__DELETE:
+                with SqlCursor(self, True) as sql:
+                    result = sql.execute("DELETE FROM history\
+                                          WHERE rowid IN (\
+                                            SELECT rowid FROM history\
+                                            WHERE itime < ?\
+                                            ORDER BY itime\
+                                            LIMIT ?)",
+                                         (cutoff, self.__DELETE))
+                    deleted = result.rowcount
+                    # No-op for databases created without auto_vacuum
+                    sql.execute("PRAGMA incremental_vacuum(%s)"
+                                % self.__DELETE)
+                sleep(0.1)
+        except Exception as e:
+            Logger.error("History::__prune(): %s" % e)
@@ -0,0 +1,218 @@
+# Copyright (c) 2014-2019 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import GLib
+
+import json
+import os
+from threading import Lock
+
+from lollypop.sqlcursor import SqlCursor
+from lollypop.define import App, Generation
+from lollypop.logger import Logger
+
+
+class StatsDatabase:
+    """
+        Playback statistics journal
+        Events are buffered in memory, appended to a WAL file and written
+        to database in one transaction. WAL is replayed on next startup
+        if Lollypop exits before a flush.
+        Events:
+        - ["listened", track_id, time]
+        - ["played", track_id, album_id, album popularity to add,
+           start time, played seconds]
+        @thread safe
+    """
+    __WAL_PATH = GLib.get_user_data_dir() + "/lollypop/stats.wal"
+    # Seconds between an event and the flush
+    __FLUSH_DELAY = 30
+    # Flush at once if this many events are waiting
+    __MAX_EVENTS = 64
+
+    def __init__(self):
+        """
+            Init journal and replay previous WAL
+        """
+        self.__lock = Lock()
+        self.__flush_lock = Lock()
+        self.__events = []
+        self.__timeout_id = None
+        self.__fd = None
+        try:
+            self.__fd = os.open(self.__WAL_PATH,
+                                os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+            self.__replay()
+        except Exception as e:
+            Logger.error("StatsDatabase::__init__(): %s", e)
+        if self.__events:
+            self.__schedule_flush()
+
+    def add_listened(self, track_id, time):
+        """
+            Set ltime for track
+            @param track_id as int
+            @param time as int
+        """
+        self.__add(["listened", track_id, time])
+
+    def add_played(self, track_id, album_id, pop_to_add, start_time, played):
+        """
+            Increment popularity for track and album, add play to history
+            @param track_id as int
+            @param album_id as int
+            @param pop_to_add as int
+            @param start_time as int
+            @param played as int (seconds)
+        """
+        self.__add(["played", track_id, album_id, pop_to_add,
+                    start_time, played])
+
+    def flush(self):
+        """
+            Write pending events to database
+            @return True if nothing is pending
+        """
+        with self.__flush_lock:
+            with self.__lock:
+                if self.__timeout_id is not None:
+                    GLib.source_remove(self.__timeout_id)
+                    self.__timeout_id = None
+                events = self.__events
+                self.__events = []
+            if not events:
+                return True
+            try:
+                self.__write(events)
+            except Exception as e:
+                Logger.error("StatsDatabase::flush(): %s", e)
+                with self.__lock:
+                    self.__events = events + self.__events
+                    self.__schedule_flush()
+                return False
+            with self.__lock:
+                self.__rewrite_wal()
+            return True
+
+#######################
+# PRIVATE             #
+#######################
+    def __add(self, event):
+        """
+            Add event to journal
+            @param event as list
+        """
+        with self.__lock:
+            self.__events.append(event)
+            try:
+                if self.__fd is not None:
+                    os.write(self.__fd,
+                             (json.dumps(event) + "\n").encode("utf-8"))
+            except Exception as e:
+                Logger.error("StatsDatabase::__add(): %s", e)
+            if len(self.__events) >= self.__MAX_EVENTS:
+                App().task_helper.run(self.flush)
+            else:
+                self.__schedule_flush()
+
+    def __schedule_flush(self):
+        """
+            Flush later, lock must be held
+        """
+        if self.__timeout_id is None:
+            self.__timeout_id = GLib.timeout_add_seconds(self.__FLUSH_DELAY,
+                                                         self.__on_timeout)
+
+    def __replay(self):
+        """
+            Load events from WAL
+        """
+        data = b""
+        while True:
+            chunk = os.pread(self.__fd, 65536, len(data))
+            if not chunk:
+                break
+            data += chunk
+        for line in data.decode("utf-8", "replace").splitlines():
+            try:
+                self.__events.append(json.loads(line))
+            except ValueError:
+                # Interrupted write
+                pass
+        # Drop interrupted writes
+        self.__rewrite_wal()
+
+    def __rewrite_wal(self):
+        """
+            Keep only pending events in WAL, lock must be held
+        """
+        if self.__fd is None:
+            return
+        try:
+            os.ftruncate(self.__fd, 0)
+            if self.__events:
+                data = "".join(json.dumps(event) + "\n"
+                               for event in self.__events)
+                os.write(self.__fd, data.encode("utf-8"))
+        except Exception as e:
+            Logger.error("StatsDatabase::__rewrite_wal(): %s", e)
+
+    def __write(self, events):
+        """
+            Write events in one transaction
+            Plays are unique for (track_id, time), so a replayed event is
+            not counted twice
+            @param events as [list]
+        """
+        listened = {}
+        tracks = {}
+        albums = {}
+        with SqlCursor(App().db, True) as sql:
+            for event in events:
+                if event[0] == "listened":
+                    (track_id, time) = event[1:]
+                    listened[track_id] = max(time,
+                                             listened.get(track_id, 0))
+                elif event[0] == "played":
+                    (track_id, album_id, pop_to_add,
+                     start_time, played) = event[1:]
+                    result = sql.execute("INSERT OR IGNORE INTO plays\
+                                          (track_id, album_id, popularity,\
+                                           time, duration)\
+                                          VALUES (?, ?, ?, ?, ?)",
+                                         (track_id, album_id, pop_to_add,
+                                          start_time, played))
+                    if result.rowcount != 1:
+                        continue
+                    tracks[track_id] = tracks.get(track_id, 0) + 1
+                    albums[album_id] = albums.get(album_id, 0) + pop_to_add
+            sql.executemany("UPDATE tracks SET ltime=? WHERE rowid=?",
+                            [(time, track_id)
+                             for (track_id, time) in listened.items()])
+            sql.executemany("UPDATE tracks\
+                             SET popularity=popularity+? WHERE rowid=?",
+                            [(pop, track_id)
+                             for (track_id, pop) in tracks.items()])
+            sql.executemany("UPDATE albums\
+                             SET popularity=popularity+? WHERE rowid=?",
+                            [(pop, album_id)
+                             for (album_id, pop) in albums.items()])
+        if tracks or albums:
+            App().db.bump_generation(Generation.POPULARITY)
+
+    def __on_timeout(self):
+        """
+            Flush in a thread, scanner may hold database
+        """
+        with self.__lock:
+            self.__timeout_id = None
+        App().task_helper.run(self.flush)
@@ -15,7 +15,7 @@ from gettext import gettext as _
 import itertools
 
 from lollypop.sqlcursor import SqlCursor
-from lollypop.define import App, OrderBy
+from lollypop.define import App, OrderBy, Generation
 from lollypop.utils import noaccents, get_network_available, remove_static
 
 
@@ -357,6 +357,7 @@ class TracksDatabase:
             sql.execute("UPDATE tracks SET rate=?\
                          WHERE rowid=?",
                         (rate, track_id))
+        App().db.bump_generation(Generation.RATE)
 
     def get_album_id(self, track_id):
         """
@@ -772,33 +773,18 @@ class TracksDatabase:
                 return v[0]
             return 5
 
-    def set_more_popular(self, track_id):
+    def get_playback_stats(self):
         """
-            Increment popularity field
-            @param track_id as int
-            @raise sqlite3.OperationalError on db update
-        """
-        with SqlCursor(App().db, True) as sql:
-            result = sql.execute("SELECT popularity from tracks WHERE rowid=?",
-                                 (track_id,))
-            pop = result.fetchone()
-            if pop:
-                current = pop[0]
-            else:
-                current = 0
-            current += 1
-            sql.execute("UPDATE tracks set popularity=? WHERE rowid=?",
-                        (current, track_id))
-
-    def set_listened_at(self, track_id, time):
+            Get stats used to weight tracks, ignored tracks excluded
+            @return [(track_id as int, album_id as int, popularity as int,
+                      rate as int, loved as int, ltime as int)]
         """
-            Set ltime for track
-            @param track_id as int
-            @param time as int
-        """
-        with SqlCursor(App().db, True) as sql:
-            sql.execute("UPDATE tracks set ltime=? WHERE rowid=?",
-                        (time, track_id))
+        with SqlCursor(App().db) as sql:
+            result = sql.execute("SELECT rowid, album_id, popularity,\
+                                  rate, loved, ltime\
+                                  FROM tracks\
+                                  WHERE mtime!=0 AND loved!=-1")
+            return list(result)
 
     def get_never_listened_to(self):
         """
@@ -854,6 +840,7 @@ class TracksDatabase:
         with SqlCursor(App().db, True) as sql:
             sql.execute("UPDATE tracks set popularity=? WHERE rowid=?",
                         (popularity, track_id))
+        App().db.bump_generation(Generation.POPULARITY)
 
     def get_popularity(self, track_id):
         """
@@ -958,6 +945,9 @@ class TracksDatabase:
             sql.execute("DELETE FROM track_genres\
                          WHERE track_genres.track_id NOT IN (\
                             SELECT tracks.rowid FROM tracks)")
+            sql.execute("DELETE FROM plays\
+                         WHERE plays.track_id NOT IN (\
+                            SELECT tracks.rowid FROM tracks)")
 
     def search(self, searched):
         """
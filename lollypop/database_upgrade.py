@@ -17,7 +17,6 @@ from time import time
 
 from lollypop.sqlcursor import SqlCursor
 from lollypop.utils import translate_artist_name
-from lollypop.database_history import History
 from lollypop.radios import Radios
 from lollypop.define import App, Type
 from lollypop.logger import Logger
@@ -90,6 +89,8 @@ class DatabasePlaylistsUpgrade(DatabaseUpgrade):
            2: "ALTER TABLE playlists ADD smart_enabled INT NOT NULL DEFAULT 0",
            3: "ALTER TABLE playlists ADD smart_sql TEXT",
            4: self.__upgrade_4,
+           5: self.__upgrade_5,
+           6: "ALTER TABLE playlists ADD smart_rules TEXT",
         }
 
 #######################
@@ -108,6 +109,65 @@ class DatabasePlaylistsUpgrade(DatabaseUpgrade):
                     sql2.execute("UPDATE tracks SET loved=1 WHERE uri=?",
                                  (uri,))
 
+    def __upgrade_5(self, db):
+        """
+            Add position and cached track id to playlist tracks
+        """
+        from lollypop.playlists import Playlists
+        with SqlCursor(db, True) as sql:
+            sql.execute("ALTER TABLE tracks ADD position INT NOT NULL\
+                         DEFAULT 0")
+            sql.execute("ALTER TABLE tracks ADD track_id INT")
+            # Keep current order, rowid is insertion order
+            sql.execute("UPDATE tracks SET position=rowid*?",
+                        (Playlists.POSITION_GAP,))
+            sql.execute("UPDATE tracks SET track_id=(\
+                            SELECT music.tracks.rowid\
+                            FROM music.tracks\
+                            WHERE music.tracks.uri=main.tracks.uri)")
+            sql.execute("CREATE index idx_pt ON tracks(playlist_id, position)")
+            sql.execute("CREATE index idx_pu ON tracks(uri)")
+
+
+class DatabaseHistoryUpgrade(DatabaseUpgrade):
+    """
+        Manage database schema upgrades
+    """
+
+    def __init__(self):
+        """
+            Init upgrade
+        """
+        DatabaseUpgrade.__init__(self)
+        self._UPGRADES = {
+           1: self.__upgrade_1,
+           2: self.__upgrade_2,
+        }
+
+#######################
+# PRIVATE             #
+#######################
+    def __upgrade_1(self, db):
+        """
+            Remove duplicates and add an unique index on (name, duration)
+        """
+        with SqlCursor(db, True) as sql:
+            sql.execute("DELETE FROM history\
+                         WHERE rowid NOT IN (SELECT MAX(rowid)\
+                                             FROM history\
+                                             GROUP BY name, duration)")
+            sql.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_history\
+                         ON history(name, duration)")
+
+    def __upgrade_2(self, db):
+        """
+            Add insert time, current entries are considered as new
+        """
+        with SqlCursor(db, True) as sql:
+            sql.execute("ALTER TABLE history ADD itime INT NOT NULL DEFAULT 0")
+            sql.execute("UPDATE history SET itime=?", (int(time()),))
+            sql.execute("CREATE INDEX idx_history_itime ON history(itime)")
+
 
 class DatabaseAlbumsUpgrade(DatabaseUpgrade):
     """
@@ -155,6 +215,9 @@ class DatabaseAlbumsUpgrade(DatabaseUpgrade):
             33: "ALTER TABLE artists ADD mb_artist_id TEXT",
             34: self.__upgrade_31,
             35: "UPDATE albums SET synced=2 WHERE synced=1",
+            36: "CREATE index idx_tu ON tracks(uri)",
+            37: "ALTER TABLE albums ADD embedded_artwork TEXT",
+            38: self.__upgrade_38,
         }
 
 #######################
@@ -328,6 +391,7 @@ class DatabaseAlbumsUpgrade(DatabaseUpgrade):
         """
             Upgrade history
         """
+        from lollypop.database_history import History
         with SqlCursor(History()) as sql:
             sql.execute("ALTER TABLE history ADD loved_album\
                         INT NOT NULL DEFAULT 0")
@@ -336,6 +400,7 @@ class DatabaseAlbumsUpgrade(DatabaseUpgrade):
         """
             Upgrade history
         """
+        from lollypop.database_history import History
         with SqlCursor(History()) as sql:
             try:
                 sql.execute("ALTER TABLE history ADD album_rate\
@@ -645,3 +710,16 @@ class DatabaseAlbumsUpgrade(DatabaseUpgrade):
             f.delete(None)
         except Exception as e:
             Logger.error("DatabaseAlbumsUpgrade::__upgrade_31(): %s", e)
+
+    def __upgrade_38(self, db):
+        """
+            Add plays history
+        """
+        with SqlCursor(db, True) as sql:
+            sql.execute("CREATE TABLE plays (id INTEGER PRIMARY KEY,\
+                                             track_id INT NOT NULL,\
+                                             album_id INT NOT NULL,\
+                                             popularity INT NOT NULL,\
+                                             time INT NOT NULL,\
+                                             duration INT NOT NULL)")
+            sql.execute("CREATE unique index idx_pt ON plays(track_id, time)")
@@ -54,6 +54,8 @@ class ArtBehaviour:
     CROP_SQUARE = 1 << 9
     CACHE = 1 << 10
     NO_CACHE = 1 << 11
+    # Background cache generation: no download, no memory cache
+    PREWARM = 1 << 12
 
 
 class ViewType:
@@ -121,6 +123,12 @@ class ScanType:
     FULL = 2
 
 
+class Generation:
+    COLLECTION = 1 << 0  # Tracks added/removed/updated by scanner
+    RATE = 1 << 1
+    POPULARITY = 1 << 2
+
+
 class SidebarContent:
     DEFAULT = 0
     GENRES = 1
@@ -21,23 +21,32 @@ from lollypop.utils import get_network_available, noaccents
 from lollypop.logger import Logger
 from lollypop.objects import Album
 from lollypop.downloader import Downloader
+from lollypop.downloader_pool import PoolDownloader
 from lollypop.helper_task import TaskHelper
 
 
 class ArtDownloader(Downloader):
     """
         Download art from the web
+        Albums and artists are cached concurrently by a pool of workers
     """
+    # Minimal interval between two requests to a web service (seconds)
+    __RATES = {"AudioDB": 0.5,
+               "Deezer": 0.2,
+               "Spotify": 0.2,
+               "Itunes": 3,
+               "Last.fm": 0.2}
 
     def __init__(self):
         """
             Init art downloader
         """
         Downloader.__init__(self)
-        self.__albums_queue = []
-        self.__albums_history = []
-        self.__in_albums_download = False
-        self.__cache_artists_running = False
+        self.__pool = PoolDownloader(
+            GLib.get_user_cache_dir() + "/lollypop/art_downloads.json",
+            self.__cache_artwork)
+        for (api, interval) in self.__RATES.items():
+            self.__pool.set_rate(api, interval)
 
     def search_album_artworks(self, artist, album, cancellable):
         """
@@ -79,20 +88,16 @@ class ArtDownloader(Downloader):
             Download album artwork
             @param album_id as int
         """
-        if album_id in self.__albums_history or\
-                not get_network_available("DATA"):
+        if not get_network_available("DATA"):
             return
-        self.__albums_queue.append(album_id)
-        if not self.__in_albums_download:
-            App().task_helper.run(self.__cache_albums_art)
+        self.__pool.add(["album", album_id])
 
     def cache_artists_artwork(self):
         """
             Cache info for all artists
         """
-        if self.__cache_artists_running or not get_network_available("DATA"):
+        if not get_network_available("DATA"):
             return
-        self.__cache_artists_running = True
         App().task_helper.run(self.__cache_artists_artwork)
 
     def search_artwork_from_google(self, search, cancellable):
@@ -135,7 +140,20 @@ class ArtDownloader(Downloader):
         """
             Reset download history
         """
-        self.__albums_history = []
+        self.__pool.reset()
+
+    def resume_downloads(self):
+        """
+            Run downloads saved on previous run
+        """
+        if get_network_available("DATA"):
+            self.__pool.start()
+
+    def save_downloads(self):
+        """
+            Save pending downloads, they will be resumed on next run
+        """
+        self.__pool.save()
 
 #######################
 # PROTECTED           #
@@ -397,7 +415,7 @@ class ArtDownloader(Downloader):
             credentials = "%s:%s" % (SPOTIFY_CLIENT_ID, SPOTIFY_SECRET)
             encoded = b64encode(credentials.encode("utf-8"))
             credentials = encoded.decode("utf-8")
-            session = Soup.Session.new()
+            session = TaskHelper.get_session()
             data = {"grant_type": "client_credentials"}
             msg = Soup.form_request_new_from_hash("POST", token_uri, data)
             msg.request_headers.append("Authorization",
@@ -413,65 +431,86 @@ class ArtDownloader(Downloader):
 
     def __cache_artists_artwork(self):
         """
-            Cache artwork for all artists
+            Queue artists without artwork
         """
-        # Then cache for lastfm/spotify/deezer/...
         for (artist_id, artist, sort) in App().artists.get([]):
-            if App().art.artist_artwork_exists(artist)[0]:
-                continue
-            for (api, helper, a_helper, b_helper) in self._WEBSERVICES:
-                if helper is None:
-                    continue
-                try:
-                    method = getattr(self, helper)
-                    uri = method(artist)
-                    if uri is not None:
-                        (status,
-                         data) = App().task_helper.load_uri_content_sync(uri,
-                                                                         None)
-                        if status:
-                            App().art.add_artist_artwork(artist, data)
-                            break
-                except Exception as e:
-                    Logger.error(
-                        "ArtDownloader::__cache_artists_artwork(): %s" % e)
-                    App().art.add_artist_artwork(artist, None)
-        self.__cache_artists_running = False
+            if not App().art.artist_artwork_exists(artist)[0]:
+                self.__pool.add(["artist", artist], False)
 
-    def __cache_albums_art(self):
+    def __cache_artwork(self, job):
         """
-            Cache albums artwork (from queue)
+            Run a pool job
+            @param job as [str, int/str]
+            @return True if found, False if not found, None if obsolete
             @thread safe
         """
-        self.__in_albums_download = True
-        try:
-            while self.__albums_queue:
-                album_id = self.__albums_queue.pop()
-                album = App().albums.get_name(album_id)
-                artist_ids = App().albums.get_artist_ids(album_id)
-                is_compilation = artist_ids and\
-                    artist_ids[0] == Type.COMPILATIONS
-                if is_compilation:
-                    artist = ""
-                else:
-                    artist = ", ".join(App().albums.get_artists(album_id))
-                for (api, a_helper, helper, b_helper) in self._WEBSERVICES:
-                    if helper is None:
-                        continue
-                    method = getattr(self, helper)
-                    uri = method(artist, album)
-                    if uri is not None:
-                        (status,
-                         data) = App().task_helper.load_uri_content_sync(uri,
-                                                                         None)
-                        if status:
-                            self.__albums_history.append(album_id)
-                            App().art.save_album_artwork(data, Album(album_id))
-                            break
-        except Exception as e:
-            Logger.error("ArtDownloader::__cache_albums_art: %s" % e)
-        self.__albums_history.append(album_id)
-        self.__in_albums_download = False
+        (kind, value) = job
+        if kind == "album":
+            return self.__cache_album_artwork(value)
+        else:
+            return self.__cache_artist_artwork(value)
+
+    def __cache_artist_artwork(self, artist):
+        """
+            Cache artwork for artist
+            @param artist as str
+            @return True if found, False if not found, None if obsolete
+        """
+        if App().art.artist_artwork_exists(artist)[0]:
+            return None
+        for (api, helper, a_helper, b_helper) in self._WEBSERVICES:
+            if helper is None:
+                continue
+            try:
+                method = getattr(self, helper)
+                self.__pool.throttle(api)
+                uri = method(artist)
+                if uri is not None:
+                    (status,
+                     data) = App().task_helper.load_uri_content_sync(uri,
+                                                                     None)
+                    if status:
+                        App().art.add_artist_artwork(artist, data)
+                        return True
+            except Exception as e:
+                Logger.error(
+                    "ArtDownloader::__cache_artist_artwork(): %s" % e)
+                App().art.add_artist_artwork(artist, None)
+        return False
+
+    def __cache_album_artwork(self, album_id):
+        """
+            Cache artwork for album
+            @param album_id as int
+            @return True if found, False if not found, None if obsolete
+        """
+        album = App().albums.get_name(album_id)
+        if album is None:
+            return None
+        artist_ids = App().albums.get_artist_ids(album_id)
+        is_compilation = artist_ids and\
+            artist_ids[0] == Type.COMPILATIONS
+        if is_compilation:
+            artist = ""
+        else:
+            artist = ", ".join(App().albums.get_artists(album_id))
+        for (api, a_helper, helper, b_helper) in self._WEBSERVICES:
+            if helper is None:
+                continue
+            try:
+                method = getattr(self, helper)
+                self.__pool.throttle(api)
+                uri = method(artist, album)
+                if uri is not None:
+                    (status,
+                     data) = App().task_helper.load_uri_content_sync(uri,
+                                                                     None)
+                    if status:
+                        App().art.save_album_artwork(data, Album(album_id))
+                        return True
+            except Exception as e:
+                Logger.error("ArtDownloader::__cache_album_artwork: %s" % e)
+        return False
 
     def __on_load_google_content(self, uri, loaded, content):
         """
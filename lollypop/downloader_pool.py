@@ -0,0 +1,214 @@
+# Copyright (c) 2014-2019 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+from threading import Thread, Lock, Condition
+from time import time, sleep
+
+from lollypop.logger import Logger
+
+
+class PoolDownloader:
+    """
+        Run download jobs with a pool of threads
+        - a job is a JSON serializable list, ex: ["album", 12]
+        - identical jobs are merged
+        - jobs not found are not run again before ttl
+        - requests to a web service are spaced by its rate limit
+        - pending jobs are saved and resumed on next run
+        @thread safe
+    """
+
+    def __init__(self, path, handler, workers=4, ttl=3 * 24 * 3600):
+        """
+            Init pool
+            @param path as str
+            @param handler as function
+            @param workers as int
+            @param ttl as int (seconds)
+            @handler (job as list) -> True if found, False if not found,
+                None if job is obsolete
+        """
+        self.__path = path
+        self.__handler = handler
+        self.__workers = workers
+        self.__ttl = ttl
+        self.__lock = Lock()
+        self.__condition = Condition(self.__lock)
+        self.__started = 0
+        self.__idle = 0
+        # Last item is next job
+        self.__pending = []
+        self.__running = []
+        # Job key: time when not found
+        self.__not_found = {}
+        # Service: minimal interval between requests
+        self.__rates = {}
+        # Service: next allowed request time
+        self.__next = {}
+        self.__load()
+
+    def set_rate(self, service, interval):
+        """
+            Space requests to service
+            @param service as str
+            @param interval as float (seconds)
+        """
+        with self.__lock:
+            self.__rates[service] = interval
+
+    def throttle(self, service):
+        """
+            Wait before sending a request to service
+            @param service as str
+        """
+        with self.__lock:
+            now = time()
+            interval = self.__rates.get(service, 0)
+            slot = max(now, self.__next.get(service, 0))
+            # Reserve slot, other workers get following ones
+            self.__next[service] = slot + interval
+        if slot > now:
+            sleep(slot - now)
+
+    def add(self, job, priority=True):
+        """
+            Add a job, ignored if already queued, running or not found
+            @param job as list
+            @param priority as bool: run it before other jobs
+        """
+        with self.__lock:
+            if job in self.__running or self.__is_not_found(job):
+                return
+            if job in self.__pending:
+                if not priority:
+                    return
+                self.__pending.remove(job)
+            if priority:
+                self.__pending.append(job)
+            else:
+                self.__pending.insert(0, job)
+            self.__start_worker()
+
+    def start(self):
+        """
+            Run pending jobs, ex: jobs restored from disk
+        """
+        with self.__lock:
+            for i in range(min(len(self.__pending), self.__workers)):
+                self.__start_worker()
+
+    def reset(self):
+        """
+            Forget about jobs not found
+        """
+        with self.__lock:
+            self.__not_found = {}
+
+    def save(self):
+        """
+            Save pending jobs and jobs not found
+        """
+        with self.__lock:
+            now = time()
+            state = {"pending": self.__pending + self.__running,
+                     "not_found": {key: t for (key, t)
+                                   in self.__not_found.items()
+                                   if now - t < self.__ttl}}
+        try:
+            tmp_path = self.__path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.__path)
+        except Exception as e:
+            Logger.error("PoolDownloader::save(): %s", e)
+
+    @property
+    def pending(self):
+        """
+            Get queued and running jobs count
+            @return int
+        """
+        with self.__lock:
+            return len(self.__pending) + len(self.__running)
+
+#######################
+# PRIVATE             #
+#######################
+    def __load(self):
+        """
+            Load state from disk
+        """
+        try:
+            with open(self.__path, "r") as f:
+                state = json.load(f)
+            self.__pending = state["pending"]
+            self.__not_found = state["not_found"]
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            Logger.warning("PoolDownloader::__load(): %s", e)
+
+    def __is_not_found(self, job):
+        """
+            True if job has been run recently without result
+            @param job as list
+            @return bool
+        """
+        key = json.dumps(job)
+        t = self.__not_found.get(key, None)
+        if t is None:
+            return False
+        if time() - t < self.__ttl:
+            return True
+        del self.__not_found[key]
+        return False
+
+    def __start_worker(self):
+        """
+            Start a worker if needed, lock must be held
+        """
+        if self.__idle:
+            self.__condition.notify()
+        # Idle workers may not be awake yet
+        if len(self.__pending) > self.__idle and\
+                self.__started < self.__workers:
+            self.__started += 1
+            thread = Thread(target=self.__worker)
+            thread.daemon = True
+            thread.start()
+
+    def __worker(self):
+        """
+            Run jobs, exit when idle
+        """
+        while True:
+            with self.__lock:
+                if not self.__pending:
+                    self.__idle += 1
+                    self.__condition.wait(30)
+                    self.__idle -= 1
+                if not self.__pending:
+                    self.__started -= 1
+                    return
+                job = self.__pending.pop()
+                self.__running.append(job)
+            found = None
+            try:
+                found = self.__handler(job)
+            except Exception as e:
+                Logger.error("PoolDownloader::__worker(): %s -> %s", e, job)
+            with self.__lock:
+                self.__running.remove(job)
+                if found is False:
+                    self.__not_found[json.dumps(job)] = time()
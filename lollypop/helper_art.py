@@ -13,21 +13,77 @@
 from gi.repository import GObject, GLib, Gtk, Gdk
 
 import cairo
+from os import cpu_count, setpriority, PRIO_PROCESS
+from queue import PriorityQueue
+from threading import Thread, Lock, current_thread, get_native_id
+from itertools import count
+from time import time, sleep
 
-from lollypop.define import App, ArtBehaviour
+from lollypop.define import App, ArtBehaviour, ArtSize
+from lollypop.objects import Album
+from lollypop.logger import Logger
 from lollypop.utils import get_round_surface
 
 
 class ArtHelper(GObject.Object):
     """
         Helper to load artwork smoothly
+        Artwork is loaded by a fixed pool of workers:
+        - mapped widgets are served first, requests follow widget
+          map/unmap while pending
+        - requests for destroyed widgets are dropped
+        - identical requests are merged, even while loading
+        After a scan, missing album artwork cache entries are generated in
+        background, see prewarm()
     """
+    __WORKERS = max(2, min(4, (cpu_count() or 2) // 2))
+    __VISIBLE = 0
+    __HIDDEN = 1
+    # Seconds without prewarming after user/player activity
+    __PREWARM_PAUSE = 2
+    # Prewarm may use this ratio of time
+    __PREWARM_DUTY = 0.25
 
     def __init__(self):
         """
             Init helper
         """
         GObject.Object.__init__(self)
+        self.__queue = PriorityQueue()
+        self.__counter = count()
+        self.__lock = Lock()
+        # (type, object id, width, height, scale, effect): request
+        self.__requests = {}
+        # widget: [signal ids, pending requests]
+        self.__widgets = {}
+        for i in range(self.__WORKERS):
+            thread = Thread(target=self.__worker)
+            thread.daemon = True
+            thread.start()
+        self.__prewarm_thread = None
+        self.__prewarm_paused_until = 0
+        App().scanner.connect("scan-finished", self.__on_scan_finished)
+        App().player.connect("current-changed", self.__on_player_activity)
+        App().player.connect("loading-changed", self.__on_player_activity)
+
+    def prewarm(self, scale_factor):
+        """
+            Generate missing album artwork cache entries in background,
+            for sizes used by album views
+            @param scale_factor as int
+        """
+        sizes = [ArtSize.BIG, ArtSize.BANNER, ArtSize.MEDIUM]
+        album_ids = App().albums.get_ids([], [])
+        self.__prewarm_thread = Thread(target=self.__prewarm,
+                                       args=(album_ids, sizes, scale_factor))
+        self.__prewarm_thread.daemon = True
+        self.__prewarm_thread.start()
+
+    def pause_prewarm(self):
+        """
+            Pause prewarm, user is doing something
+        """
+        self.__prewarm_paused_until = time() + self.__PREWARM_PAUSE
 
     def set_frame(self, image, frame, width, height):
         """
@@ -59,19 +115,10 @@ class ArtHelper(GObject.Object):
             @param effect as ArtBehaviour
             @param callback as function
         """
-        App().task_helper.run(self.__get_album_artwork,
-                              album,
-                              width,
-                              height,
-                              scale_factor,
-                              effect,
-                              callback=(self._on_get_artwork_pixbuf,
-                                        width,
-                                        height,
-                                        scale_factor,
-                                        effect,
-                                        callback,
-                                        *args))
+        self.__add_request(("album", album.id, width, height,
+                            scale_factor, effect),
+                           self.__get_album_artwork, album,
+                           callback, args)
 
     def set_radio_artwork(self, radio, width, height, scale_factor,
                           effect, callback, *args):
@@ -84,19 +131,10 @@ class ArtHelper(GObject.Object):
             @param effect as ArtBehaviour
             @param callback as function
         """
-        App().task_helper.run(self.__get_radio_artwork,
-                              radio,
-                              width,
-                              height,
-                              scale_factor,
-                              effect,
-                              callback=(self._on_get_artwork_pixbuf,
-                                        width,
-                                        height,
-                                        scale_factor,
-                                        effect,
-                                        callback,
-                                        *args))
+        self.__add_request(("radio", radio, width, height,
+                            scale_factor, effect),
+                           self.__get_radio_artwork, radio,
+                           callback, args)
 
     def set_artist_artwork(self, artist, width, height, scale_factor,
                            effect, callback, *args):
@@ -109,62 +147,197 @@ class ArtHelper(GObject.Object):
             @param effect as ArtBehaviour
             @param callback as function
         """
-        App().task_helper.run(self.__get_artist_artwork,
-                              artist,
-                              width,
-                              height,
-                              scale_factor,
-                              effect,
-                              callback=(self._on_get_artwork_pixbuf,
-                                        width,
-                                        height,
-                                        scale_factor,
-                                        effect,
-                                        callback,
-                                        *args))
+        self.__add_request(("artist", artist, width, height,
+                            scale_factor, effect),
+                           self.__get_artist_artwork, artist,
+                           callback, args)
 
 #######################
 # PROTECTED           #
 #######################
-    def _on_get_artwork_pixbuf(self, pixbuf, width, height, scale_factor,
-                               effect, callback, *args):
+    def _on_get_artwork_pixbuf(self, pixbuf, request):
         """
             Transform pixbuf to surface and load surface effects
             @param pixbuf as Gdk.Pixbuf
-            @param size as int
-            @param scale_factor as int
-            @param effect as ArtBehaviour
-            @param callback as function
+            @param request as dict
         """
-        surface = None
-        if pixbuf is not None:
-            if effect & ArtBehaviour.ROUNDED:
-                radius = pixbuf.get_width() / 2
-                surface = get_round_surface(pixbuf, scale_factor, radius)
-            else:
-                surface = Gdk.cairo_surface_create_from_pixbuf(
-                        pixbuf, scale_factor, None)
-        App().task_helper.run(self.__surface_effects, surface, width, height,
-                              scale_factor, effect, callback, *args)
+        (t, object_id, width, height, scale_factor, effect) = request["key"]
+        with self.__lock:
+            callbacks = list(request["callbacks"])
+            if self.__requests.get(request["key"], None) is request:
+                del self.__requests[request["key"]]
+        for (callback, args, widget) in callbacks:
+            surface = None
+            if pixbuf is not None:
+                if effect & ArtBehaviour.ROUNDED:
+                    radius = pixbuf.get_width() / 2
+                    surface = get_round_surface(pixbuf, scale_factor, radius)
+                else:
+                    surface = Gdk.cairo_surface_create_from_pixbuf(
+                            pixbuf, scale_factor, None)
+            self.__surface_effects(surface, effect)
+            callback(surface, *args)
+        for (callback, args, widget) in callbacks:
+            self.__release_widget(widget, request)
 
 #######################
 # PRIVATE             #
 #######################
-    def __surface_effects(self, surface, width, height, scale_factor,
-                          effect, callback, *args):
+    def __add_request(self, key, loader, obj, callback, args):
+        """
+            Queue a new artwork request, merge it with a pending one
+            @param key as tuple
+            @param loader as function
+            @param obj as Album/str
+            @param callback as function
+            @param args as tuple
+        """
+        widget = getattr(callback, "__self__", None)
+        if isinstance(widget, Gtk.Widget):
+            priority = self.__VISIBLE if widget.get_mapped() else\
+                self.__HIDDEN
+            if widget not in self.__widgets.keys():
+                self.__widgets[widget] = [
+                    [widget.connect("destroy", self.__on_widget_destroy),
+                     widget.connect("map", self.__on_widget_map),
+                     widget.connect("unmap", self.__on_widget_map)], []]
+        else:
+            widget = None
+            priority = self.__VISIBLE
+        with self.__lock:
+            request = self.__requests.get(key, None)
+            if request is None:
+                request = {"key": key,
+                           "loader": loader,
+                           "object": obj,
+                           "callbacks": [],
+                           "priority": priority,
+                           "index": None,
+                           "started": False}
+                self.__requests[key] = request
+            request["callbacks"].append((callback, args, widget))
+            if widget is not None:
+                self.__widgets[widget][1].append(request)
+            # In flight, callback is run when loaded
+            if request["started"]:
+                return
+            if request["index"] is not None and\
+                    request["priority"] <= priority:
+                return
+            entry = self.__set_priority(request, priority)
+        self.__queue.put(entry)
+
+    def __set_priority(self, request, priority):
+        """
+            Set request priority, lock must be held
+            Previous queue entry for request is then ignored by workers
+            @param request as dict
+            @param priority as int
+            @return queue entry as (int, int, dict)
+        """
+        request["priority"] = priority
+        request["index"] = next(self.__counter)
+        return (priority, request["index"], request)
+
+    def __worker(self):
+        """
+            Load requests from queue
+        """
+        while True:
+            (priority, index, request) = self.__queue.get()
+            with self.__lock:
+                # Already handled or priority changed since
+                if request["started"] or request["index"] != index:
+                    continue
+                request["started"] = True
+                # Cancelled
+                if not request["callbacks"]:
+                    if self.__requests.get(request["key"], None) is request:
+                        del self.__requests[request["key"]]
+                    continue
+            (t, obj_id, width, height, scale_factor, effect) = request["key"]
+            try:
+                pixbuf = request["loader"](request["object"], width, height,
+                                           scale_factor, effect)
+            except Exception as e:
+                Logger.error("ArtHelper::__worker(): %s", e)
+                pixbuf = None
+            GLib.idle_add(self._on_get_artwork_pixbuf, pixbuf, request)
+
+    def __release_widget(self, widget, request):
+        """
+            Forget widget if no more requests are pending for it
+            @param widget as Gtk.Widget/None
+            @param request as dict
+        """
+        if widget not in self.__widgets.keys():
+            return
+        (signal_ids, requests) = self.__widgets[widget]
+        requests.remove(request)
+        if not requests:
+            for signal_id in signal_ids:
+                widget.disconnect(signal_id)
+            del self.__widgets[widget]
+
+    def __prewarm(self, album_ids, sizes, scale_factor):
+        """
+            Generate missing album artwork cache entries
+            @param album_ids as [int]
+            @param sizes as [int]
+            @param scale_factor as int
+        """
+        thread = current_thread()
+        try:
+            # Lowest CPU priority for this thread only (Linux)
+            setpriority(PRIO_PROCESS, get_native_id(), 19)
+        except Exception as e:
+            Logger.debug("ArtHelper::__prewarm(): %s", e)
+        for album_id in album_ids:
+            # Wait for user, player, scanner and artwork requests
+            while self.__prewarm_thread == thread and (
+                    time() < self.__prewarm_paused_until or
+                    App().scanner.is_locked() or
+                    not self.__queue.empty()):
+                sleep(self.__PREWARM_PAUSE / 4)
+            if self.__prewarm_thread != thread:
+                return
+            start = time()
+            try:
+                App().art.prewarm_album_artwork(Album(album_id),
+                                                sizes, scale_factor)
+            except Exception as e:
+                Logger.error("ArtHelper::__prewarm(): %s", e)
+            # Throttle CPU and IO usage
+            elapsed = time() - start
+            sleep(elapsed * (1 - self.__PREWARM_DUTY) / self.__PREWARM_DUTY)
+        if self.__prewarm_thread == thread:
+            self.__prewarm_thread = None
+
+    def __on_scan_finished(self, scanner, modifications):
+        """
+            Prewarm artwork cache
+            @param scanner as CollectionScanner
+            @param modifications as bool
+        """
+        self.prewarm(App().window.get_scale_factor())
+
+    def __on_player_activity(self, player, *ignore):
+        """
+            Player needs disk, pause prewarm
+            @param player as Player
+        """
+        self.pause_prewarm()
+
+    def __surface_effects(self, surface, effect):
         """
             Load surface effects
             @param surface as cairo.Surface
-            @param size as int
-            @param scale_factor as int
             @param effect as ArtBehaviour
-            @param callback as function
         """
         if effect & ArtBehaviour.DARKER:
             self.__set_color(surface, 0, 0, 0)
         if effect & ArtBehaviour.LIGHTER:
             self.__set_color(surface, 1, 1, 1)
-        GLib.idle_add(callback, surface, *args)
 
     def __set_color(self, surface, r, g, b):
         """
@@ -181,6 +354,39 @@ class ArtHelper(GObject.Object):
             ctx.set_source_rgba(r, g, b, 0.5)
             ctx.fill()
 
+    def __on_widget_map(self, widget):
+        """
+            Update priority of pending requests for widget
+            A request stays visible while one of its widgets is mapped
+            @param widget as Gtk.Widget
+        """
+        if widget not in self.__widgets.keys():
+            return
+        entries = []
+        with self.__lock:
+            for request in self.__widgets[widget][1]:
+                if request["started"]:
+                    continue
+                visible = any(item[2] is None or item[2].get_mapped()
+                              for item in request["callbacks"])
+                priority = self.__VISIBLE if visible else self.__HIDDEN
+                if priority != request["priority"]:
+                    entries.append(self.__set_priority(request, priority))
+        for entry in entries:
+            self.__queue.put(entry)
+
+    def __on_widget_destroy(self, widget):
+        """
+            Cancel pending requests for widget
+            @param widget as Gtk.Widget
+        """
+        with self.__lock:
+            for request in self.__requests.values():
+                request["callbacks"] = [item for item in request["callbacks"]
+                                        if item[2] != widget]
+        if widget in self.__widgets.keys():
+            del self.__widgets[widget]
+
     def __get_album_artwork(self, album, width, height, scale_factor, effect):
         """
             Set artwork for album id
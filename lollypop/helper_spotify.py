@@ -52,7 +52,7 @@ class SpotifyHelper(GObject.Object):
             credentials = "%s:%s" % (SPOTIFY_CLIENT_ID, SPOTIFY_SECRET)
             encoded = b64encode(credentials.encode("utf-8"))
             credentials = encoded.decode("utf-8")
-            session = Soup.Session.new()
+            session = TaskHelper.get_session()
             data = {"grant_type": "client_credentials"}
             msg = Soup.form_request_new_from_hash("POST", token_uri, data)
             msg.request_headers.append("Authorization",
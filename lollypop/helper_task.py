@@ -12,9 +12,9 @@
 
 import gi
 gi.require_version("Soup", "2.4")
-from gi.repository import GLib, Soup
+from gi.repository import GLib, Gio, Soup
 
-from threading import Thread
+from threading import Thread, Lock
 
 from lollypop.logger import Logger
 
@@ -22,7 +22,16 @@ from lollypop.logger import Logger
 class TaskHelper:
     """
         Simple helper for running a task in background
+        All helpers share one Soup session: connections are kept alive and
+        responses are cached on disk (ETag/Last-Modified/Cache-Control)
     """
+    __SESSION = None
+    __CACHE = None
+    __LOCK = Lock()
+    __CACHE_PATH = GLib.get_user_cache_dir() + "/lollypop/http"
+    __CACHE_SIZE = 50 * 1024 * 1024
+    __SPLICE_FLAGS = Gio.OutputStreamSpliceFlags.CLOSE_SOURCE |\
+        Gio.OutputStreamSpliceFlags.CLOSE_TARGET
 
     def __init__(self):
         """
@@ -31,6 +40,40 @@ class TaskHelper:
         self.__signals = {}
         self.__headers = []
 
+    @staticmethod
+    def get_session():
+        """
+            Get shared session
+            @return Soup.Session
+            @thread safe
+        """
+        with TaskHelper.__LOCK:
+            if TaskHelper.__SESSION is None:
+                session = Soup.Session.new()
+                session.set_property("accept-language-auto", True)
+                session.set_property("max-conns-per-host", 4)
+                try:
+                    cache = Soup.Cache.new(TaskHelper.__CACHE_PATH,
+                                           Soup.CacheType.SINGLE_USER)
+                    cache.set_max_size(TaskHelper.__CACHE_SIZE)
+                    cache.load()
+                    session.add_feature(cache)
+                    TaskHelper.__CACHE = cache
+                except Exception as e:
+                    Logger.error("TaskHelper::get_session(): %s", e)
+                TaskHelper.__SESSION = session
+            return TaskHelper.__SESSION
+
+    @staticmethod
+    def save_cache():
+        """
+            Save HTTP cache index
+        """
+        with TaskHelper.__LOCK:
+            if TaskHelper.__CACHE is not None:
+                TaskHelper.__CACHE.flush()
+                TaskHelper.__CACHE.dump()
+
     def add_header(self, name, value):
         """
             Add header
@@ -60,27 +103,10 @@ class TaskHelper:
             @callback (uri as str, status as bool, content as bytes, args)
         """
         try:
-            session = Soup.Session.new()
-            session.set_property('accept-language-auto', True)
-            # Post message
-            if self.__headers:
-                msg = Soup.Message.new("GET", uri)
-                headers = msg.get_property("request-headers")
-                for header in self.__headers:
-                    headers.append(header[0],
-                                   header[1])
-                session.send_async(msg, cancellable,
-                                   self.__on_load_uri_content,
-                                   callback, cancellable, uri, *args)
-            # Get message
-            else:
-                request = session.request(uri)
-                request.send_async(cancellable,
-                                   self.__on_request_send_async,
-                                   callback,
-                                   cancellable,
-                                   uri,
-                                   *args)
+            msg = self.__get_message(uri)
+            self.get_session().send_async(msg, cancellable,
+                                          self.__on_send_async,
+                                          callback, cancellable, uri, *args)
         except Exception as e:
             Logger.error("HelperTask::load_uri_content(): %s" % e)
             callback(uri, False, b"", *args)
@@ -93,28 +119,12 @@ class TaskHelper:
             @return (loaded as bool, content as bytes)
         """
         try:
-            session = Soup.Session.new()
-            # Set headers
-            if self.__headers:
-                msg = Soup.Message.new("GET", uri)
-                headers = msg.get_property("request-headers")
-                for header in self.__headers:
-                    headers.append(header[0],
-                                   header[1])
-                session.send_message(msg)
-                body = msg.get_property("response-body")
-                bytes = body.flatten().get_data()
-            # Get message
-            else:
-                request = session.request(uri)
-                stream = request.send(cancellable)
-                bytes = bytearray(0)
-                buf = stream.read_bytes(1024, cancellable).get_data()
-                while buf:
-                    bytes += buf
-                    buf = stream.read_bytes(1024, cancellable).get_data()
-                stream.close()
-            return (True, bytes)
+            msg = self.__get_message(uri)
+            stream = self.get_session().send(msg, cancellable)
+            # Let GIO copy the body into one growing buffer
+            output = Gio.MemoryOutputStream.new_resizable()
+            output.splice(stream, self.__SPLICE_FLAGS, cancellable)
+            return (True, output.steal_as_bytes().get_data())
         except Exception as e:
             Logger.error("TaskHelper::load_uri_content_sync(): %s" % e)
             return (False, b"")
@@ -139,70 +149,50 @@ class TaskHelper:
             Logger.error("TaskHelper::__run(): %s: %s -> %s"
                          % (e, command, kwd))
 
-    def __on_read_bytes_async(self, stream, result, content,
-                              cancellable, callback, uri, *args):
+    def __get_message(self, uri):
         """
-            Read data from stream, when finished, pass to callback
-            @param stream as Gio.InputStream
-            @param result as Gio.AsyncResult
-            @param cancellable as Gio.Cancellable
-            @param content as bytes
-            @param callback as function
+            Get a GET message with headers
             @param uri as str
+            @return Soup.Message
         """
-        try:
-            content_result = stream.read_bytes_finish(result)
-            content_bytes = content_result.get_data()
-            if content_bytes:
-                content += content_bytes
-                stream.read_bytes_async(4096, GLib.PRIORITY_LOW,
-                                        cancellable,
-                                        self.__on_read_bytes_async,
-                                        content, cancellable, callback,
-                                        uri, *args)
-            else:
-                callback(uri, True, bytes(content), *args)
-        except Exception as e:
-            Logger.error("TaskHelper::__on_read_bytes_async(): %s" % e)
-            callback(uri, False, b"", *args)
+        msg = Soup.Message.new("GET", uri)
+        headers = msg.get_property("request-headers")
+        for header in self.__headers:
+            headers.append(header[0], header[1])
+        return msg
 
-    def __on_request_send_async(self, source, result, callback,
-                                cancellable, uri, *args):
+    def __on_send_async(self, session, result, callback,
+                        cancellable, uri, *args):
         """
-            Get stream and start reading from it
-            @param source as Soup.Session
+            Get stream and splice it into memory
+            @param session as Soup.Session
             @param result as Gio.AsyncResult
-            @param cancellable as Gio.Cancellable
             @param callback as a function
+            @param cancellable as Gio.Cancellable
             @param uri as str
         """
         try:
-            stream = source.send_finish(result)
-            # We use a bytearray here as seems that bytes += is really slow
-            stream.read_bytes_async(4096, GLib.PRIORITY_LOW,
-                                    cancellable, self.__on_read_bytes_async,
-                                    bytearray(0), cancellable, callback, uri,
-                                    *args)
+            stream = session.send_finish(result)
+            output = Gio.MemoryOutputStream.new_resizable()
+            output.splice_async(stream, self.__SPLICE_FLAGS,
+                                GLib.PRIORITY_LOW, cancellable,
+                                self.__on_splice_async,
+                                callback, uri, *args)
         except Exception as e:
-            Logger.error("TaskHelper::__on_soup_msg_finished(): %s" % e)
+            Logger.error("TaskHelper::__on_send_async(): %s" % e)
             callback(uri, False, b"", *args)
 
-    def __on_load_uri_content(self, source, result, callback,
-                              cancellable, uri, *args):
+    def __on_splice_async(self, output, result, callback, uri, *args):
         """
-            Get stream and start reading from it
-            @param source as Soup.Session
+            Pass content to callback
+            @param output as Gio.MemoryOutputStream
             @param result as Gio.AsyncResult
-            @param cancellable as Gio.Cancellable
             @param callback as a function
             @param uri as str
         """
         try:
-            stream = source.send_finish(result)
-            # We use a bytearray here as seems that bytes += is really slow
-            stream.read_bytes_async(4096, GLib.PRIORITY_LOW,
-                                    cancellable, self.__on_read_bytes_async,
-                                    bytearray(0), cancellable, callback, uri,
-                                    *args)
+            output.splice_finish(result)
+            callback(uri, True, output.steal_as_bytes().get_data(), *args)
         except Exception as e:
-            Logger.error("TaskHelper::__on_soup_msg_finished(): %s" % e)
+            Logger.error("TaskHelper::__on_splice_async(): %s" % e)
+            callback(uri, False, b"", *args)
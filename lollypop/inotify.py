@@ -82,6 +82,7 @@ class Inotify:
         if changed_uri in self.__monitors.keys() and\
                 self.__monitors[changed_uri] == monitor:
             return
+        App().art.invalidate_artwork_index(changed_uri)
         # Ignore non audio/dir
         if changed_file.query_exists() and\
                 not is_audio(changed_file) and\
@@ -74,7 +74,7 @@ class PlaybackMenu(Gio.Menu):
         """
             Set queue actions
         """
-        if self.__track.id not in App().player.queue:
+        if not App().player.track_in_queue(self.__track):
             append_queue_action = Gio.SimpleAction(name="append_queue_action")
             App().add_action(append_queue_action)
             append_queue_action.connect("activate",
@@ -159,8 +159,7 @@ class PlaybackMenu(Gio.Menu):
             @param Gio.SimpleAction
             @param GLib.Variant
         """
-        App().player.append_to_queue(self.__track.id, False)
-        App().player.emit("queue-changed")
+        App().player.append_to_queue(self.__track.id)
 
     def __remove_from_queue(self, action, variant):
         """
@@ -168,5 +167,4 @@ class PlaybackMenu(Gio.Menu):
             @param Gio.SimpleAction
             @param GLib.Variant
         """
-        App().player.remove_from_queue(self.__track.id, False)
-        App().player.emit("queue-changed")
+        App().player.remove_from_queue(self.__track.id)
@@ -162,6 +162,11 @@ class MPRIS(Server):
             </method>\
             <property name="HasRatingsExtension" type="b" access="read"/>\
         </interface>
+        <interface name="org.mpris.MediaPlayer2.ExtensionQueue">
+            <method name="AppendToQueue">
+                <arg direction="in" name="TrackIds" type="ai"/>
+            </method>
+        </interface>
     </node>
     """
     __MPRIS_IFACE = "org.mpris.MediaPlayer2"
@@ -254,6 +259,9 @@ class MPRIS(Server):
         # we have not yet implemented the TrackList interface.
         App().player.current_track.set_rate(int(rating * 5))
 
+    def AppendToQueue(self, track_ids):
+        App().player.extend_queue(track_ids)
+
     def Get(self, interface, property_name):
         if property_name in ["CanQuit", "CanRaise", "CanSeek",
                              "CanControl", "HasRatingsExtension"]:
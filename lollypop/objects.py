@@ -235,7 +235,8 @@ class Album(Base):
                 "mtime": 1,
                 "synced": False,
                 "loved": False,
-                "mb_album_id": None}
+                "mb_album_id": None,
+                "embedded_artwork": None}
 
     def __init__(self, album_id=None, genre_ids=[], artist_ids=[],
                  disallow_ignored_tracks=False):
@@ -390,6 +391,33 @@ class Album(Base):
         """
         return [track.id for track in self.tracks]
 
+    @property
+    def loaded_track_ids(self):
+        """
+            Get ids of tracks already loaded, does not query DB
+            @return [int], empty if tracks not loaded
+        """
+        return [track.id for track in self._tracks]
+
+    @property
+    def loaded_artist_ids(self):
+        """
+            Get artist ids already known, does not query DB
+            @return [int], empty if artist ids not loaded
+        """
+        artist_ids = self.__dict__.get("artist_ids", None)
+        if artist_ids is None:
+            artist_ids = self.__dict__.get("_artist_ids", None)
+        return artist_ids or []
+
+    @property
+    def disallow_ignored_tracks(self):
+        """
+            True if ignored tracks are not loaded
+            @return bool
+        """
+        return self.__disallow_ignored_tracks
+
     @property
     def track_uris(self):
         """
@@ -12,6 +12,8 @@
 
 from gi.repository import Gst, GLib
 
+import json
+import os
 from pickle import load
 from random import choice, shuffle
 from lollypop.player_bin import BinPlayer
@@ -32,6 +34,11 @@ class Player(BinPlayer, QueuePlayer, PlaylistPlayer, RadioPlayer,
     """
         Player object used to manage playback and playlists
     """
+    __STATE_PATH = LOLLYPOP_DATA_PATH + "/player_state.json"
+    __STATE_VERSION = 1
+    # Pickled state from previous versions
+    __LEGACY_STATE = ["Albums.bin", "track_id.bin", "player.bin",
+                      "queue.bin", "playlist_ids.bin", "position.bin"]
 
     def __init__(self):
         """
@@ -103,10 +110,13 @@ class Player(BinPlayer, QueuePlayer, PlaylistPlayer, RadioPlayer,
             if self._albums and self._albums[-1].id == album.id:
                 self._albums[-1].set_tracks(self._albums[-1].tracks +
                                             album.tracks)
+                self._reindex_tracks(self._albums[-1])
             else:
                 self._albums.append(album)
+                self._reindex_albums(len(self._albums) - 1)
         else:
             self._albums.insert(index, album)
+            self._reindex_albums(index)
         if self._current_track.id is not None and self._current_track.id > 0:
             if not self.is_party:
                 self.set_next()
@@ -121,6 +131,7 @@ class Player(BinPlayer, QueuePlayer, PlaylistPlayer, RadioPlayer,
         """
         try:
             self._albums.remove(album)
+            self._reindex_albums()
             if album in self._albums_backup:
                 self._albums_backup.remove(album)
             if not self.is_party or self._next_track.album_id == album.id:
@@ -159,8 +170,11 @@ class Player(BinPlayer, QueuePlayer, PlaylistPlayer, RadioPlayer,
                             empty = album.remove_track(track)
                             if empty:
                                 removed.append(album)
+                    self._reindex_tracks(album)
             for album in removed:
                 self._albums.remove(album)
+            if removed:
+                self._reindex_albums()
             self.emit("playlist-changed")
         except Exception as e:
             Logger.error("Player::remove_disc(): %s" % e)
@@ -346,65 +360,112 @@ class Player(BinPlayer, QueuePlayer, PlaylistPlayer, RadioPlayer,
             artists = ", ".join(self._current_track.album_artists)
         return artists
 
+    def save_state(self):
+        """
+            Save player state: ids and positions only
+        """
+        track = self._current_track
+        current = None
+        albums = []
+        if track.id is None or track.mtime == 0:
+            track_id = None
+        elif track.id == Type.RADIOS:
+            track_id = Radios().get_id(track.radio_name)
+        else:
+            track_id = track.id
+            # Party albums are rebuilt on restore
+            if not self.is_party:
+                for album in self._albums:
+                    # Not loaded tracks are loaded again on restore
+                    albums.append([album.id, album.genre_ids,
+                                   album.loaded_artist_ids,
+                                   album.disallow_ignored_tracks,
+                                   album.loaded_track_ids])
+                try:
+                    current = [self._get_album_index(track.album),
+                               self._get_track_position(track)]
+                except ValueError:
+                    pass
+        if track.id == Type.RADIOS:
+            playlist_ids = [Type.RADIOS]
+        else:
+            playlist_ids = self.playlist_ids
+        state = {"version": self.__STATE_VERSION,
+                 "track_id": track_id,
+                 "current": current,
+                 "is_playing": self.is_playing,
+                 "is_party": self.is_party,
+                 "position": self.position if track.id is not None else 0,
+                 "queue": self.queue,
+                 "playlist_ids": playlist_ids,
+                 "albums": albums}
+        try:
+            tmp_path = self.__STATE_PATH + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.__STATE_PATH)
+            for filename in self.__LEGACY_STATE:
+                path = "%s/%s" % (LOLLYPOP_DATA_PATH, filename)
+                if os.path.exists(path):
+                    os.remove(path)
+        except Exception as e:
+            Logger.error("Player::save_state(): %s" % e)
+
     def restore_state(self):
         """
             Restore player state
         """
         try:
-            if App().settings.get_value("save-state"):
-                self._current_playback_track = Track(
-                    load(open(LOLLYPOP_DATA_PATH + "/track_id.bin", "rb")))
-                self.set_queue(load(open(LOLLYPOP_DATA_PATH +
-                                         "/queue.bin", "rb")))
-                albums = load(open(LOLLYPOP_DATA_PATH + "/Albums.bin", "rb"))
-                playlist_ids = load(open(LOLLYPOP_DATA_PATH +
-                                         "/playlist_ids.bin", "rb"))
-                (is_playing, was_party) = load(open(LOLLYPOP_DATA_PATH +
-                                                    "/player.bin", "rb"))
-                if playlist_ids and playlist_ids[0] == Type.RADIOS:
-                    radios = Radios()
+            # Command line may have started a playback
+            if not App().settings.get_value("save-state") or\
+                    self._current_track.id is not None:
+                return
+            try:
+                with open(self.__STATE_PATH, "r") as f:
+                    state = json.load(f)
+            except FileNotFoundError:
+                # First run after upgrade
+                state = self.__load_legacy_state()
+            if state.get("version", None) != self.__STATE_VERSION:
+                Logger.info("Player::restore_state(): unknown version")
+                return
+            self._current_playback_track = Track(state["track_id"])
+            self.set_queue(state["queue"])
+            playlist_ids = state["playlist_ids"]
+            if playlist_ids and playlist_ids[0] == Type.RADIOS:
+                radios = Radios()
+                track = Track()
+                name = radios.get_name(self._current_playback_track.id)
+                uri = radios.get_uri(self._current_playback_track.id)
+                track.set_radio(name, uri)
+                self.load(track, state["is_playing"])
+            elif self._current_playback_track.uri:
+                if state["is_party"]:
+                    App().lookup_action("party").change_state(
+                        GLib.Variant("b", True))
+                    self.__restore_party_track()
+                elif state["albums"]:
+                    self.__restore_albums(state["albums"], state["current"])
+                else:
+                    tracks = []
                     track = Track()
-                    name = radios.get_name(self._current_playback_track.id)
-                    uri = radios.get_uri(self._current_playback_track.id)
-                    track.set_radio(name, uri)
-                    self.load(track, is_playing)
-                elif self._current_playback_track.uri:
-                    if albums:
-                        if was_party:
-                            App().lookup_action("party").change_state(
-                                GLib.Variant("b", True))
-                        else:
-                            self._albums = load(open(
-                                                LOLLYPOP_DATA_PATH +
-                                                "/Albums.bin",
-                                                "rb"))
-                        # Load track from player albums
-                        index = self.album_ids.index(
-                            self._current_playback_track.album.id)
-                        for track in self._albums[index].tracks:
+                    for playlist_id in playlist_ids:
+                        tracks += App().playlists.get_tracks(playlist_id)
+                        for track in tracks:
                             if track.id == self._current_playback_track.id:
-                                self._load_track(track)
                                 break
-                    else:
-                        tracks = []
-                        track = Track()
-                        for playlist_id in playlist_ids:
-                            tracks += App().playlists.get_tracks(playlist_id)
-                            for track in tracks:
-                                if track.id == self._current_playback_track.id:
-                                    break
-                        self.populate_playlist_by_tracks(
-                            tracks, playlist_ids, track)
-                    if is_playing:
-                        self.play()
-                    else:
-                        self.pause()
-                    position = load(open(LOLLYPOP_DATA_PATH + "/position.bin",
-                                    "rb"))
-                    self.seek(position / Gst.SECOND)
+                    self.populate_playlist_by_tracks(
+                        tracks, playlist_ids, track)
+                if state["is_playing"]:
+                    self.play()
                 else:
-                    Logger.info("Player::restore_state(): track missing")
-                self.emit("playlist-changed")
+                    self.pause()
+                self.seek(state["position"] / Gst.SECOND)
+            else:
+                Logger.info("Player::restore_state(): track missing")
+            self.emit("playlist-changed")
+        except FileNotFoundError:
+            pass
         except Exception as e:
             Logger.error("Player::restore_state(): %s" % e)
 
@@ -463,8 +524,6 @@ class Player(BinPlayer, QueuePlayer, PlaylistPlayer, RadioPlayer,
                 next_track = LinearPlayer.next(self)
 
             self._next_track = next_track
-            if next_track.is_web:
-                App().task_helper.run(self._load_from_web, next_track, False)
             self.emit("next-changed")
         except Exception as e:
             Logger.error("Player::set_next(): %s" % e)
@@ -479,10 +538,10 @@ class Player(BinPlayer, QueuePlayer, PlaylistPlayer, RadioPlayer,
                     App().settings.get_enum("shuffle") == Shuffle.TRACKS:
                 self.set_next()
                 # We send this signal to update next popover
-                self.emit("queue-changed")
+                self.emit("queue-changed", [])
             elif self._current_track.id is not None:
-                index = self.album_ids.index(
-                    App().player._current_playback_track.album.id)
+                index = self._get_album_index(
+                    self._current_playback_track.album)
                 if index + 1 >= len(self._albums):
                     next_album = self._albums[0]
                 else:
@@ -578,6 +637,81 @@ class Player(BinPlayer, QueuePlayer, PlaylistPlayer, RadioPlayer,
 #######################
 # PRIVATE             #
 #######################
+    def __load_legacy_state(self):
+        """
+            Convert pickled state from previous versions
+            @return state as dict
+            @raise FileNotFoundError if no legacy state
+        """
+        def load_bin(filename):
+            with open("%s/%s" % (LOLLYPOP_DATA_PATH, filename), "rb") as f:
+                return load(f)
+        track_id = load_bin("track_id.bin")
+        (is_playing, is_party) = load_bin("player.bin")
+        try:
+            albums = [[album.id, album.genre_ids, album.loaded_artist_ids,
+                       bool(album.disallow_ignored_tracks),
+                       album.loaded_track_ids]
+                      for album in load_bin("Albums.bin")]
+        except FileNotFoundError:
+            albums = []
+        return {"version": self.__STATE_VERSION,
+                "track_id": track_id,
+                "current": None,
+                "is_playing": is_playing,
+                "is_party": is_party,
+                "position": load_bin("position.bin"),
+                "queue": load_bin("queue.bin"),
+                "playlist_ids": load_bin("playlist_ids.bin"),
+                "albums": albums}
+
+    def __restore_albums(self, albums, current):
+        """
+            Restore albums and load current track
+            @param albums as [[album_id as int, genre_ids as [int],
+                               artist_ids as [int],
+                               disallow_ignored_tracks as bool,
+                               track_ids as [int]]]
+            @param current as [album index as int,
+                               track position as int]/None
+        """
+        self._albums = []
+        for (album_id, genre_ids, artist_ids,
+             disallow_ignored_tracks, track_ids) in albums:
+            album = Album(album_id, genre_ids, artist_ids,
+                          disallow_ignored_tracks)
+            # Other albums load their tracks when needed
+            if track_ids:
+                album.set_tracks([Track(track_id) for track_id in track_ids])
+            self._albums.append(album)
+        self._reindex_albums()
+        track_id = self._current_playback_track.id
+        if current is not None and current[0] < len(self._albums):
+            tracks = self._albums[current[0]].tracks
+            if current[1] < len(tracks) and\
+                    tracks[current[1]].id == track_id:
+                self._load_track(tracks[current[1]])
+                return
+        # Positions are outdated, search track
+        for album in self._albums:
+            for track in album.tracks:
+                if track.id == track_id:
+                    self._load_track(track)
+                    return
+        self._load_track(self._current_playback_track)
+
+    def __restore_party_track(self):
+        """
+            Load current track from party albums
+        """
+        track = self._current_playback_track
+        for album in self.get_albums_for_id(track.album.id):
+            for album_track in album.tracks:
+                if album_track.id == track.id:
+                    self._load_track(album_track)
+                    return
+        self._load_track(track)
+
     def __play_shuffle_albums(self, album, albums):
         """
             Start shuffle albums playback. Prepend album if not None
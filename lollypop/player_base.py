@@ -32,7 +32,8 @@ class BasePlayer(GObject.GObject):
         "seeked": (GObject.SignalFlags.RUN_FIRST, None, (int,)),
         "status-changed": (GObject.SignalFlags.RUN_FIRST, None, ()),
         "volume-changed": (GObject.SignalFlags.RUN_FIRST, None, ()),
-        "queue-changed": (GObject.SignalFlags.RUN_FIRST, None, ()),
+        "queue-changed": (GObject.SignalFlags.RUN_FIRST, None,
+                          (GObject.TYPE_PYOBJECT,)),
         "rate-changed": (GObject.SignalFlags.RUN_FIRST, None, (int, int)),
         "party-changed": (GObject.SignalFlags.RUN_FIRST, None, (bool,))
     }
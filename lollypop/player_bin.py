@@ -13,6 +13,8 @@
 from gi.repository import Gst, GstAudio, GstPbutils, GLib, Gio
 
 from time import time
+from queue import Queue
+from threading import Thread
 
 from lollypop.player_base import BasePlayer
 from lollypop.tagreader import TagReader
@@ -27,7 +29,11 @@ from lollypop.objects import Track
 class BinPlayer(BasePlayer):
     """
         Gstreamer bin player
+        Next track is prepared as soon as known, so about-to-finish only
+        has to set uri. Stats are written by a background thread.
     """
+    # Read this to wake up disks/network mounts before playback
+    __PRELOAD_SIZE = 256 * 1024
 
     def __init__(self):
         """
@@ -58,6 +64,14 @@ class BinPlayer(BasePlayer):
             bus.connect("message::stream-start", self._on_stream_start)
             bus.connect("message::tag", self._on_bus_message_tag)
         self._start_time = 0
+        # (track, uri in DB)
+        self.__preloaded = (None, None)
+        self.__preload_cancellable = Gio.Cancellable()
+        self.__stats_queue = Queue()
+        thread = Thread(target=self.__stats_worker)
+        thread.daemon = True
+        thread.start()
+        self.connect("next-changed", self.__on_next_changed)
 
     def get_status(self):
         """
@@ -165,6 +179,9 @@ class BinPlayer(BasePlayer):
         if position >= self._current_track.duration:
             self.next()
         else:
+            # Fade control points are in stream time, drop running fade
+            if self._plugins.volume is not None:
+                self._plugins.set_volume(self._plugins.volume.props.volume)
             self._playbin.seek_simple(Gst.Format.TIME,
                                       Gst.SeekFlags.FLUSH |
                                       Gst.SeekFlags.KEY_UNIT,
@@ -253,7 +270,7 @@ class BinPlayer(BasePlayer):
             @return False if track not loaded
         """
         if init_volume:
-            self._plugins.volume.props.volume = 1.0
+            self._plugins.set_volume(1.0)
         Logger.debug("BinPlayer::_load_track(): %s" % track.uri)
         try:
             self.__cancellable.cancel()
@@ -261,7 +278,9 @@ class BinPlayer(BasePlayer):
             self._current_track = track
             # We check track is URI track, if yes, do a load from Web
             # Will not work if we add another music provider one day
-            track_uri = App().tracks.get_uri(track.id)
+            (preloaded, track_uri) = self.__preloaded
+            if preloaded is not track:
+                track_uri = App().tracks.get_uri(track.id)
             if track.is_web and track.uri == track_uri:
                 self.emit("loading-changed", True)
                 App().task_helper.run(self._load_from_web, track)
@@ -324,7 +343,9 @@ class BinPlayer(BasePlayer):
         for scrobbler in App().scrobblers:
             if scrobbler.available:
                 scrobbler.playing_now(self._current_track)
-        App().tracks.set_listened_at(self._current_track.id, int(time()))
+        if self._current_track.id is not None and\
+                self._current_track.id >= 0:
+            App().stats.add_listened(self._current_track.id, int(time()))
 
     def _on_bus_message_tag(self, bus, message):
         """
@@ -413,26 +434,8 @@ class BinPlayer(BasePlayer):
             return
         if self._current_track.id == Type.RADIOS:
             return
-        self._scrobble(self._current_track, self._start_time)
-        # Increment popularity
-        if self._current_track.id is not None and self._current_track.id >= 0:
-            App().tracks.set_more_popular(self._current_track.id)
-            # In party mode, linear popularity
-            if self.is_party:
-                pop_to_add = 1
-            # In normal mode, based on tracks count
-            else:
-                # Some users report an issue where get_tracks_count() return 0
-                # See issue #886
-                # Don"t understand how this can happen!
-                count = App().albums.get_tracks_count(
-                    self._current_track.album_id)
-                if count:
-                    pop_to_add = int(App().albums.max_count / count)
-                else:
-                    pop_to_add = 1
-            App().albums.set_more_popular(self._current_track.album_id,
-                                          pop_to_add)
+        self.__stats_queue.put((self._current_track, self._start_time,
+                                self.is_party))
         if self._next_track.id is None:
             # We are in gstreamer thread
             GLib.idle_add(self.stop)
@@ -452,63 +455,14 @@ class BinPlayer(BasePlayer):
             @param init volume as bool
         """
         was_playing = self.is_playing
-        self._playbin.set_state(Gst.State.NULL)
+        # READY keeps audio sink open
+        self._playbin.set_state(Gst.State.READY)
         if self._load_track(track, init_volume):
             if was_playing:
                 self._playbin.set_state(Gst.State.PLAYING)
             else:
                 self.play()
 
-    def __volume_up(self, playbin, plugins, duration):
-        """
-            Make volume going up smoothly
-            @param playbin as Gst.Bin
-            @param plugins as PluginsPlayer
-            @param duration as int
-        """
-        # We are not the active playbin, stop all
-        if self._playbin != playbin:
-            return
-        if duration > 0:
-            vol = plugins.volume.props.volume
-            steps = duration / 0.25
-            vol_up = (1.0 - vol) / steps
-            rate = vol + vol_up
-            if rate < 1.0:
-                plugins.volume.props.volume = rate
-                GLib.timeout_add(250, self.__volume_up,
-                                 playbin, plugins, duration - 0.25)
-            else:
-                plugins.volume.props.volume = 1.0
-        else:
-            plugins.volume.props.volume = 1.0
-
-    def __volume_down(self, playbin, plugins, duration):
-        """
-            Make volume going down smoothly
-            @param playbin as Gst.Bin
-            @param plugins as PluginsPlayer
-            @param duration as int
-        """
-        # We are again the active playbin, stop all
-        if self._playbin == playbin:
-            return
-        if duration > 0:
-            vol = plugins.volume.props.volume
-            steps = duration / 0.25
-            vol_down = vol / steps
-            rate = vol - vol_down
-            if rate > 0:
-                plugins.volume.props.volume = rate
-                GLib.timeout_add(250, self.__volume_down,
-                                 playbin, plugins, duration - 0.25)
-            else:
-                plugins.volume.props.volume = 0.0
-                playbin.set_state(Gst.State.NULL)
-        else:
-            plugins.volume.props.volume = 0.0
-            playbin.set_state(Gst.State.NULL)
-
     def __do_crossfade(self, duration, track=None):
         """
             Crossfade tracks
@@ -516,26 +470,11 @@ class BinPlayer(BasePlayer):
             @param track as Track
         """
         if track is None:
-            self._scrobble(self._current_track, self._start_time)
-            # Increment popularity
-            App().tracks.set_more_popular(self._current_track.id)
-            # In party mode, linear popularity
-            if self.is_party:
-                pop_to_add = 1
-            # In normal mode, based on tracks count
-            else:
-                count = App().albums.get_tracks_count(
-                    self._current_track.album_id)
-                if count:
-                    pop_to_add = int(App().albums.max_count / count)
-                else:
-                    pop_to_add = 0
-            if pop_to_add > 0:
-                App().albums.set_more_popular(self._current_track.album_id,
-                                              pop_to_add)
+            self.__stats_queue.put((self._current_track, self._start_time,
+                                    self.is_party))
 
-        GLib.idle_add(self.__volume_down, self._playbin,
-                      self._plugins, duration)
+        position = self._playbin.query_position(Gst.Format.TIME)[1]
+        self._plugins.fade(0.0, duration, position, True)
         if self._playbin == self.__playbin2:
             self._playbin = self.__playbin1
             self._plugins = self._plugins1
@@ -543,16 +482,65 @@ class BinPlayer(BasePlayer):
             self._playbin = self.__playbin2
             self._plugins = self._plugins2
 
-        if track is not None and track.id is not None:
+        if track is None or track.id is None:
+            track = self._next_track
+        if track.id is not None:
+            # New stream starts at 0
+            self._plugins.set_volume(0.0)
+            self._plugins.fade(1.0, duration, 0)
             self.__load(track, False)
-            self._plugins.volume.props.volume = 0
-            GLib.idle_add(self.__volume_up, self._playbin,
-                          self._plugins, duration)
-        elif self._next_track.id is not None:
-            self.__load(self._next_track, False)
-            self._plugins.volume.props.volume = 0
-            GLib.idle_add(self.__volume_up, self._playbin,
-                          self._plugins, duration)
+
+    def __stats_worker(self):
+        """
+            Scrobble and journal popularity for finished tracks
+        """
+        while True:
+            (track, start_time, is_party) = self.__stats_queue.get()
+            try:
+                self._scrobble(track, start_time)
+                if track.id is None or track.id < 0:
+                    continue
+                # In party mode, linear popularity
+                if is_party:
+                    pop_to_add = 1
+                # In normal mode, based on tracks count
+                else:
+                    # Some users report an issue where get_tracks_count()
+                    # return 0. See issue #886
+                    # Don"t understand how this can happen!
+                    count = App().albums.get_tracks_count(track.album_id)
+                    if count:
+                        pop_to_add = int(App().albums.max_count / count)
+                    else:
+                        pop_to_add = 1
+                App().stats.add_played(track.id, track.album_id, pop_to_add,
+                                       int(start_time),
+                                       int(time() - start_time))
+            except Exception as e:
+                Logger.error("BinPlayer::__stats_worker(): %s" % e)
+
+    def __preload(self, track, cancellable):
+        """
+            Prepare track for gapless playback
+            @param track as Track
+            @param cancellable as Gio.Cancellable
+        """
+        try:
+            if track.id is None or track.id < 0:
+                return
+            if track.is_web:
+                self._load_from_web(track, False)
+            track_uri = App().tracks.get_uri(track.id)
+            if cancellable.is_cancelled():
+                return
+            self.__preloaded = (track, track_uri)
+            if not track.is_web:
+                # Wake up disk or network mount and fill page cache
+                stream = Gio.File.new_for_uri(track.uri).read(cancellable)
+                stream.read_bytes(self.__PRELOAD_SIZE, cancellable)
+                stream.close(None)
+        except Exception as e:
+            Logger.debug("BinPlayer::__preload(): %s" % e)
 
     def __update_current_duration(self, track, uri):
         """
@@ -570,6 +558,18 @@ class BinPlayer(BasePlayer):
         except Exception as e:
             Logger.error("BinPlayer::__update_current_duration(): %s" % e)
 
+    def __on_next_changed(self, player):
+        """
+            Preload next track
+            @param player as Player
+        """
+        self.__preload_cancellable.cancel()
+        self.__preload_cancellable = Gio.Cancellable()
+        if self._next_track.id is not None and\
+                self._next_track is not self.__preloaded[0]:
+            App().task_helper.run(self.__preload, self._next_track,
+                                  self.__preload_cancellable)
+
     def __on_volume_changed(self, playbin, sink):
         """
             Update volume
@@ -19,6 +19,9 @@ from lollypop.logger import Logger
 class LinearPlayer(BasePlayer):
     """
         Manage normal playback
+        Album and track positions are indexed, next()/prev() are O(1)
+        Index is updated by Player when albums change and checked on
+        lookup, so direct changes to albums/tracks are detected
     """
 
     def __init__(self):
@@ -26,6 +29,12 @@ class LinearPlayer(BasePlayer):
             Init linear player
         """
         BasePlayer.__init__(self)
+        # Album: position in self._albums
+        self.__album_indexes = {}
+        # Album id: position in self._albums, for albums not from playback
+        self.__album_id_indexes = {}
+        # Album: {track id: position in album}
+        self.__track_positions = {}
 
     def next(self):
         """
@@ -38,11 +47,12 @@ class LinearPlayer(BasePlayer):
         elif repeat == Repeat.TRACK:
             return self._current_playback_track
         album = self._current_playback_track.album
-        new_track_position = self._current_playback_track.position + 1
+        new_track_position = self._get_track_position(
+            self._current_playback_track) + 1
         # next album
-        if new_track_position >= len(album.track_ids):
+        if new_track_position >= len(album.tracks):
             try:
-                pos = self.album_ids.index(album.id)
+                pos = self._get_album_index(album)
                 # we are on last album, go to first
                 if pos + 1 >= len(self._albums):
                     if repeat == Repeat.ALL:
@@ -71,11 +81,12 @@ class LinearPlayer(BasePlayer):
         elif repeat == Repeat.TRACK:
             return self._current_playback_track
         album = self._current_playback_track.album
-        new_track_position = self._current_playback_track.position - 1
+        new_track_position = self._get_track_position(
+            self._current_playback_track) - 1
         # Previous album
         if new_track_position < 0:
             try:
-                pos = self.album_ids.index(album.id)
+                pos = self._get_album_index(album)
                 if pos - 1 < 0:  # we are on last album, go to first
                     if repeat == Repeat.ALL:
                         pos = len(self._albums) - 1
@@ -91,3 +102,76 @@ class LinearPlayer(BasePlayer):
         else:
             track = album.tracks[new_track_position]
         return track
+
+#######################
+# PROTECTED           #
+#######################
+    def _reindex_albums(self, start=0):
+        """
+            Update albums positions from start
+            @param start as int
+        """
+        if start == 0:
+            self.__album_indexes = {}
+            self.__album_id_indexes = {}
+        for index in range(start, len(self._albums)):
+            album = self._albums[index]
+            self.__album_indexes[album] = index
+            self.__album_id_indexes[album.id] = index
+        if start == 0:
+            # Forget removed albums
+            self.__track_positions = {
+                album: positions
+                for (album, positions) in self.__track_positions.items()
+                if album in self.__album_indexes.keys()}
+
+    def _reindex_tracks(self, album):
+        """
+            Forget tracks positions for album
+            @param album as Album
+        """
+        self.__track_positions.pop(album, None)
+
+    def _get_album_index(self, album):
+        """
+            Get album position in albums
+            @param album as Album
+            @return int
+            @raise ValueError if album not found
+        """
+        index = self.__album_indexes.get(album, None)
+        if index is not None and index < len(self._albums) and\
+                self._albums[index] is album:
+            return index
+        if index is None:
+            # Not an album from playback, search for same album id
+            index = self.__album_id_indexes.get(album.id, None)
+            if index is not None and index < len(self._albums) and\
+                    self._albums[index].id == album.id:
+                return index
+        self._reindex_albums()
+        index = self.__album_indexes.get(album, None)
+        if index is None:
+            index = self.__album_id_indexes.get(album.id, None)
+        if index is None:
+            raise ValueError("Album %s not in playback" % album.id)
+        return index
+
+    def _get_track_position(self, track):
+        """
+            Get track position in its album
+            @param track as Track
+            @return int, tracks count if not found
+        """
+        album = track.album
+        tracks = album.tracks
+        positions = self.__track_positions.get(album, {})
+        position = positions.get(track.id, None)
+        if position is None or position >= len(tracks) or\
+                tracks[position].id != track.id:
+            positions = {}
+            for (i, album_track) in enumerate(tracks):
+                positions.setdefault(album_track.id, i)
+            self.__track_positions[album] = positions
+            position = positions.get(track.id, len(tracks))
+        return position
@@ -11,7 +11,9 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from gi.repository import Gst
+import gi
+gi.require_version("GstController", "1.0")
+from gi.repository import Gst, GstController, GLib
 
 from lollypop.define import App
 from lollypop.logger import Logger
@@ -19,7 +21,13 @@ from lollypop.logger import Logger
 
 class PluginsPlayer:
     """
-        Replay gain player
+        Audio output chain for a playbin:
+        audioconvert ! rgvolume ! rglimiter ! audioconvert ! volume !
+        equalizer-10bands ! audioconvert ! autoaudiosink
+        Chain is built once, equalizer and replay gain are updated in place,
+        so sink is never reopened.
+        Volume fades are driven by a control source, so they are computed
+        on the streaming thread for each sample
     """
 
     def __init__(self, playbin):
@@ -28,86 +36,71 @@ class PluginsPlayer:
             @param playbin as Gst.bin
         """
         self.__playbin = playbin
-        self.init()
+        self.__fader = None
+        self.__fade_id = None
+        self.__equalizer = None
+        self.volume = None
+        self.rgvolume = None
+        self.__build()
+        App().settings.connect("changed::replaygain",
+                               lambda x, y: self.update_replaygain())
 
     def init(self):
         """
-            Init playbin
+            Apply settings to chain
         """
-        bin = Gst.ElementFactory.make("bin", "bin")
-
-        rg_audioconvert1 = Gst.ElementFactory.make("audioconvert",
-                                                   "audioconvert1")
-        rg_audioconvert2 = Gst.ElementFactory.make("audioconvert",
-                                                   "audioconvert2")
-        rg_audioconvert3 = Gst.ElementFactory.make("audioconvert",
-                                                   "audioconvert3")
-        self.volume = Gst.ElementFactory.make("volume",
-                                              "volume")
-        self.volume.props.volume = 0.0
-        self.rgvolume = Gst.ElementFactory.make("rgvolume",
-                                                "rgvolume")
-        rglimiter = Gst.ElementFactory.make("rglimiter",
-                                            "rglimiter")
-        rg_audiosink = Gst.ElementFactory.make("autoaudiosink",
-                                               "autoaudiosink")
-
-        if not bin or not rg_audioconvert1 or\
-           not rg_audioconvert2 or not self.rgvolume or\
-           not rglimiter or not rg_audiosink:
-            Logger.info("Replay Gain not available, ")
-            Logger.info("please check your gstreamer installation...")
-            return
+        self.update_replaygain()
+        self.update_equalizer()
 
+    def update_replaygain(self):
+        """
+            Update replay gain based on current settings
+        """
         if self.rgvolume is not None:
-            self.rgvolume.props.album_mode = 1
             self.rgvolume.props.pre_amp = App().settings.get_value(
                 "replaygain").get_double()
 
-        bin.add(self.volume)
-        bin.add(self.rgvolume)
-        bin.add(rg_audioconvert1)
-        bin.add(rg_audioconvert2)
-        bin.add(rg_audioconvert3)
-        bin.add(rglimiter)
-        bin.add(rg_audiosink)
-
-        if App().settings.get_value("equalizer-enabled"):
-            self.__equalizer = Gst.ElementFactory.make("equalizer-10bands",
-                                                       "equalizer-10bands")
-            rg_audioconvert4 = Gst.ElementFactory.make("audioconvert",
-                                                       "audioconvert4")
-            bin.add(rg_audioconvert4)
-            bin.add(self.__equalizer)
-        else:
-            self.__equalizer = None
-
-        rg_audioconvert1.link(self.rgvolume)
-        self.rgvolume.link(rg_audioconvert2)
-        self.rgvolume.link(rglimiter)
-        rg_audioconvert2.link(self.volume)
-        self.volume.link(rg_audioconvert3)
-
-        if self.__equalizer is None:
-            rg_audioconvert3.link(rg_audiosink)
-        else:
-            rg_audioconvert3.link(self.__equalizer)
-            self.__equalizer.link(rg_audioconvert4)
-            rg_audioconvert4.link(rg_audiosink)
+    def set_volume(self, volume):
+        """
+            Set volume, cancel running fade
+            @param volume as float
+        """
+        self.__cancel_fade()
+        if self.volume is not None:
+            self.volume.props.volume = volume
 
-        bin.add_pad(Gst.GhostPad.new(
-            "sink",
-            rg_audioconvert1.get_static_pad("sink")))
-        self.__playbin.set_property("audio-sink", bin)
-        self.update_equalizer()
+    def fade(self, volume, duration, position, stop=False):
+        """
+            Fade from current volume to volume
+            @param volume as float
+            @param duration as float (seconds)
+            @param position as int (stream time in Gst.SECOND)
+            @param stop as bool: stop playbin at fade end
+        """
+        if self.__fader is None or duration <= 0:
+            self.set_volume(volume)
+            if stop:
+                self.__playbin.set_state(Gst.State.READY)
+            return
+        current = self.volume.props.volume
+        self.__cancel_fade()
+        end = position + int(duration * Gst.SECOND)
+        self.__fader.set(position, current)
+        self.__fader.set(end, volume)
+        self.__fade_binding.set_disabled(False)
+        self.__fade_id = GLib.timeout_add(int(duration * 1000) + 250,
+                                          self.__on_fade_finished,
+                                          volume, stop)
 
     def update_equalizer(self):
         """
             Update equalizer based on current settings
+            A disabled equalizer has all bands at 0, it is then passthrough
         """
+        enabled = App().settings.get_value("equalizer-enabled")
         i = 0
         for value in App().settings.get_value("equalizer"):
-            self.set_equalizer(i, value)
+            self.__set_band(i, value if enabled else 0)
             i += 1
 
     def set_equalizer(self, band, value):
@@ -116,12 +109,96 @@ class PluginsPlayer:
             @param band as int
             @param value as int
         """
+        if App().settings.get_value("equalizer-enabled"):
+            self.__set_band(band, value)
+
+#######################
+# PRIVATE             #
+#######################
+    def __build(self):
+        """
+            Build chain and set it as playbin audio sink
+        """
+        bin = Gst.ElementFactory.make("bin", "bin")
+        audiosink = Gst.ElementFactory.make("autoaudiosink", "autoaudiosink")
+        self.volume = Gst.ElementFactory.make("volume", "volume")
+        if not bin or not audiosink or not self.volume:
+            Logger.info("Audio chain not available, ")
+            Logger.info("please check your gstreamer installation...")
+            self.volume = None
+            return
+        self.volume.props.volume = 0.0
+        self.rgvolume = Gst.ElementFactory.make("rgvolume", "rgvolume")
+        rglimiter = Gst.ElementFactory.make("rglimiter", "rglimiter")
+        if not self.rgvolume or not rglimiter:
+            Logger.info("Replay Gain not available, ")
+            Logger.info("please check your gstreamer installation...")
+            self.rgvolume = rglimiter = None
+        else:
+            self.rgvolume.props.album_mode = 1
+        self.__equalizer = Gst.ElementFactory.make("equalizer-10bands",
+                                                   "equalizer-10bands")
+        elements = [Gst.ElementFactory.make("audioconvert", "audioconvert1"),
+                    self.rgvolume,
+                    rglimiter,
+                    Gst.ElementFactory.make("audioconvert", "audioconvert2"),
+                    self.volume,
+                    self.__equalizer,
+                    Gst.ElementFactory.make("audioconvert", "audioconvert3"),
+                    audiosink]
+        elements = [element for element in elements if element]
+        for element in elements:
+            bin.add(element)
+        for i in range(0, len(elements) - 1):
+            elements[i].link(elements[i + 1])
+        bin.add_pad(Gst.GhostPad.new(
+            "sink",
+            elements[0].get_static_pad("sink")))
+
+        self.__fader = GstController.InterpolationControlSource.new()
+        self.__fader.set_property("mode",
+                                  GstController.InterpolationMode.LINEAR)
+        # Absolute binding: control values are volume values, not [0, 1]
+        self.__fade_binding = GstController.DirectControlBinding.new_absolute(
+            self.volume, "volume", self.__fader)
+        self.__fade_binding.set_disabled(True)
+        self.volume.add_control_binding(self.__fade_binding)
+
+        self.__playbin.set_property("audio-sink", bin)
+        self.init()
+
+    def __set_band(self, band, value):
+        """
+            Set equalizer band
+            @param band as int
+            @param value as int
+        """
         try:
             if self.__equalizer is not None:
                 self.__equalizer.set_property("band%s" % band, value)
         except Exception as e:
-            Logger.error("PluginsPlayer::set_equalizer():", e)
+            Logger.error("PluginsPlayer::__set_band(): %s", e)
 
-#######################
-# PRIVATE             #
-#######################
+    def __cancel_fade(self):
+        """
+            Remove control points and pending fade end
+        """
+        if self.__fade_id is not None:
+            GLib.source_remove(self.__fade_id)
+            self.__fade_id = None
+        if self.__fader is not None:
+            self.__fade_binding.set_disabled(True)
+            self.__fader.unset_all()
+
+    def __on_fade_finished(self, volume, stop):
+        """
+            Remove control points, a seek must not replay the fade
+            @param volume as float
+            @param stop as bool: stop playbin
+        """
+        self.__fade_id = None
+        self.__cancel_fade()
+        self.volume.props.volume = volume
+        if stop:
+            # Keep sink open for next crossfade
+            self.__playbin.set_state(Gst.State.READY)
@@ -10,26 +10,36 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
+from collections import OrderedDict
+from itertools import islice
+
 from lollypop.objects import Track
 
 
 class QueuePlayer:
     """
         Manage queue
+        Queue is an ordered dict: membership, append and removal are O(1).
+        Positions are cached until queue is reordered.
+        queue-changed is emitted with ids of tracks whose position
+        changed, None if unknown
     """
 
     def __init__(self):
         """
             Init queue
         """
-        self.__queue = []
+        self.__queue = OrderedDict()
+        # Track id: position, None if outdated
+        self.__positions = {}
 
     def set_queue(self, queue):
         """
             Set queue
             @param queue as [int]
         """
-        self.__queue = queue
+        self.__queue = OrderedDict.fromkeys(queue)
+        self.__positions = None
 
     def append_to_queue(self, track_id, notify=True):
         """
@@ -38,13 +48,49 @@ class QueuePlayer:
             @param track_id as int
             @param notify as bool
         """
-        if track_id in self.__queue:
-            self.__queue.remove(track_id)
-        self.__queue.append(track_id)
+        position = self.__remove(track_id)
+        self.__queue[track_id] = None
+        if self.__positions is not None:
+            self.__positions[track_id] = len(self.__queue) - 1
+        self.set_next()
+        self.set_prev()
+        if notify:
+            if position is None:
+                self.emit("queue-changed", [track_id])
+            else:
+                self.emit("queue-changed", self.__get_ids_from(position))
+
+    def extend_queue(self, track_ids, notify=True):
+        """
+            Append tracks to queue in one change,
+            remove previous tracks if exist
+            @param track_ids as [int]
+            @param notify as bool
+        """
+        track_ids = list(OrderedDict.fromkeys(track_ids))
+        if not track_ids:
+            return
+        moved = [track_id for track_id in track_ids
+                 if track_id in self.__queue]
+        if moved:
+            positions = self.__get_positions()
+            position = min(positions[track_id] for track_id in moved)
+            for track_id in moved:
+                del self.__queue[track_id]
+            self.__positions = None
+        for track_id in track_ids:
+            self.__queue[track_id] = None
+        if self.__positions is not None:
+            start = len(self.__queue) - len(track_ids)
+            for (i, track_id) in enumerate(track_ids):
+                self.__positions[track_id] = start + i
         self.set_next()
         self.set_prev()
         if notify:
-            self.emit("queue-changed")
+            if moved:
+                self.emit("queue-changed", self.__get_ids_from(position))
+            else:
+                self.emit("queue-changed", track_ids)
 
     def insert_in_queue(self, track_id, pos=0, notify=True):
         """
@@ -54,13 +100,23 @@ class QueuePlayer:
             @param pos as int
             @param notify as bool
         """
-        if track_id in self.__queue:
-            self.__queue.remove(track_id)
-        self.__queue.insert(pos, track_id)
+        position = self.__remove(track_id)
+        if pos == 0:
+            self.__queue[track_id] = None
+            self.__queue.move_to_end(track_id, False)
+        elif pos >= len(self.__queue):
+            self.__queue[track_id] = None
+        else:
+            track_ids = list(self.__queue.keys())
+            track_ids.insert(pos, track_id)
+            self.__queue = OrderedDict.fromkeys(track_ids)
+        self.__positions = None
         self.set_next()
         self.set_prev()
         if notify:
-            self.emit("queue-changed")
+            if position is not None:
+                pos = min(pos, position)
+            self.emit("queue-changed", self.__get_ids_from(pos))
 
     def remove_from_queue(self, track_id, notify=True):
         """
@@ -68,10 +124,13 @@ class QueuePlayer:
             @param track_id as int
             @param notify as bool
         """
-        if track_id in self.__queue:
-            self.__queue.remove(track_id)
+        position = self.__remove(track_id)
         if notify:
-            self.emit("queue-changed")
+            if position is None:
+                self.emit("queue-changed", [])
+            else:
+                self.emit("queue-changed",
+                          [track_id] + self.__get_ids_from(position))
 
     def clear_queue(self, notify=True):
         """
@@ -79,9 +138,11 @@ class QueuePlayer:
             @param [ids as int]
             @param notify as bool
         """
-        self.__queue = []
+        track_ids = list(self.__queue.keys())
+        self.__queue = OrderedDict()
+        self.__positions = {}
         if notify:
-            self.emit("queue-changed")
+            self.emit("queue-changed", track_ids)
 
     def track_in_queue(self, track):
         """
@@ -89,10 +150,7 @@ class QueuePlayer:
             @param track as Track
             @return bool
         """
-        if self.__queue:
-            return track.id in self.__queue
-        else:
-            return False
+        return track.id in self.__queue
 
     def album_in_queue(self, album):
         """
@@ -101,8 +159,10 @@ class QueuePlayer:
             @return bool
         """
         if self.__queue:
-            union = set(self.__queue) & set(album.track_ids)
-            return len(union) == len(album.track_ids)
+            for track_id in album.track_ids:
+                if track_id not in self.__queue:
+                    return False
+            return True
         else:
             return False
 
@@ -111,8 +171,9 @@ class QueuePlayer:
             Return track position in queue
             @param track_id as int
             @return position as int
+            @raise KeyError if track not in queue
         """
-        return self.__queue.index(track_id) + 1
+        return self.__get_positions()[track_id] + 1
 
     def next(self):
         """
@@ -121,7 +182,7 @@ class QueuePlayer:
         """
         track_id = None
         if self.__queue:
-            track_id = self.__queue[0]
+            track_id = next(iter(self.__queue))
         return Track(track_id)
 
     @property
@@ -130,8 +191,47 @@ class QueuePlayer:
             Return queue
             @return [ids as int]
         """
-        return self.__queue
+        return list(self.__queue.keys())
 
 #######################
 # PRIVATE             #
 #######################
+    def __get_positions(self):
+        """
+            Get track positions, rebuild them if outdated
+            @return {int: int}
+        """
+        if self.__positions is None:
+            self.__positions = {track_id: i for (i, track_id)
+                                in enumerate(self.__queue.keys())}
+        return self.__positions
+
+    def __get_ids_from(self, position):
+        """
+            Get track ids from position to queue end
+            @param position as int
+            @return [int]
+        """
+        return list(islice(self.__queue.keys(), position, None))
+
+    def __remove(self, track_id):
+        """
+            Remove track from queue
+            @param track_id as int
+            @return previous position as int/None
+        """
+        if track_id not in self.__queue:
+            return None
+        if self.__positions is None and\
+                track_id == next(iter(self.__queue)):
+            # Playing queue removes first track, do not rebuild positions
+            position = 0
+        else:
+            position = self.__get_positions()[track_id]
+        del self.__queue[track_id]
+        # Only last track removal keeps other positions
+        if position == len(self.__queue) and self.__positions is not None:
+            del self.__positions[track_id]
+        else:
+            self.__positions = None
+        return position
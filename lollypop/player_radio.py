@@ -83,7 +83,7 @@ class RadioPlayer(BasePlayer):
             @param track as Track
             @param play as bool
         """
-        self._plugins.volume.props.volume = 1.0
+        self._plugins.set_volume(1.0)
         self._playbin.set_state(Gst.State.NULL)
         self._playbin.set_property("uri", track.uri)
         Radios().set_more_popular(track.radio_id)
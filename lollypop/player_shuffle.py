@@ -11,11 +11,13 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 import random
+from time import time
 
 from lollypop.define import Shuffle, Repeat, App, Type
 from lollypop.player_base import BasePlayer
 from lollypop.objects import Track, Album
 from lollypop.list import LinkedList
+from lollypop.sampler import FenwickSampler
 from lollypop.logger import Logger
 
 
@@ -23,7 +25,16 @@ class ShufflePlayer(BasePlayer):
     """
         Shuffle player
         Manage shuffle tracks and party mode
+        Picking a track is O(1): a random album is taken from albums with
+        tracks not played, then a random track from its remaining tracks.
+        Played tracks are swap-removed from remaining tracks.
+        In weighted party mode, tracks are sampled by rate, popularity and
+        time since last listening.
     """
+    # Weight of a just played track gets back to half after this delay
+    __RECENT_DECAY = 3 * 24 * 3600
+    # Weights depend on current time, rebuild them after this delay
+    __WEIGHTS_LIFETIME = 3600
 
     def __init__(self):
         """
@@ -32,8 +43,20 @@ class ShufflePlayer(BasePlayer):
         BasePlayer.__init__(self)
         # Party mode
         self.__is_party = False
+        # Weighted party mode
+        self.__sampler = None
+        self.__sampler_time = 0
+        self.__avg_popularity = 5
+        # Sampler index: [track_id, album_id, popularity, rate, loved, ltime]
+        self.__weighted_stats = []
+        # Track id: sampler index
+        self.__weighted_indexes = {}
         self.reset_history()
         App().settings.connect("changed::shuffle", self.__set_shuffle)
+        App().settings.connect("changed::party-weighted",
+                               self.__on_party_weighted_changed)
+        self.connect("playlist-changed", self.__on_playlist_changed)
+        self.connect("rate-changed", self.__on_rate_changed)
 
     def reset_history(self):
         """
@@ -41,10 +64,9 @@ class ShufflePlayer(BasePlayer):
         """
         # Tracks already played
         self.__history = []
-        # Albums already played
-        self.__already_played_albums = []
-        # Tracks already played for albums
-        self.__already_played_tracks = {}
+        # Track ids already played
+        self.__played_ids = set()
+        self.__reset_pool()
         # Reset user playlist
         self._playlist_tracks = []
         self._playlist_ids = []
@@ -107,7 +129,7 @@ class ShufflePlayer(BasePlayer):
             # Start a new song if not playing
             if (self._current_playback_track.id in [None, Type.RADIOS])\
                     and self._albums:
-                track = self.__get_tracks_random()
+                track = self.__get_next()
                 self.load(track)
             elif not self.is_playing:
                 self.play()
@@ -131,6 +153,7 @@ class ShufflePlayer(BasePlayer):
         for album_id in album_ids:
             album = Album(album_id, [], [], True)
             self._albums.append(album)
+        self.__sampler = None
         self.emit("playlist-changed")
 
     @property
@@ -195,6 +218,8 @@ class ShufflePlayer(BasePlayer):
                 new_list = LinkedList(self._current_playback_track)
                 self.__history = new_list
             self.__add_to_shuffle_history(self._current_playback_track)
+            self.__update_weight(self._current_playback_track.id,
+                                 5, int(time()))
 
 #######################
 # PRIVATE             #
@@ -224,15 +249,18 @@ class ShufflePlayer(BasePlayer):
         """
         try:
             if self._shuffle == Shuffle.TRACKS or self.__is_party:
-                if self._albums:
+                if self._albums and self.__is_party and\
+                        App().settings.get_value("party-weighted"):
+                    track = self.__get_weighted_random()
+                elif self._albums:
                     track = self.__get_tracks_random()
                 else:
                     track = self.__get_playlists_random()
                 # All track dones
                 # Try to get another one track after reseting history
                 if track.id is None:
-                    self.__already_played_albums = []
-                    self.__already_played_tracks = {}
+                    self.__played_ids = set()
+                    self.__reset_pool()
                     self.__history = []
                     repeat = App().settings.get_enum("repeat")
                     if repeat == Repeat.ALL:
@@ -242,46 +270,222 @@ class ShufflePlayer(BasePlayer):
             Logger.error("ShufflePLayer::__get_next(): %s", e)
         return Track()
 
+    def __reset_pool(self):
+        """
+            Forget remaining tracks, pool will be rebuilt on next pick
+        """
+        # Albums with remaining tracks, built from self._albums
+        self.__pool_albums = None
+        self.__pool_source = (None, 0)
+        self.__pool_playlist = (None, 0)
+        # Album (None for user playlist): ([Track], {track_id: index})
+        self.__pool_tracks = {}
+
+    def __get_pool_track(self, key, tracks):
+        """
+            Get a random remaining track
+            @param key as Album/None
+            @param tracks as [Track]
+            @return Track/None if no remaining track
+        """
+        if key not in self.__pool_tracks.keys():
+            remaining = []
+            positions = {}
+            for track in tracks:
+                if track.id not in self.__played_ids and\
+                        track.id not in positions.keys():
+                    positions[track.id] = len(remaining)
+                    remaining.append(track)
+            self.__pool_tracks[key] = (remaining, positions)
+        (remaining, positions) = self.__pool_tracks[key]
+        current_id = App().player.current_track.id
+        while remaining:
+            track = remaining[random.randrange(len(remaining))]
+            if track.id in self.__played_ids:
+                # Played from another album
+                self.__remove_pool_track(key, track.id)
+            elif track.id == current_id and len(remaining) > 1:
+                # Current track not yet in history
+                continue
+            elif track.id != current_id:
+                return track
+            else:
+                return None
+        return None
+
+    def __remove_pool_track(self, key, track_id):
+        """
+            Swap remove track from remaining tracks
+            @param key as Album/None
+            @param track_id as int
+        """
+        if key not in self.__pool_tracks.keys():
+            return
+        (remaining, positions) = self.__pool_tracks[key]
+        index = positions.pop(track_id, None)
+        if index is None:
+            return
+        last = remaining.pop()
+        if index < len(remaining):
+            remaining[index] = last
+            positions[last.id] = index
+
     def __get_playlists_random(self):
         """
             Return a track from current playlist
             @return Track
         """
-        for track in sorted(
-                self._playlist_tracks, key=lambda *args: random.random()):
-            # Ignore current track, not an issue if playing one track
-            # in shuffle because LinearPlayer will handle next()
-            if track != App().player.current_track and (
-                   track.album not in self.__already_played_tracks.keys() or
-                   track not in self.__already_played_tracks[track.album]):
-                return track
-        return Track()
+        source = (self._playlist_tracks, len(self._playlist_tracks))
+        if self.__pool_playlist[0] is not source[0] or\
+                self.__pool_playlist[1] != source[1]:
+            self.__pool_playlist = source
+            self.__pool_tracks.pop(None, None)
+        # Ignore current track, not an issue if playing one track
+        # in shuffle because LinearPlayer will handle next()
+        track = self.__get_pool_track(None, self._playlist_tracks)
+        return Track() if track is None else track
 
     def __get_tracks_random(self):
         """
             Return a random track and make sure it has never been played
             @return Track
         """
-        for album in sorted(self._albums, key=lambda *args: random.random()):
-            for track in sorted(album.tracks,
-                                key=lambda *args: random.random()):
-                # Ignore current track, not an issue if playing one track
-                # in shuffle because LinearPlayer will handle next()
-                if track != App().player.current_track and (
-                        album not in self.__already_played_tracks.keys() or
-                        track not in self.__already_played_tracks[album]):
-                    return track
-            if album in self.__already_played_tracks.keys():
-                self.__already_played_tracks.pop(album)
-                self.__already_played_albums.append(album)
+        source = (self._albums, len(self._albums))
+        if self.__pool_albums is None or\
+                self.__pool_source[0] is not source[0] or\
+                self.__pool_source[1] != source[1]:
+            playlist = self.__pool_playlist
+            self.__reset_pool()
+            self.__pool_playlist = playlist
+            self.__pool_source = source
+            self.__pool_albums = list(self._albums)
+        albums = self.__pool_albums
+        while albums:
+            index = random.randrange(len(albums))
+            album = albums[index]
+            track = self.__get_pool_track(album, album.tracks)
+            if track is not None:
+                return track
+            # No remaining track, swap remove album
+            last = albums.pop()
+            if index < len(albums):
+                albums[index] = last
+            self.__pool_tracks.pop(album, None)
+        return Track()
+
+    def __get_weighted_random(self):
+        """
+            Return a random track from albums, weighted
+            @return Track
+        """
+        if self.__sampler is None or\
+                time() - self.__sampler_time > self.__WEIGHTS_LIFETIME:
+            self.__build_sampler()
+        current_id = App().player.current_track.id
+        # Current track weight is almost 0, just in case
+        for i in range(10):
+            index = self.__sampler.sample()
+            if index is None:
+                break
+            track_id = self.__weighted_stats[index][0]
+            if track_id != current_id:
+                return Track(track_id)
         return Track()
 
+    def __build_sampler(self):
+        """
+            Build sampler for albums tracks
+        """
+        album_ids = set(album.id for album in self._albums)
+        avg_popularity = App().tracks.get_avg_popularity()
+        now = time()
+        self.__weighted_stats = []
+        self.__weighted_indexes = {}
+        weights = []
+        for row in App().tracks.get_playback_stats():
+            if row[1] not in album_ids:
+                continue
+            self.__weighted_indexes[row[0]] = len(weights)
+            self.__weighted_stats.append(list(row))
+            weights.append(self.__get_weight(row, avg_popularity, now))
+        self.__sampler = FenwickSampler(weights)
+        self.__sampler_time = now
+        self.__avg_popularity = avg_popularity
+
+    def __get_weight(self, stats, avg_popularity, now):
+        """
+            Get track weight
+            @param stats as [int]
+            @param avg_popularity as float
+            @param now as float
+            @return float
+        """
+        (track_id, album_id, popularity, rate, loved, ltime) = stats
+        # User rate else popularity, same as RatingWidget
+        if rate > 0:
+            stars = rate
+        else:
+            stars = min(5, popularity * 5 / avg_popularity)
+        weight = (1 + stars) ** 2
+        if loved == 1:
+            weight *= 2
+        if ltime > 0:
+            since = max(0, now - ltime)
+            weight *= max(0.01, 1 - 0.5 ** (since / self.__RECENT_DECAY))
+        return weight
+
+    def __update_weight(self, track_id, column, value):
+        """
+            Update track weight
+            @param track_id as int
+            @param column as int (index in stats)
+            @param value as int
+        """
+        if self.__sampler is None or\
+                track_id not in self.__weighted_indexes.keys():
+            return
+        index = self.__weighted_indexes[track_id]
+        stats = self.__weighted_stats[index]
+        stats[column] = value
+        self.__sampler.update(index,
+                              self.__get_weight(stats,
+                                                self.__avg_popularity,
+                                                time()))
+
     def __add_to_shuffle_history(self, track):
         """
             Add a track to shuffle history
             @param track as Track
         """
-        if track.album not in self.__already_played_tracks.keys():
-            self.__already_played_tracks[track.album] = []
-        if track not in self.__already_played_tracks[track.album]:
-            self.__already_played_tracks[track.album].append(track)
+        self.__played_ids.add(track.id)
+        self.__remove_pool_track(track.album, track.id)
+        self.__remove_pool_track(None, track.id)
+
+    def __on_party_weighted_changed(self, settings, value):
+        """
+            Update next track
+            @param settings as Gio.Settings
+            @param value as GLib.Variant
+        """
+        self.__sampler = None
+        if self.__is_party and self._current_playback_track.id is not None:
+            self.set_next()
+
+    def __on_rate_changed(self, player, object_id, rate):
+        """
+            Update track weight
+            @param player as Player
+            @param object_id as int
+            @param rate as int
+        """
+        # Radios also emit this signal, check it is a track
+        if object_id in self.__weighted_indexes.keys() and\
+                App().tracks.get_rate(object_id) == rate:
+            self.__update_weight(object_id, 3, rate)
+
+    def __on_playlist_changed(self, player):
+        """
+            Rebuild pool on next pick
+            @param player as Player
+        """
+        self.__reset_pool()
@@ -27,6 +27,7 @@ from lollypop.sqlcursor import SqlCursor
 from lollypop.localized import LocalizedCollation
 from lollypop.shown import ShownPlaylists
 from lollypop.database_upgrade import DatabasePlaylistsUpgrade
+from lollypop.smart_playlist import SmartPlaylist
 
 
 class Playlists(GObject.GObject):
@@ -35,14 +36,19 @@ class Playlists(GObject.GObject):
     """
     __LOCAL_PATH = GLib.get_user_data_dir() + "/lollypop"
     _DB_PATH = "%s/playlists.db" % __LOCAL_PATH
+    # Space between two consecutive tracks, allow inserting without
+    # renumbering the whole playlist
+    POSITION_GAP = 1024
     __gsignals__ = {
         # Add or remove a playlist
         "playlists-changed": (GObject.SignalFlags.RUN_FIRST, None, (int,)),
-        # Objects added/removed to/from playlist
-        "playlist-track-added": (
-            GObject.SignalFlags.RUN_FIRST, None, (int, str, int)),
-        "playlist-track-removed": (
-            GObject.SignalFlags.RUN_FIRST, None, (int, str, int))
+        # Objects added/removed to/from playlist:
+        # playlist_id, added ranges, removed ranges
+        # A range is (position as int, uris as [str]), removed positions
+        # are positions before removal
+        "playlist-changed-bulk": (
+            GObject.SignalFlags.RUN_FIRST, None,
+            (int, GObject.TYPE_PYOBJECT, GObject.TYPE_PYOBJECT))
     }
     __create_playlists = """CREATE TABLE playlists (
                             id INTEGER PRIMARY KEY,
@@ -50,17 +56,25 @@ class Playlists(GObject.GObject):
                             synced INT NOT NULL DEFAULT 0,
                             smart_enabled INT NOT NULL DEFAULT 0,
                             smart_sql TEXT,
+                            smart_rules TEXT,
                             mtime BIGINT NOT NULL)"""
 
     __create_tracks = """CREATE TABLE tracks (
                         playlist_id INT NOT NULL,
-                        uri TEXT NOT NULL)"""
+                        uri TEXT NOT NULL,
+                        position INT NOT NULL DEFAULT 0,
+                        track_id INT)"""
+    __create_tracks_position_idx = """CREATE index idx_pt ON tracks(
+                                                playlist_id, position)"""
+    __create_tracks_uri_idx = """CREATE index idx_pu ON tracks(uri)"""
 
     def __init__(self):
         """
             Init playlists manager
         """
         self.thread_lock = Lock()
+        # playlist_id: (request, params, generation, track_ids)
+        self.__smart_cache = {}
         GObject.GObject.__init__(self)
         upgrade = DatabasePlaylistsUpgrade()
         # Create db schema
@@ -70,6 +84,8 @@ class Playlists(GObject.GObject):
                 with SqlCursor(self, True) as sql:
                     sql.execute(self.__create_playlists)
                     sql.execute(self.__create_tracks)
+                    sql.execute(self.__create_tracks_position_idx)
+                    sql.execute(self.__create_tracks_uri_idx)
                     sql.execute("PRAGMA user_version=%s" % upgrade.version)
             except:
                 pass
@@ -151,26 +167,16 @@ class Playlists(GObject.GObject):
             @param uri as str
             @param signal as bool
         """
-        if self.exists_track(playlist_id, uri):
-            return
-        if signal:
-            position = len(self.get_track_uris(playlist_id))
-            self.emit("playlist-track-added", playlist_id, uri, position)
-        with SqlCursor(self, True) as sql:
-            sql.execute("INSERT INTO tracks VALUES (?, ?)", (playlist_id, uri))
-            sql.execute("UPDATE playlists SET mtime=?\
-                         WHERE rowid=?", (datetime.now().strftime("%s"),
-                                          playlist_id))
+        self.add_uris(playlist_id, [uri], signal)
 
     def add_uris(self, playlist_id, uris, signal=False):
         """
-            Add uris to playlists (even if exists)
+            Add uris to playlists (already present uris are ignored)
             @param playlist_id as int
             @param uris as [str]
             @param signal as bool
         """
-        for uri in uris:
-            self.add_uri(playlist_id, uri, signal)
+        self.__add_uris(playlist_id, [(uri, None) for uri in uris], signal)
 
     def add_tracks(self, playlist_id, tracks, signal=False):
         """
@@ -179,8 +185,9 @@ class Playlists(GObject.GObject):
             @param tracks as [Track]
             @param signal as bool
         """
-        for track in tracks:
-            self.add_uri(playlist_id, track.uri, signal)
+        self.__add_uris(playlist_id,
+                        [(track.uri, track.id) for track in tracks],
+                        signal)
 
     def insert_track(self, playlist_id, track, position):
         """
@@ -189,18 +196,24 @@ class Playlists(GObject.GObject):
             @param track as Track
             @param position as int
         """
-        SqlCursor.add(self)
-        track_ids = self.get_track_ids(playlist_id)
-        if track.id in track_ids:
-            index = track_ids.index(track.id)
-            track_ids.remove(track.id)
-            if index < position:
+        with SqlCursor(self, True) as sql:
+            index = self.__get_index(sql, playlist_id, track.uri)
+            if index is not None and index < position:
                 position -= 1
-        track_ids.insert(position, track.id)
-        self.clear(playlist_id)
-        tracks = [Track(track_id) for track_id in track_ids]
-        self.add_tracks(playlist_id, tracks)
-        SqlCursor.remove(self)
+            new_position = self.__get_free_position(sql, playlist_id,
+                                                    position, track.uri)
+            if index is None:
+                sql.execute("INSERT INTO tracks\
+                             (playlist_id, uri, position, track_id)\
+                             VALUES (?, ?, ?, ?)",
+                            (playlist_id, track.uri, new_position, track.id))
+            else:
+                sql.execute("UPDATE tracks SET position=?, track_id=?\
+                             WHERE playlist_id=? AND uri=?",
+                            (new_position, track.id, playlist_id, track.uri))
+            sql.execute("UPDATE playlists SET mtime=?\
+                         WHERE rowid=?", (datetime.now().strftime("%s"),
+                                          playlist_id))
 
     def remove_uri(self, playlist_id, uri, signal=False):
         """
@@ -209,18 +222,7 @@ class Playlists(GObject.GObject):
             @param uri a str
             @param signal as bool
         """
-        if not self.exists_track(playlist_id, uri):
-            return
-        if signal:
-            uris = self.get_track_uris(playlist_id)
-            position = uris.index(uri)
-            self.emit("playlist-track-removed", playlist_id, uri, position)
-        with SqlCursor(self, True) as sql:
-            sql.execute("DELETE FROM tracks WHERE uri=? AND playlist_id=?",
-                        (uri, playlist_id))
-            sql.execute("UPDATE playlists SET mtime=?\
-                         WHERE rowid=?", (datetime.now().strftime("%s"),
-                                          playlist_id))
+        self.remove_uris(playlist_id, [uri], signal)
 
     def remove_uris(self, playlist_id, uris, signal=False):
         """
@@ -229,8 +231,31 @@ class Playlists(GObject.GObject):
             @param uris as [str]
             @param signal as bool
         """
-        for uri in uris:
-            self.remove_uri(playlist_id, uri, signal)
+        uris = set(uris)
+        with SqlCursor(self, True) as sql:
+            result = sql.execute("SELECT rowid, uri\
+                                  FROM tracks\
+                                  WHERE playlist_id=?\
+                                  ORDER BY position", (playlist_id,))
+            removed = [(position, rowid, uri)
+                       for (position, (rowid, uri)) in enumerate(result)
+                       if uri in uris]
+            if not removed:
+                return
+            sql.executemany("DELETE FROM tracks WHERE rowid=?",
+                            [(rowid,) for (position, rowid, uri) in removed])
+            sql.execute("UPDATE playlists SET mtime=?\
+                         WHERE rowid=?", (datetime.now().strftime("%s"),
+                                          playlist_id))
+        if signal:
+            ranges = []
+            for (position, rowid, uri) in removed:
+                if ranges and ranges[-1][0] + len(ranges[-1][1]) == position:
+                    ranges[-1][1].append(uri)
+                else:
+                    ranges.append((position, [uri]))
+            GLib.idle_add(self.emit, "playlist-changed-bulk",
+                          playlist_id, [], ranges)
 
     def remove_tracks(self, playlist_id, tracks, signal=False):
         """
@@ -239,8 +264,7 @@ class Playlists(GObject.GObject):
             @param tracks as [Track]
             @param signal as bool
         """
-        for track in tracks:
-            self.remove_uri(playlist_id, track.uri, signal)
+        self.remove_uris(playlist_id, [track.uri for track in tracks], signal)
 
     def remove_uri_from_all(self, uri):
         """
@@ -298,7 +322,8 @@ class Playlists(GObject.GObject):
         with SqlCursor(self) as sql:
             result = sql.execute("SELECT uri\
                                   FROM tracks\
-                                  WHERE playlist_id=?", (playlist_id,))
+                                  WHERE playlist_id=?\
+                                  ORDER BY position", (playlist_id,))
             return list(itertools.chain(*result))
 
     def get_track_ids(self, playlist_id):
@@ -321,14 +346,31 @@ class Playlists(GObject.GObject):
         elif playlist_id == Type.LOVED:
             track_ids = App().playlists.get_track_ids_sorted(playlist_id)
         else:
+            # Cached track ids are checked against music.tracks using
+            # rowid lookups, only stale ones are resolved again by uri
+            stale = []
             with SqlCursor(self) as sql:
-                result = sql.execute("SELECT music.tracks.rowid\
-                                      FROM tracks, music.tracks\
-                                      WHERE tracks.playlist_id=?\
-                                      AND music.tracks.uri=\
-                                      main.tracks.uri",
+                result = sql.execute("SELECT main.tracks.rowid,\
+                                      main.tracks.uri, music.tracks.rowid\
+                                      FROM tracks\
+                                      LEFT JOIN music.tracks\
+                                      ON music.tracks.rowid=\
+                                      main.tracks.track_id\
+                                      AND music.tracks.uri=main.tracks.uri\
+                                      WHERE main.tracks.playlist_id=?\
+                                      ORDER BY main.tracks.position",
                                      (playlist_id,))
-                track_ids = list(itertools.chain(*result))
+                for (rowid, uri, track_id) in list(result):
+                    if track_id is None:
+                        track_id = App().tracks.get_id_by_uri(uri)
+                        if track_id is None:
+                            continue
+                        stale.append((track_id, rowid))
+                    track_ids.append(track_id)
+            if stale:
+                with SqlCursor(self, True) as sql:
+                    sql.executemany("UPDATE tracks SET track_id=?\
+                                     WHERE rowid=?", stale)
         return track_ids
 
     def get_tracks(self, playlist_id):
@@ -350,6 +392,8 @@ class Playlists(GObject.GObject):
             result = sql.execute("SELECT SUM(music.tracks.duration)\
                                   FROM tracks, music.tracks\
                                   WHERE tracks.playlist_id=?\
+                                  AND music.tracks.rowid=\
+                                  main.tracks.track_id\
                                   AND music.tracks.uri=\
                                   main.tracks.uri",
                                  (playlist_id,))
@@ -373,6 +417,8 @@ class Playlists(GObject.GObject):
                                   music.tracks.rowid\
                                   AND music.artists.id=\
                                   music.track_artists.artist_id\
+                                  AND music.tracks.rowid=\
+                                  main.tracks.track_id\
                                   AND music.tracks.uri=\
                                   main.tracks.uri\
                                   ORDER BY\
@@ -508,21 +554,48 @@ class Playlists(GObject.GObject):
                 return v[0]
             return False
 
-    def get_smart_sql(self, playlist_id):
+    def get_smart_rules(self, playlist_id):
         """
-            Get SQL smart request
+            Get smart playlist rules, legacy SQL requests are converted
             @param playlist_id as int
-            @return str
+            @return rules as dict/None
         """
         with SqlCursor(self) as sql:
-            result = sql.execute("SELECT smart_sql\
+            result = sql.execute("SELECT smart_rules, smart_sql\
                                  FROM playlists\
                                  WHERE rowid=?", (playlist_id,))
             v = result.fetchone()
-            if v is not None:
-                return v[0]
+            if v is None:
+                return None
+            elif v[0]:
+                return json.loads(v[0])
+            elif v[1]:
+                return SmartPlaylist.from_sql(v[1])
             return None
 
+    def get_smart_track_ids(self, playlist_id):
+        """
+            Get smart playlist track ids, result is cached until
+            data the playlist depends on changes
+            @param playlist_id as int
+            @return [int]
+        """
+        rules = self.get_smart_rules(playlist_id)
+        if rules is None:
+            return []
+        (request, params, generation, cacheable) = SmartPlaylist.compile(
+            rules)
+        generation = App().db.get_generation(generation)
+        key = (request, params, generation)
+        if cacheable and playlist_id in self.__smart_cache.keys():
+            (cached_key, track_ids) = self.__smart_cache[playlist_id]
+            if cached_key == key:
+                return list(track_ids)
+        track_ids = App().db.execute(request, params)
+        if cacheable:
+            self.__smart_cache[playlist_id] = (key, list(track_ids))
+        return track_ids
+
     def set_synced(self, playlist_id, synced):
         """
             Mark playlist as synced
@@ -559,17 +632,19 @@ class Playlists(GObject.GObject):
                         WHERE rowid=?",
                         (smart, playlist_id))
 
-    def set_smart_sql(self, playlist_id, request):
+    def set_smart_rules(self, playlist_id, rules):
         """
-            Set playlist SQL smart request
+            Set playlist smart rules
             @param playlist_id as int
-            @param request as str
+            @param rules as dict
         """
         with SqlCursor(self, True) as sql:
             sql.execute("UPDATE playlists\
-                        SET smart_sql=?\
+                        SET smart_rules=?\
                         WHERE rowid=?",
-                        (request, playlist_id))
+                        (json.dumps(rules), playlist_id))
+        if playlist_id in self.__smart_cache.keys():
+            del self.__smart_cache[playlist_id]
 
     def import_uri(self, playlist_id, uri, start=None, down=True):
         """
@@ -617,20 +692,13 @@ class Playlists(GObject.GObject):
                     self.add_tracks(playlist_id, tracks)
                 else:
                     # Insert at wanted position
-                    playlist_track_ids = self.get_track_ids(playlist_id)
-                    start_idx = playlist_track_ids.index(start)
+                    start_idx = self.get_position(playlist_id, start)
                     if down:
                         start_idx += 1
                     for track_id in track_ids:
-                        playlist_track_ids.insert(start_idx, track_id)
-                        GLib.idle_add(self.emit, "playlist-add",
-                                      playlist_id, track_id, start_idx)
+                        self.insert_track(playlist_id, Track(track_id),
+                                          start_idx)
                         start_idx += 1
-                    self.clear(playlist_id)
-                    tracks = []
-                    for track_id in playlist_track_ids:
-                        tracks.append(Track(track_id))
-                    self.add_tracks(playlist_id, tracks)
         except:
             pass
 
@@ -641,12 +709,12 @@ class Playlists(GObject.GObject):
             @param track_id as int
             @return position as int
         """
-        i = 0
-        for tid in self.get_track_ids(playlist_id):
-            if track_id == tid:
-                break
-            i += 1
-        return i
+        uri = App().tracks.get_uri(track_id)
+        with SqlCursor(self) as sql:
+            position = self.__get_index(sql, playlist_id, uri)
+        if position is None:
+            return self.__get_count(playlist_id)
+        return position
 
     def exists_track(self, playlist_id, uri):
         """
@@ -720,6 +788,137 @@ class Playlists(GObject.GObject):
 #######################
 # PRIVATE             #
 #######################
+    def __add_uris(self, playlist_id, items, signal):
+        """
+            Append uris to playlist in one transaction
+            @param playlist_id as int
+            @param items as [(str, int/None)] => (uri, track id)
+            @param signal as bool
+        """
+        with SqlCursor(self, True) as sql:
+            result = sql.execute("SELECT uri\
+                                  FROM tracks\
+                                  WHERE playlist_id=?", (playlist_id,))
+            known = set(itertools.chain(*result))
+            # Keep order, ignore duplicates
+            new_items = []
+            for (uri, track_id) in items:
+                if uri not in known:
+                    known.add(uri)
+                    new_items.append((uri, track_id))
+            if not new_items:
+                return
+            result = sql.execute("SELECT COUNT(*), MAX(position)\
+                                  FROM tracks\
+                                  WHERE playlist_id=?", (playlist_id,))
+            (count, position) = result.fetchone()
+            if position is None:
+                position = 0
+            values = []
+            for (uri, track_id) in new_items:
+                position += self.POSITION_GAP
+                if track_id is None:
+                    track_id = App().tracks.get_id_by_uri(uri)
+                values.append((playlist_id, uri, position, track_id))
+            sql.executemany("INSERT INTO tracks\
+                             (playlist_id, uri, position, track_id)\
+                             VALUES (?, ?, ?, ?)", values)
+            sql.execute("UPDATE playlists SET mtime=?\
+                         WHERE rowid=?", (datetime.now().strftime("%s"),
+                                          playlist_id))
+        if signal:
+            GLib.idle_add(self.emit, "playlist-changed-bulk", playlist_id,
+                          [(count, [uri for (uri, track_id) in new_items])],
+                          [])
+
+    def __get_count(self, playlist_id):
+        """
+            Get tracks count for playlist
+            @param playlist_id as int
+            @return int
+        """
+        with SqlCursor(self) as sql:
+            result = sql.execute("SELECT COUNT(*)\
+                                  FROM tracks\
+                                  WHERE playlist_id=?", (playlist_id,))
+            v = result.fetchone()
+            if v is not None:
+                return v[0]
+            return 0
+
+    def __get_index(self, sql, playlist_id, uri):
+        """
+            Get uri index in playlist
+            @param sql as sqlite cursor
+            @param playlist_id as int
+            @param uri as str
+            @return int/None
+        """
+        result = sql.execute("SELECT position\
+                              FROM tracks\
+                              WHERE playlist_id=?\
+                              AND uri=?", (playlist_id, uri))
+        v = result.fetchone()
+        if v is None:
+            return None
+        result = sql.execute("SELECT COUNT(*)\
+                              FROM tracks\
+                              WHERE playlist_id=?\
+                              AND position<?", (playlist_id, v[0]))
+        return result.fetchone()[0]
+
+    def __get_free_position(self, sql, playlist_id, index, uri):
+        """
+            Get a free position value for a track at index,
+            playlist is renumbered if there is no space left
+            @param sql as sqlite cursor
+            @param playlist_id as int
+            @param index as int
+            @param uri as str => ignored track (the one being moved)
+            @return int
+        """
+        if index > 0:
+            result = sql.execute("SELECT position\
+                                  FROM tracks\
+                                  WHERE playlist_id=? AND uri!=?\
+                                  ORDER BY position\
+                                  LIMIT 2 OFFSET ?",
+                                 (playlist_id, uri, index - 1))
+            positions = list(itertools.chain(*result))
+            if len(positions) == 1:
+                return positions[0] + self.POSITION_GAP
+            elif len(positions) == 2:
+                if positions[1] - positions[0] > 1:
+                    return (positions[0] + positions[1]) // 2
+                self.__renumber(sql, playlist_id)
+                return self.__get_free_position(sql, playlist_id, index, uri)
+            # After last track
+            request = "SELECT MAX(position) + ?"
+        else:
+            request = "SELECT MIN(position) - ?"
+        result = sql.execute(request + " FROM tracks\
+                                        WHERE playlist_id=? AND uri!=?",
+                             (self.POSITION_GAP, playlist_id, uri))
+        v = result.fetchone()
+        if v is None or v[0] is None:
+            return self.POSITION_GAP
+        return v[0]
+
+    def __renumber(self, sql, playlist_id):
+        """
+            Spread positions for playlist
+            @param sql as sqlite cursor
+            @param playlist_id as int
+        """
+        result = sql.execute("SELECT rowid\
+                              FROM tracks\
+                              WHERE playlist_id=?\
+                              ORDER BY position", (playlist_id,))
+        rowids = list(itertools.chain(*result))
+        sql.executemany("UPDATE tracks SET position=? WHERE rowid=?",
+                        [((i + 1) * self.POSITION_GAP, rowid)
+                         for (i, rowid) in enumerate(rowids)])
+
     def __on_parse_finished(self, parser, result, playlist_id, uris):
         """
             Add tracks to playlists
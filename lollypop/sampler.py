@@ -0,0 +1,97 @@
+# Copyright (c) 2014-2019 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import random
+
+
+class FenwickSampler:
+    """
+        Weighted random sampling with a Fenwick tree
+        Build is O(n), sample and update are O(log n)
+    """
+
+    def __init__(self, weights=[]):
+        """
+            Init sampler
+            @param weights as [float]
+        """
+        self.__weights = list(weights)
+        # 1-indexed tree, node i holds sum of (i - lowbit(i), i]
+        self.__tree = [0.0] + self.__weights
+        size = len(self.__weights)
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                self.__tree[parent] += self.__tree[i]
+
+    def get(self, index):
+        """
+            Get weight at index
+            @param index as int
+            @return float
+        """
+        return self.__weights[index]
+
+    def update(self, index, weight):
+        """
+            Set weight at index
+            @param index as int
+            @param weight as float
+        """
+        delta = weight - self.__weights[index]
+        self.__weights[index] = weight
+        i = index + 1
+        size = len(self.__weights)
+        while i <= size:
+            self.__tree[i] += delta
+            i += i & -i
+
+    def sample(self):
+        """
+            Get a random index, probability is weight / total
+            @return int/None if total is 0
+        """
+        size = len(self.__weights)
+        total = self.total
+        if size == 0 or total <= 0:
+            return None
+        value = random.random() * total
+        position = 0
+        step = 1 << (size.bit_length() - 1)
+        while step:
+            i = position + step
+            if i <= size and self.__tree[i] <= value:
+                position = i
+                value -= self.__tree[i]
+            step >>= 1
+        # Float rounding may point after last index
+        return min(position, size - 1)
+
+    @property
+    def total(self):
+        """
+            Get weights sum
+            @return float
+        """
+        total = 0.0
+        i = len(self.__weights)
+        while i > 0:
+            total += self.__tree[i]
+            i -= i & -i
+        return total
+
+    def __len__(self):
+        """
+            Get weights count
+            @return int
+        """
+        return len(self.__weights)
@@ -0,0 +1,171 @@
+# Copyright (c) 2014-2019 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from lollypop.define import Generation
+from lollypop.logger import Logger
+
+
+class SmartPlaylist:
+    """
+        Smart playlist rules compiler
+        Rules are stored as a dict:
+        {
+            "operand": "AND"/"OR",
+            "orderby": str (SmartPlaylistView select_combobox id),
+            "limit": int,
+            "rules": [{"type": str, "operand": str, "value": str/int}]
+        }
+    """
+    OPERANDS = ["=", "!=", "LIKE", "NOT LIKE", ">", "<"]
+    ORDERBY = {
+        "random()": "random()",
+        "albums.name": "albums.name",
+        "artists.name": "(SELECT MIN(artists.name)\
+                          FROM track_artists, artists\
+                          WHERE track_artists.track_id=tracks.rowid\
+                          AND artists.rowid=track_artists.artist_id)",
+        "tracks.year DESC": "tracks.year DESC",
+        "tracks.year ASC": "tracks.year ASC",
+        "tracks.duration DESC": "tracks.duration DESC",
+        "tracks.duration ASC": "tracks.duration ASC"
+    }
+    # Legacy SQL column => rule type
+    __LEGACY_TYPES = {
+        "tracks.year": "year",
+        "tracks.bpm": "bpm",
+        "genres.name": "genre",
+        "albums.name": "album",
+        "artists.name": "artist",
+        "tracks.rate": "rating"
+    }
+
+    @staticmethod
+    def compile(rules):
+        """
+            Compile rules to a parameterised SQL request
+            @param rules as dict
+            @return (request as str, params as tuple,
+                     generation as Generation, cacheable as bool)
+        """
+        subrequests = []
+        params = []
+        generation = Generation.COLLECTION
+        for rule in rules.get("rules", []):
+            operand = rule["operand"]
+            if operand not in SmartPlaylist.OPERANDS:
+                Logger.warning("SmartPlaylist::compile(): bad operand %s",
+                               operand)
+                continue
+            value = rule["value"]
+            if operand.find("LIKE") != -1:
+                value = "%" + str(value) + "%"
+            if rule["type"] == "rating":
+                subrequests.append("(tracks.rate %s ? OR albums.rate %s ?)" %
+                                   (operand, operand))
+                params += [value, value]
+                generation |= Generation.RATE
+            elif rule["type"] == "year":
+                subrequests.append("tracks.year %s ?" % operand)
+                params.append(value)
+            elif rule["type"] == "bpm":
+                subrequests.append("tracks.bpm %s ?" % operand)
+                params.append(value)
+            elif rule["type"] == "album":
+                subrequests.append("albums.name %s ? COLLATE NOCASE" %
+                                   operand)
+                params.append(value)
+            elif rule["type"] == "genre":
+                subrequests.append("EXISTS (SELECT 1\
+                                    FROM track_genres, genres\
+                                    WHERE track_genres.track_id=tracks.rowid\
+                                    AND genres.rowid=track_genres.genre_id\
+                                    AND genres.name %s ? COLLATE NOCASE)" %
+                                   operand)
+                params.append(value)
+            elif rule["type"] == "artist":
+                subrequests.append("EXISTS (SELECT 1\
+                                    FROM track_artists, artists\
+                                    WHERE track_artists.track_id=tracks.rowid\
+                                    AND artists.rowid=track_artists.artist_id\
+                                    AND artists.name %s ? COLLATE NOCASE)" %
+                                   operand)
+                params.append(value)
+        request = "SELECT tracks.rowid FROM tracks, albums\
+                   WHERE albums.rowid=tracks.album_id"
+        if subrequests:
+            operand = " OR " if rules.get("operand") == "OR" else " AND "
+            request += " AND (%s)" % operand.join(subrequests)
+        orderby = rules.get("orderby", "random()")
+        request += " ORDER BY %s" % SmartPlaylist.ORDERBY.get(orderby,
+                                                              "random()")
+        request += " LIMIT ?"
+        params.append(int(rules.get("limit", 100)))
+        cacheable = SmartPlaylist.ORDERBY.get(orderby) != "random()"
+        return (request, tuple(params), generation, cacheable)
+
+    @staticmethod
+    def from_sql(sql):
+        """
+            Get rules from a legacy SQL request
+            @param sql as str
+            @return rules as dict
+        """
+        rules = {"operand": "OR" if sql.find(" UNION ") != -1 else "AND",
+                 "orderby": "random()",
+                 "limit": 100,
+                 "rules": []}
+        for line in sql.split("((")[1:]:
+            try:
+                item = line.split("))")[0].replace(" COLLATE NOCASE", "")
+                (t, operand, *args) = item.split(" ")
+                if operand == "NOT":
+                    operand = "NOT LIKE"
+                    args = args[1:]
+                value = " ".join(args)
+                # Unquote value
+                if value[0] == "'":
+                    value = value[1:]
+                if value[-1] == "'":
+                    value = value[:-1]
+                # Remove %
+                if value[0] == "%":
+                    value = value[1:]
+                if value[-1] == "%":
+                    value = value[:-1]
+                value = value.replace("''", "'")
+                rule_type = SmartPlaylist.__LEGACY_TYPES.get(t)
+                if rule_type is None:
+                    continue
+                if rule_type in ["year", "bpm", "rating"]:
+                    value = int(value)
+                rules["rules"].append({"type": rule_type,
+                                       "operand": operand,
+                                       "value": value})
+            except Exception as e:
+                Logger.error("SmartPlaylist::from_sql(): %s", e)
+        try:
+            rules["limit"] = int(sql.split("LIMIT")[1].split(" ")[1])
+        except Exception as e:
+            Logger.warning("SmartPlaylist::from_sql(): %s", e)
+        try:
+            split_spaces = sql.split("ORDER BY")[1].split(" ")
+            orderby = split_spaces[1]
+            # UNION does not support RANDOM() in OrderBy
+            if orderby == "rand":
+                orderby = "random()"
+            if len(split_spaces) > 2 and split_spaces[2] in ["ASC", "DESC"]:
+                orderby += " %s" % split_spaces[2]
+            if orderby in SmartPlaylist.ORDERBY.keys():
+                rules["orderby"] = orderby
+        except Exception as e:
+            Logger.warning("SmartPlaylist::from_sql(): %s", e)
+        return rules
@@ -415,6 +415,29 @@ class TagReader(Discoverer):
             values = get_ogg()
         return values
 
+    def get_image(self, tags):
+        """
+            Get embedded image from tags
+            @param tags as Gst.TagList
+            @return bytes/None
+        """
+        try:
+            if tags is None:
+                return None
+            (exists, sample) = tags.get_sample_index("image", 0)
+            if not exists:
+                (exists, sample) = tags.get_sample_index("preview-image", 0)
+            if exists:
+                buffer = sample.get_buffer()
+                (exists, mapflags) = buffer.map(Gst.MapFlags.READ)
+            if exists:
+                data = bytes(mapflags.data)
+                buffer.unmap(mapflags)
+                return data
+        except Exception as e:
+            Logger.error("TagReader::get_image(): %s", e)
+        return None
+
     def get_bpm(self, tags):
         """
             Get BPM from tags
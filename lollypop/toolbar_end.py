@@ -254,6 +254,11 @@ class ToolbarEnd(Gtk.Bin):
             App().player.set_party_ids()
             App().player.set_next()
 
+        action = App().settings.create_action("party-weighted")
+        App().add_action(action)
+        item = Gio.MenuItem.new(_("Favor loved and rated tracks"),
+                                "app.party-weighted")
+        self.__party_submenu.append_item(item)
         party_ids = App().settings.get_value("party-ids")
         all_ids = App().genres.get_ids()
         all_selected = len(set(all_ids) & set(party_ids)) == len(all_ids) or\
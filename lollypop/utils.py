@@ -12,7 +12,7 @@
 
 from gi.repository import Gio, GLib, Gdk, GdkPixbuf, Pango
 
-from math import pi
+from math import pi, ceil
 from gettext import gettext as _
 from urllib.parse import urlparse
 import unicodedata
@@ -94,6 +94,33 @@ def get_round_surface(image, scale_factor, radius):
     return surface
 
 
+def get_pixbuf_at_size(data, width, height):
+    """
+        Decode image at smallest size covering width x height
+        JPEG images are downscaled while decoding (DCT scaling)
+        @param data as bytes
+        @param width as int
+        @param height as int
+        @return GdkPixbuf.Pixbuf
+        @raise GLib.Error
+    """
+    def on_size_prepared(loader, image_width, image_height):
+        if width <= 0 or height <= 0:
+            return
+        scale = max(width / image_width, height / image_height)
+        if scale < 1:
+            loader.set_size(max(1, ceil(image_width * scale)),
+                            max(1, ceil(image_height * scale)))
+
+    loader = GdkPixbuf.PixbufLoader.new()
+    loader.connect("size-prepared", on_size_prepared)
+    try:
+        loader.write(data)
+    finally:
+        loader.close()
+    return loader.get_pixbuf()
+
+
 def on_realize(widget):
     """
         Set cursor on widget
@@ -348,6 +348,7 @@ class LazyLoadingView(View):
             Update scroll value and check for lazy queue
             @param adj as Gtk.Adjustment
         """
+        App().art_helper.pause_prewarm()
         if not self._lazy_queue:
             return False
         if self.__scroll_timeout_id is not None:
@@ -54,138 +54,42 @@ class SmartPlaylistView(View):
 
     def populate(self):
         """
-            Setup an initial widget based on current request
+            Setup an initial widget based on current rules
         """
-        sql = App().playlists.get_smart_sql(self.__playlist_id)
-        if sql is None:
+        rules = App().playlists.get_smart_rules(self.__playlist_id)
+        if rules is None:
             return
-        try:
-            if sql.find(" UNION ") != -1:
-                operand = "OR"
-            else:
-                operand = "AND"
-            self.__operand_combobox.set_active_id(operand)
-        except Exception as e:
-            self.__operand_combobox.set_active(0)
-            Logger.warning("SmartPlaylistView::populate: %s", e)
+        self.__operand_combobox.set_active_id(rules["operand"])
         # Setup rows
-        for line in sql.split("((")[1:]:
+        for rule in rules["rules"]:
             widget = SmartPlaylistRow(self.__size_group)
             try:
-                widget.set(line.split("))")[0])
+                widget.set(rule)
             except Exception as e:
                 Logger.error("SmartPlaylistView::populate: %s", e)
             widget.show()
             self.__listbox.add(widget)
-        try:
-            split_limit = sql.split("LIMIT")
-            limit = int(split_limit[1].split(" ")[1])
-            self.__limit_spin.set_value(limit)
-        except Exception as e:
-            Logger.warning("SmartPlaylistView::populate: %s", e)
-        try:
-            split_order = sql.split("ORDER BY")
-            split_spaces = split_order[1].split(" ")
-            orderby = split_spaces[1]
-            # UNION does not support RANDOM() in OrderBy
-            if orderby == "rand":
-                orderby = "random()"
-            if split_spaces[2] in ["ASC", "DESC"]:
-                orderby += " %s" % split_spaces[2]
-            self.__select_combobox.set_active_id(orderby)
-        except Exception as e:
-            self.__select_combobox.set_active(0)
-            Logger.warning("SmartPlaylistView::populate: %s", e)
+        self.__limit_spin.set_value(rules["limit"])
+        self.__select_combobox.set_active_id(rules["orderby"])
 
 #######################
 # PROTECTED           #
 #######################
-    def __get_or_request(self):
-        """
-            Get request for AND operand
-            @return str
-        """
-        request = ""
-        orderby = self.__select_combobox.get_active_id()
-        for child in self.__listbox.get_children():
-            if child.sql is None:
-                continue
-            request += "SELECT DISTINCT(tracks.rowid)"
-            if orderby == "random()":
-                request += ", random() as rand"
-            else:
-                request += ", %s" % orderby
-            request += " FROM tracks"
-            subrequest = " WHERE %s" % child.sql
-            if orderby.find("albums.name") != -1:
-                subrequest += " AND tracks.album_id = albums.rowid"
-            elif orderby.find("artists.name") != -1:
-                subrequest += " AND track_artists.artist_id = artists.rowid\
-                                AND track_artists.track_id = tracks.rowid"
-            if subrequest.find(" genres."):
-                request += ", %s" % "genres"
-            if subrequest.find(" artists."):
-                request += ", %s" % "artists"
-            if subrequest.find(" albums.") != -1:
-                request += ", %s" % "albums"
-            if subrequest.find(" track_genres.") != -1:
-                request += ", %s" % " track_genres"
-            if subrequest.find(" track_artists.") != -1:
-                request += ", %s" % " track_artists"
-            request += subrequest + " UNION "
-        request = request[:-7]  # " UNION "
-        if orderby == "random()":
-            request += " ORDER BY rand"
-        else:
-            request += " ORDER BY %s" % orderby
-        request += " LIMIT %s" % int(self.__limit_spin.get_value())
-        return request
-
-    def __get_and_request(self):
-        """
-            Get request for AND operand
-            @return str
-        """
-        orderby = self.__select_combobox.get_active_id()
-        request = "SELECT DISTINCT(tracks.rowid) FROM tracks"
-        subrequest = " WHERE"
-        for child in self.__listbox.get_children():
-            if child.sql is not None:
-                subrequest += " %s AND" % child.sql
-        subrequest = subrequest[:-3]
-        if orderby.find("albums.name") != -1:
-            subrequest += " AND tracks.album_id = albums.rowid"
-        elif orderby.find("artists.name") != -1:
-            subrequest += " AND track_artists.artist_id = artists.rowid\
-                            AND track_artists.track_id = tracks.rowid"
-        if subrequest.find(" genres.") != -1:
-            request += ", %s" % "genres"
-        if subrequest.find(" artists.") != -1:
-            request += ", %s" % "artists"
-        if subrequest.find(" albums.") != -1:
-            request += ", %s" % "albums"
-        if subrequest.find(" track_genres.") != -1:
-            request += ", %s" % "track_genres"
-        if subrequest.find(" track_artists.") != -1:
-            request += ", %s" % "track_artists"
-        subrequest += " ORDER BY %s" % orderby
-        subrequest += " LIMIT %s" % int(self.__limit_spin.get_value())
-        return request + subrequest
-
     def _on_save_button_clicked(self, button):
         """
-            Save SQL request
+            Save rules
             @param button as Gtk.Button
         """
-        operand = self.__operand_combobox.get_active_id()
         if len(self.__listbox.get_children()) == 0:
-            request = ""
             App().playlists.set_smart(self.__playlist_id, False)
-        elif operand == "AND":
-            request = self.__get_and_request()
-        else:
-            request = self.__get_or_request()
-        App().playlists.set_smart_sql(self.__playlist_id, request)
+        rules = {"operand": self.__operand_combobox.get_active_id(),
+                 "orderby": self.__select_combobox.get_active_id(),
+                 "limit": int(self.__limit_spin.get_value()),
+                 "rules": []}
+        for child in self.__listbox.get_children():
+            if child.rule is not None:
+                rules["rules"].append(child.rule)
+        App().playlists.set_smart_rules(self.__playlist_id, rules)
         # FIXME
         App().window.container.reload_view()
 
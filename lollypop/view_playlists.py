@@ -39,11 +39,8 @@ class PlaylistsView(LazyLoadingView, ViewController):
         self.__view_type = view_type
         self.__playlist_ids = playlist_ids
         self.__signal_id1 = App().playlists.connect(
-                                            "playlist-track-added",
-                                            self.__on_playlist_track_added)
-        self.__signal_id2 = App().playlists.connect(
-                                            "playlist-track-removed",
-                                            self.__on_playlist_track_removed)
+                                            "playlist-changed-bulk",
+                                            self.__on_playlist_changed_bulk)
         self.__signal_id3 = App().settings.connect(
                             "changed::split-view",
                             self.__on_split_view_changed)
@@ -207,9 +204,6 @@ class PlaylistsView(LazyLoadingView, ViewController):
         if self.__signal_id1:
             App().playlists.disconnect(self.__signal_id1)
             self.__signal_id1 = None
-        if self.__signal_id2:
-            App().playlists.disconnect(self.__signal_id2)
-            self.__signal_id2 = None
 
     def _on_jump_button_clicked(self, button):
         """
@@ -300,31 +294,30 @@ class PlaylistsView(LazyLoadingView, ViewController):
         """
         self.__update_jump_button()
 
-    def __on_playlist_track_added(self, playlists, playlist_id, uri, pos):
+    def __on_playlist_changed_bulk(self, playlists, playlist_id,
+                                   added, removed):
         """
             Update tracks widgets
             @param playlists as Playlists
             @param playlist_id as int
-            @param uri as str
-            @param pos as int
+            @param added as [(int, [str])]
+            @param removed as [(int, [str])]
         """
         if len(self.__playlist_ids) == 1 and\
                 playlist_id in self.__playlist_ids:
-            track_id = App().tracks.get_id_by_uri(uri)
-            self.__playlists_widget.append(track_id)
-
-    def __on_playlist_track_removed(self, playlists, playlist_id, uri, pos):
-        """
-            Update tracks widgets
-            @param playlists as Playlists
-            @param playlist_id as int
-            @param uri as str
-            @param pos as int
-        """
-        if len(self.__playlist_ids) == 1 and\
-                playlist_id in self.__playlist_ids:
-            track_id = App().tracks.get_id_by_uri(uri)
-            self.__playlists_widget.remove(track_id, pos)
+            positions = []
+            for (position, uris) in removed:
+                positions += range(position, position + len(uris))
+            if positions:
+                self.__playlists_widget.remove(positions)
+            track_ids = []
+            for (position, uris) in added:
+                for uri in uris:
+                    track_id = App().tracks.get_id_by_uri(uri)
+                    if track_id is not None:
+                        track_ids.append(track_id)
+            if track_ids:
+                self.__playlists_widget.append(track_ids)
 
     def __on_playlist_populated(self, widget):
         """
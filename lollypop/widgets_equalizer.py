@@ -118,8 +118,7 @@ class EqualizerWidget(Gtk.Bin):
         App().settings.set_value("equalizer-enabled",
                                  GLib.Variant("b", active))
         for plugin in App().player.plugins:
-            plugin.init()
-        App().player.reload_track()
+            plugin.update_equalizer()
         self.__combobox.set_sensitive(active)
         for i in range(0, 10):
             attr = getattr(self, "__scale%s" % i)
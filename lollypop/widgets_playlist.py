@@ -42,6 +42,8 @@ class PlaylistsWidget(Gtk.Grid):
         self.__playlist_ids = playlist_ids
         self.__view_type = view_type
         self.__duration = 0
+        # Appended batches not populated yet
+        self.__appending = []
         self.__tracks = {}
         self.__row_tracks_left = []
         self.__row_tracks_right = []
@@ -158,30 +160,35 @@ class PlaylistsWidget(Gtk.Grid):
         """
         self.__cancellable.cancel()
 
-    def append(self, track_id):
+    def append(self, track_ids):
         """
-            Add track to widget
-            @param track_id as int
+            Add tracks to widget
+            @param track_ids as [int]
         """
         length = len(self.children)
-        position = length + 1
-        widgets = {self.__tracks_widget_right: [(Track(track_id), position)]}
-        self.__add_tracks(OrderedDict(widgets))
-        self.__make_homogeneous()
+        tracks = [(Track(track_id), length + i + 1)
+                  for (i, track_id) in enumerate(track_ids)]
+        if self.__view_type & ViewType.TWO_COLUMNS:
+            widget = self.__tracks_widget_right
+        else:
+            widget = self.__tracks_widget_left
+        widgets = OrderedDict({widget: tracks})
+        if self.__view_type & ViewType.TWO_COLUMNS:
+            # Balance columns once batch is populated
+            self.__appending.append(widgets)
+        # One lazy population for all tracks
+        self.__add_tracks(widgets)
 
-    def remove(self, track_id, position):
+    def remove(self, positions):
         """
-            Remove track from widget
-            @param track_id as int
-            @param position as int
+            Remove tracks from widget
+            @param positions as [int]
         """
-        index = 0
-        for row in self.children:
-            if row.track.id == track_id and index == position:
+        positions = set(positions)
+        for (index, row) in enumerate(self.children):
+            if index in positions:
                 GLib.idle_add(row.destroy)
                 self.__on_remove_track(row)
-                break
-            index += 1
         self.__make_homogeneous()
 
     @property
@@ -252,6 +259,7 @@ class PlaylistsWidget(Gtk.Grid):
 
         if not tracks:
             if not previous_tracks:
+                self.__balance_appended(widgets)
                 # Link last left and first right
                 left_children = self.__tracks_widget_left.get_children()
                 right_children = self.__tracks_widget_right.get_children()
@@ -281,6 +289,27 @@ class PlaylistsWidget(Gtk.Grid):
         widget.insert(row, position)
         GLib.idle_add(self.__add_tracks, widgets, tracks)
 
+    def __balance_appended(self, widgets):
+        """
+            Balance columns when last appended batch is populated
+            @param widgets as OrderedDict
+        """
+        for (i, batch) in enumerate(self.__appending):
+            if batch is widgets:
+                del self.__appending[i]
+                break
+        else:
+            return
+        if self.__appending:
+            return
+        # Whole batches were added to the right column
+        left_count = len(self.__tracks_widget_left.get_children())
+        right_children = self.__tracks_widget_right.get_children()
+        count = max(0, (len(right_children) - left_count + 1) // 2)
+        for child in right_children[:count]:
+            self.__tracks_widget_right.remove(child)
+            self.__tracks_widget_left.add(child)
+
     def __on_size_allocate(self, widget, allocation):
         """
             Change box max/min children
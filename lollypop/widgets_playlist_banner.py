@@ -33,9 +33,8 @@ class PlaylistBannerWidget(Gtk.Overlay):
         self.__track = None
         self.__track_ids = []
         if App().playlists.get_smart(playlist_id):
-            request = App().playlists.get_smart_sql(playlist_id)
-            if request is not None:
-                self.__track_ids = App().db.execute(request)
+            self.__track_ids = App().playlists.get_smart_track_ids(
+                playlist_id)
         else:
             self.__track_ids = App().playlists.get_track_ids(playlist_id)
         self.__height = self.default_height
@@ -17,7 +17,7 @@ from gettext import gettext as _
 
 class SmartPlaylistRow(Gtk.ListBoxRow):
     """
-        A smart playlist widget (WHERE SQL subrequest)
+        A smart playlist widget (a SmartPlaylist rule)
     """
     __TEXT = ["genre", "album", "artist"]
     __INT = ["rating", "year", "bpm"]
@@ -48,98 +48,45 @@ class SmartPlaylistRow(Gtk.ListBoxRow):
         self._on_leave_notify_event(None, None)
         self.add(builder.get_object("widget"))
 
-    def set(self, item):
-        """
-            Try to set widget from item
-            @param item as str
-        """
-        item = item.replace(" COLLATE NOCASE", "")
-        (t, self.__operand, *args) = item.split(" ")
-        value = " ".join(list(args))
-        # Unquote value
-        if value[0] == "'":
-            value = value[1:]
-        if value[-1] == "'":
-            value = value[:-1]
-        # Remove %
-        if value[0] == "%":
-            value = value[1:]
-        if value[-1] == "%":
-            value = value[:-1]
-        if t == "tracks.year":
-            self.__type_combobox.set_active_id("year")
-            self.__spin_button.set_value(int(value))
-        elif t == "tracks.bpm":
-            self.__type_combobox.set_active_id("bpm")
-            self.__spin_button.set_value(int(value))
-        elif t == "genres.name":
-            self.__type_combobox.set_active_id("genre")
-            self.__entry.set_text(value)
-        elif t == "albums.name":
-            self.__type_combobox.set_active_id("album")
-            self.__entry.set_text(value)
-        elif t == "artists.name":
-            self.__type_combobox.set_active_id("artist")
+    def set(self, rule):
+        """
+            Try to set widget from rule
+            @param rule as dict
+        """
+        self.__operand = rule["operand"]
+        value = rule["value"]
+        if rule["type"] in self.__INT:
+            self.__type_combobox.set_active_id(rule["type"])
+            if rule["type"] == "rating":
+                self.__rate = int(value)
+                self._on_leave_notify_event(None, None)
+            else:
+                self.__spin_button.set_value(int(value))
+        elif rule["type"] in self.__TEXT:
+            self.__type_combobox.set_active_id(rule["type"])
             self.__entry.set_text(value)
-        elif t == "tracks.rate":
-            self.__type_combobox.set_active_id("rating")
-            self.__rate = int(value)
-            self._on_leave_notify_event(None, None)
         else:
             self.destroy()
 
     @property
-    def sql(self):
+    def rule(self):
         """
-            Get SQL subrequest
-            @return str
+            Get rule, see SmartPlaylist
+            @return dict
         """
         request_type = self.__type_combobox.get_active_id()
         request_check = self.__operand_combobox.get_active_id()
-        sql = None
+        if request_type is None or request_check is None:
+            return None
         if request_type == "rating":
-            sql = "( ((tracks.rate %s '%s'))" +\
-                  " OR ((albums.rate %s '%s')) )"
-            sql = sql % (request_check, self.__rate,
-                         request_check, self.__rate)
-        elif request_type == "year":
-            value = int(self.__spin_button.get_value())
-            sql = "( ((tracks.year %s '%s')) )"
-            sql = sql % (request_check, value)
-        elif request_type == "bpm":
+            value = self.__rate
+        elif request_type in self.__INT:
             value = int(self.__spin_button.get_value())
-            sql = "( ((tracks.bpm %s '%s')) )"
-            sql = sql % (request_check, value)
-        elif request_type == "genre":
-            request_value = self.__entry.get_text().replace("'", "''")
-            if request_check.find("LIKE") != -1:
-                value = "%" + request_value + "%"
-            else:
-                value = request_value
-            sql = "(track_genres.genre_id = genres.rowid" +\
-                  " AND tracks.rowid = track_genres.track_id" +\
-                  " AND ((genres.name %s '%s' COLLATE NOCASE)) )"
-            sql = sql % (request_check, value)
-        elif request_type == "album":
-            request_value = self.__entry.get_text().replace("'", "''")
-            if request_check.find("LIKE") != -1:
-                value = "%" + request_value + "%"
-            else:
-                value = request_value
-            sql = "(tracks.album_id = albums.rowid" +\
-                  " AND ((albums.name %s '%s' COLLATE NOCASE)) )"
-            sql = sql % (request_check, value)
-        elif request_type == "artist":
-            request_value = self.__entry.get_text().replace("'", "''")
-            if request_check.find("LIKE") != -1:
-                value = "%" + request_value + "%"
-            else:
-                value = request_value
-            sql = "(track_artists.artist_id = artists.rowid" +\
-                  " AND tracks.rowid = track_artists.track_id" +\
-                  " AND ((artists.name %s '%s' COLLATE NOCASE)) )"
-            sql = sql % (request_check, value)
-        return sql
+        else:
+            value = self.__entry.get_text()
+        return {"type": request_type,
+                "operand": request_check,
+                "value": value}
 
 #######################
 # PROTECTED           #
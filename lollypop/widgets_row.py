@@ -335,7 +335,7 @@ class Row(Gtk.ListBoxRow):
         elif event.button == 3:
             self.__popup_menu(self, event.x, event.y)
         elif event.button == 2:
-            if self._track.id in App().player.queue:
+            if App().player.track_in_queue(self._track):
                 App().player.remove_from_queue(self._track.id)
             else:
                 App().player.append_to_queue(self._track.id)
@@ -139,7 +139,7 @@ class QueueRow(Row, DNDRow):
         """
             Check track always valid, destroy if not
         """
-        if self._track.id not in App().player.queue:
+        if not App().player.track_in_queue(self._track):
             self.destroy()
 
     def __on_album_artwork(self, surface):
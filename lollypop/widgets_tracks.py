@@ -32,11 +32,8 @@ class TracksWidget(Gtk.ListBox):
         self.connect("destroy", self.__on_destroy)
         self.__queue_signal_id = App().player.connect("queue-changed",
                                                       self.__on_queue_changed)
-        self.__loved_signal_id1 = App().playlists.connect(
-            "playlist-track-added",
-            self.__on_loved_playlist_changed)
-        self.__loved_signal_id2 = App().playlists.connect(
-            "playlist-track-removed",
+        self.__loved_signal_id = App().playlists.connect(
+            "playlist-changed-bulk",
             self.__on_loved_playlist_changed)
         self.connect("row-activated", self.__on_activate)
         self.get_style_context().add_class("trackswidget")
@@ -63,25 +60,37 @@ class TracksWidget(Gtk.ListBox):
 #######################
 # PRIVATE             #
 #######################
-    def __on_queue_changed(self, unused):
+    def __on_queue_changed(self, player, track_ids):
         """
-            Update all position labels
+            Update position labels
+            @param player as Player
+            @param track_ids as [int]/None: tracks with a new position
         """
+        if track_ids is None:
+            for row in self.get_children():
+                row.update_number_label()
+            return
+        track_ids = set(track_ids)
         for row in self.get_children():
-            row.update_number_label()
+            if row.track.id in track_ids:
+                row.update_number_label()
 
-    def __on_loved_playlist_changed(self, widget, playlist_id, uri, *ignore):
+    def __on_loved_playlist_changed(self, widget, playlist_id,
+                                    added, removed):
         """
             Updates the loved icon
             @param playlist as Playlist
             @param playlist_id as int
-            @param track_id as int
+            @param added as [(int, [str])]
+            @param removed as [(int, [str])]
         """
         if playlist_id != Type.LOVED:
             return
-        track_id = App().tracks.get_id_by_uri(uri)
+        uris = set()
+        for (position, range_uris) in added + removed:
+            uris |= set(range_uris)
         for row in self.get_children():
-            if track_id == row.track.id:
+            if row.track.uri in uris:
                 row.set_indicator()
 
     def __on_destroy(self, widget):
@@ -92,12 +101,9 @@ class TracksWidget(Gtk.ListBox):
         if self.__queue_signal_id is not None:
             App().player.disconnect(self.__queue_signal_id)
             self.__queue_signal_id = None
-        if self.__loved_signal_id1 is not None:
-            App().playlists.disconnect(self.__loved_signal_id1)
-            self.__loved_signal_id1 = None
-        if self.__loved_signal_id2 is not None:
-            App().playlists.disconnect(self.__loved_signal_id2)
-            self.__loved_signal_id2 = None
+        if self.__loved_signal_id is not None:
+            App().playlists.disconnect(self.__loved_signal_id)
+            self.__loved_signal_id = None
 
     def __on_activate(self, widget, row):
         """